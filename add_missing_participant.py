@@ -7,6 +7,8 @@ import pandas as pd
 import json
 from pathlib import Path
 
+from analysis_snapshot import load_analysis, save_analysis
+
 # Load the updated Excel file
 excel_path = '/Users/owlers_dylan/Downloads/makeuptest_AP_Bueatylink_20250927.xlsx'
 df = pd.read_excel(excel_path)
@@ -52,16 +54,14 @@ print(f"Processed {len(all_participants)} participants")
 
 # Save to excel_analysis.json (update the existing one)
 try:
-    with open('excel_analysis.json', 'r', encoding='utf-8') as f:
-        analysis_data = json.load(f)
+    analysis_data = load_analysis(sections=('meta', 'summary_stats'))
 
     # Update with new participant count
     analysis_data['total_participants'] = len(all_participants)
     analysis_data['participant_data'] = all_participants
 
     # Save updated analysis
-    with open('excel_analysis.json', 'w', encoding='utf-8') as f:
-        json.dump(analysis_data, f, ensure_ascii=False, indent=2)
+    save_analysis(analysis_data)
 
     print("✓ Updated excel_analysis.json")
 except Exception as e:
@@ -0,0 +1,95 @@
+// Airtable list helper shared by the dashboards
+// Each page passes the fields it actually reads (fields[]) and, where it only
+// needs part of a table, a filterByFormula, so pages come back smaller.
+
+const AirtableFetch = {
+    PAGE_SIZE: 100,
+
+    // {status: {not: ['Cancelled', 'Duplicate']}, setDate: '9/22'} -> Airtable formula
+    formulaFor(where = {}) {
+        const quote = value => typeof value === 'number'
+            ? String(value)
+            : `'${String(value).replace(/\\/g, '\\\\').replace(/'/g, "\\'")}'`;
+        const clauses = [];
+        Object.entries(where).forEach(([field, condition]) => {
+            if (condition && typeof condition === 'object' && !Array.isArray(condition) && condition.not) {
+                [].concat(condition.not).forEach(value => clauses.push(`{${field}}!=${quote(value)}`));
+            } else {
+                const values = [].concat(condition);
+                const terms = values.map(value => `{${field}}=${quote(value)}`);
+                clauses.push(terms.length === 1 ? terms[0] : `OR(${terms.join(', ')})`);
+            }
+        });
+        if (clauses.length === 0) return '';
+        return clauses.length === 1 ? clauses[0] : `AND(${clauses.join(', ')})`;
+    },
+
+    listUrl(root, baseId, table, { fields = [], filterByFormula = '', sort = [], pageSize = this.PAGE_SIZE, offset = null } = {}) {
+        const params = new URLSearchParams();
+        fields.forEach(field => params.append('fields[]', field));
+        if (filterByFormula) params.append('filterByFormula', filterByFormula);
+        sort.forEach((spec, i) => {
+            params.append(`sort[${i}][field]`, spec.field);
+            params.append(`sort[${i}][direction]`, spec.direction || 'asc');
+        });
+        params.append('pageSize', String(pageSize));
+        if (offset) params.append('offset', offset);
+        return `${root}/${baseId}/${table}?${params.toString()}`;
+    },
+
+    isUnknownField(text) {
+        return /UNKNOWN_FIELD_NAME|Unknown field name/i.test(text || '');
+    },
+
+    /*
+     * Page through a table and return all records.
+     *
+     * options: root, baseId, apiKey, table, fields, where or filterByFormula,
+     * sort, pageSize, onPage(pageNumber, records, responseBody) and
+     * request(url), which defaults to a plain fetch with the bearer header.
+     *
+     * If the base doesn't have one of the projected fields Airtable answers
+     * 422 UNKNOWN_FIELD_NAME; the load is then retried without a projection.
+     */
+    async listAll(options) {
+        const { root, baseId, apiKey, table, fields = [], sort = [], pageSize = this.PAGE_SIZE, onPage = null } = options;
+        const filterByFormula = options.filterByFormula || this.formulaFor(options.where);
+        const request = options.request ||
+            (url => fetch(url, { headers: { 'Authorization': `Bearer ${apiKey}` } }));
+
+        const retryUnprojected = () => {
+            console.warn(`Airtable ${table}: projected field missing, loading all fields`);
+            return this.listAll({ ...options, fields: [] });
+        };
+
+        let records = [];
+        let offset = null;
+        let page = 0;
+        do {
+            const url = this.listUrl(root, baseId, table, { fields, filterByFormula, sort, pageSize, offset });
+            let response;
+            try {
+                response = await request(url);
+            } catch (error) {
+                if (fields.length && page === 0 && this.isUnknownField(error.message)) return retryUnprojected();
+                throw error;
+            }
+
+            if (!response.ok) {
+                const text = await response.text();
+                if (fields.length && page === 0 && this.isUnknownField(text)) return retryUnprojected();
+                const error = new Error(`Airtable ${table} ${response.status}: ${text}`);
+                error.status = response.status;
+                throw error;
+            }
+
+            const data = await response.json();
+            page++;
+            records = records.concat(data.records);
+            if (onPage) onPage(page, data.records, data);
+            offset = data.offset;
+        } while (offset);
+
+        return records;
+    }
+};
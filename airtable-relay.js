@@ -0,0 +1,100 @@
+// Live updates from the change relay (python airtable_relay.py)
+// Instead of every open tab re-paging every table on a timer, a page loads
+// the tables once from the relay's read API and then applies the changes the
+// relay pushes over Server-Sent Events.
+
+const AirtableRelay = {
+    // Relay run and table versions the page's data was read at (see notePage)
+    epoch: null,
+    loaded: {},
+
+    // Relay base URL from config.js / localStorage, or '' when there is none
+    url() {
+        const configured = (typeof AIRTABLE_CONFIG !== 'undefined' && AIRTABLE_CONFIG.RELAY_URL) ||
+            localStorage.getItem('AIRTABLE_RELAY_URL') || '';
+        return configured.replace(/\/+$/, '');
+    },
+
+    // Read API root to use for list calls: the relay's when configured
+    readRoot(fallback) {
+        const relay = this.url();
+        return relay ? `${relay}/v0` : fallback;
+    },
+
+    /*
+     * onPage hook for AirtableFetch.listAll: remember the table version each
+     * page of a relay read was taken at. A load spanning several pages keeps
+     * the oldest, so a change landing mid-load is pushed again, never lost.
+     */
+    notePage(page, data) {
+        const info = data && data.mirror;
+        if (!info || !info.epoch) return;
+        if (info.epoch !== this.epoch) {
+            this.epoch = info.epoch;
+            this.loaded = {};
+        }
+        const known = this.loaded[info.table];
+        this.loaded[info.table] = page === 1 || known === undefined ? info.version : Math.min(known, info.version);
+    },
+
+    // ?since= value for the versions noted so far, or '' before any relay read
+    since() {
+        const tables = Object.entries(this.loaded);
+        if (!this.epoch || tables.length === 0) return '';
+        return `${this.epoch}|${tables.map(([table, version]) => `${table}:${version}`).join(',')}`;
+    },
+
+    /*
+     * Follow the relay's event stream.
+     *
+     * handlers: onChange(table, change) with change = {version, upserted, deleted},
+     * onReset(table) when the page must reload that table, onHello(versions)
+     * and onError(event). Table names are the mirror's: participants,
+     * attendance, admin. The stream starts from the versions the page loaded
+     * (notePage), so nothing committed in between is missed. EventSource
+     * reconnects on its own and resumes from the last event id it saw.
+     */
+    connect(handlers = {}) {
+        const relay = this.url();
+        if (!relay || typeof EventSource === 'undefined') return null;
+
+        const since = this.since();
+        const source = new EventSource(since ? `${relay}/events?since=${encodeURIComponent(since)}` : `${relay}/events`);
+        const parse = event => JSON.parse(event.data);
+
+        source.addEventListener('hello', event => {
+            if (handlers.onHello) handlers.onHello(parse(event).versions);
+        });
+        source.addEventListener('change', event => {
+            const change = parse(event);
+            if (handlers.onChange) handlers.onChange(change.table, change);
+        });
+        source.addEventListener('reset', event => {
+            if (handlers.onReset) handlers.onReset(parse(event).table);
+        });
+        source.onerror = event => {
+            if (handlers.onError) handlers.onError(event);
+        };
+        return source;
+    },
+
+    // Apply a change to rows shaped {...fields, recordId}; returns the new array
+    apply(rows, change) {
+        const gone = new Set(change.deleted || []);
+        const byId = new Map();
+        (change.upserted || []).forEach(record => byId.set(record.id, { ...record.fields, recordId: record.id }));
+
+        const result = [];
+        rows.forEach(row => {
+            if (gone.has(row.recordId)) return;
+            if (byId.has(row.recordId)) {
+                result.push(byId.get(row.recordId));
+                byId.delete(row.recordId);
+            } else {
+                result.push(row);
+            }
+        });
+        byId.forEach(row => result.push(row));
+        return result;
+    }
+};
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Airtable REST client shared by the sync scripts: pooled session, token
+bucket at the per-base rate limit, 10-record batch writes and honest
+429 / Retry-After handling
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Iterable, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+if TYPE_CHECKING:
+    from sync_metrics import SyncMetrics
+
+AIRTABLE_API_URL = os.environ.get('AIRTABLE_API_URL', 'https://api.airtable.com/v0')
+
+MAX_BATCH_SIZE = 10        # Airtable rejects more than 10 records per write
+AIRTABLE_RATE_LIMIT = 5.0  # requests per second per base
+# Pace slightly under the limit: network jitter can squeeze six evenly spaced
+# requests into one second, and a single 429 costs a 30 s penalty
+DEFAULT_RATE = AIRTABLE_RATE_LIMIT * 0.95
+RATE_LIMIT_PENALTY = 30.0  # Airtable asks clients to wait 30 s after a 429
+# filterByFormula travels in the query string; past this, fetch unfiltered
+MAX_FORMULA_LENGTH = 8000
+
+
+class AirtableError(Exception):
+    def __init__(self, message: str, status: Optional[int] = None, body: str = ''):
+        super().__init__(message)
+        self.status = status
+        self.body = body
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. acquire() blocks until a token is available
+    and returns the time spent waiting; pause() stops everyone (used when
+    the server answers 429).
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE, capacity: float = 1.0):
+        # capacity 1 spaces requests evenly; a bigger bucket allows bursts that
+        # can exceed the server's per-second window
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self) -> float:
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                else:
+                    self._refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return waited
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float):
+        with self.lock:
+            now = time.monotonic()
+            self.paused_until = max(self.paused_until, now + seconds)
+            # Start from an empty bucket after the pause instead of bursting
+            self.tokens = 0
+            self.updated = max(self.updated, self.paused_until)
+
+
+def chunked(items: List, size: int = MAX_BATCH_SIZE) -> List[List]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def formula_value(value) -> str:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    escaped = str(value).replace('\\', '\\\\').replace("'", "\\'")
+    return f"'{escaped}'"
+
+
+def formula_any_of(field: str, values: Iterable) -> Optional[str]:
+    """
+    OR({field}='a', {field}='b', ...) for the values a caller will look up,
+    or None when there are none or the formula would be too long to send.
+    """
+    terms = [f"{{{field}}}={formula_value(v)}" for v in dict.fromkeys(values)]
+    if not terms:
+        return None
+    formula = terms[0] if len(terms) == 1 else f"OR({', '.join(terms)})"
+    return formula if len(formula) <= MAX_FORMULA_LENGTH else None
+
+
+def formula_or(*formulas: Optional[str]) -> Optional[str]:
+    parts = [f for f in formulas if f]
+    if len(parts) <= 1:
+        return parts[0] if parts else None
+    return f"OR({', '.join(parts)})"
+
+
+class AirtableClient:
+    """Thin client for one Airtable base"""
+
+    def __init__(self, api_key: str, base_id: str, rate: float = DEFAULT_RATE,
+                 max_workers: int = 4, max_retries: int = 5,
+                 api_url: str = AIRTABLE_API_URL, bucket: Optional[TokenBucket] = None,
+                 timeout: float = 30.0, metrics: Optional['SyncMetrics'] = None):
+        self.base_id = base_id
+        self.metrics = metrics
+        self.api_url = api_url.rstrip('/')
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.bucket = bucket or TokenBucket(rate)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(max_workers, 1))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        })
+
+    def table_url(self, table: str, record_id: str = '') -> str:
+        url = f"{self.api_url}/{self.base_id}/{table}"
+        return f"{url}/{record_id}" if record_id else url
+
+    @staticmethod
+    def _retry_after(response: requests.Response) -> float:
+        value = response.headers.get('Retry-After')
+        try:
+            return max(float(value), 0.0) if value is not None else RATE_LIMIT_PENALTY
+        except ValueError:
+            return RATE_LIMIT_PENALTY
+
+    def request(self, method: str, url: str, retry_post: bool = True, **kwargs) -> requests.Response:
+        """
+        Send one rate-limited request.
+
+        429: every worker pauses for Retry-After (or 30 s) and the request is
+        retried. 5xx and connection errors back off exponentially. Anything
+        else non-2xx raises AirtableError without retrying.
+
+        retry_post=False: a POST that times out, drops or gets a 5xx may
+        still have created its records, so it raises instead of being sent
+        again. Only failures that never reached Airtable (connect timeout,
+        429) are retried.
+        """
+        metrics = self.metrics
+        resend = retry_post or method.upper() != 'POST'
+        for attempt in range(self.max_retries + 1):
+            waited = self.bucket.acquire()
+            if metrics:
+                metrics.observe_wait(waited)
+            sent = time.monotonic()
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except requests.RequestException as e:
+                if metrics:
+                    metrics.observe_request(method, None, time.monotonic() - sent)
+                    metrics.observe_retry('connection')
+                if attempt == self.max_retries or not (resend or isinstance(e, requests.ConnectTimeout)):
+                    raise AirtableError(f"{method} {url} failed: {e}")
+                time.sleep(min(2 ** attempt, 30))
+                continue
+
+            if metrics:
+                body = response.request.body
+                metrics.observe_request(method, response.status_code, time.monotonic() - sent,
+                                        len(body) if body else 0, len(response.content))
+
+            if response.status_code == 429:
+                wait = self._retry_after(response)
+                print(f"  Rate limited (429), pausing {wait:.1f}s")
+                if metrics:
+                    metrics.observe_retry(429, wait)
+                self.bucket.pause(wait)
+                continue
+
+            if response.status_code >= 500 and attempt < self.max_retries and resend:
+                if metrics:
+                    metrics.observe_retry(response.status_code)
+                time.sleep(min(2 ** attempt, 30))
+                continue
+
+            if response.status_code >= 400:
+                raise AirtableError(f"{method} {url} -> {response.status_code}",
+                                    response.status_code, response.text)
+            return response
+
+        raise AirtableError(f"{method} {url} gave up after {self.max_retries} retries")
+
+    def list_records(self, table: str, fields: Optional[Iterable[str]] = None,
+                     formula: Optional[str] = None, page_size: int = 100,
+                     on_page: Optional[Callable[[int, List[dict]], None]] = None,
+                     **params) -> List[dict]:
+        """
+        Page through a table and return every record.
+
+        fields: only return these fields (fields[]); formula: filterByFormula.
+        If the base lacks one of the projected fields Airtable answers 422
+        UNKNOWN_FIELD_NAME, and the listing is retried without a projection.
+        """
+        query = dict(params, pageSize=page_size)
+        if fields:
+            query['fields[]'] = list(fields)
+        if formula:
+            query['filterByFormula'] = formula
+
+        records = []
+        offset = None
+        page_count = 0
+        while True:
+            if offset:
+                query['offset'] = offset
+            try:
+                data = self.request('GET', self.table_url(table), params=query).json()
+            except AirtableError as e:
+                if fields and page_count == 0 and e.status == 422 and 'UNKNOWN_FIELD_NAME' in e.body:
+                    print(f"  {table}: projected field missing, fetching all fields")
+                    return self.list_records(table, None, formula, page_size, on_page, **params)
+                raise
+            page_count += 1
+            records.extend(data['records'])
+            if on_page:
+                on_page(page_count, data['records'])
+            offset = data.get('offset')
+            if not offset:
+                return records
+
+    def write_records(self, method: str, table: str, records: List[dict], typecast: bool = False,
+                      on_batch: Optional[Callable[[List[dict], Optional[Exception]], None]] = None,
+                      retry_post: bool = True) -> Tuple[List[dict], List[Tuple[List[dict], Exception]]]:
+        """
+        Send records in 10-record batches (PATCH updates, POST creates),
+        several in flight at once under the shared token bucket.
+
+        Returns (written records, [(failed batch, error), ...]). See
+        request() for retry_post.
+        """
+        return self.write_batches(method, table, chunked(records), typecast, on_batch, retry_post)
+
+    def write_batches(self, method: str, table: str, batches: List[List[dict]], typecast: bool = False,
+                      on_batch: Optional[Callable[[List[dict], Optional[Exception]], None]] = None,
+                      retry_post: bool = True) -> Tuple[List[dict], List[Tuple[List[dict], Exception]]]:
+        """
+        Send each batch (at most 10 records) as one request, exactly as
+        grouped by the caller; see write_records(). on_batch is called once
+        per batch, in the order given.
+        """
+        url = self.table_url(table)
+
+        def send(batch: List[dict]):
+            body = {'records': batch}
+            if typecast:
+                body['typecast'] = True
+            try:
+                result = self.request(method, url, retry_post=retry_post, json=body).json()['records']
+                error = None
+            except AirtableError as e:
+                result, error = [], e
+            return batch, result, error
+
+        written: List[dict] = []
+        failed: List[Tuple[List[dict], Exception]] = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            # Results come back in submission order, on the calling thread
+            for batch, result, error in pool.map(send, batches):
+                if on_batch:
+                    on_batch(batch, error)
+                if error:
+                    failed.append((batch, error))
+                else:
+                    written.extend(result)
+        return written, failed
+
+    def patch_records(self, table: str, updates: List[dict], typecast: bool = False,
+                      on_batch: Optional[Callable[[List[dict], Optional[Exception]], None]] = None
+                      ) -> Tuple[List[dict], List[Tuple[List[dict], Exception]]]:
+        """Apply [{'id': ..., 'fields': {...}}, ...]; see write_records()"""
+        return self.write_records('PATCH', table, updates, typecast, on_batch)
+
+    def create_records(self, table: str, records: List[dict], typecast: bool = False,
+                       on_batch: Optional[Callable[[List[dict], Optional[Exception]], None]] = None
+                       ) -> Tuple[List[dict], List[Tuple[List[dict], Exception]]]:
+        """Create [{'fields': {...}}, ...]; see write_records()"""
+        return self.write_records('POST', table, records, typecast, on_batch)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Concurrent multi-table fetch from Airtable
+
+Every table is paged on its own asyncio task, so Participants, Attendance
+and Administrators load side by side instead of one after another. All
+requests go through one AirtableClient, whose token bucket keeps the whole
+fetch under the base's 5 requests/second. Each table's next page is
+requested as soon as the current page's offset is known, before that page
+is processed. A full load takes roughly as long as the largest table.
+
+    frames = fetch_frames(client, {'participants': {'table': 'tblxMzwX1wWJKIOhY'}, ...})
+
+    python airtable_fetch.py [--csv DIR]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from airtable_client import AirtableClient, AirtableError
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+AIRTABLE_BASE_ID = os.environ.get('AIRTABLE_BASE_ID', 'appZcPs57spwdoKQH')
+
+DEFAULT_TABLES = {
+    'participants': {'table': os.environ.get('AIRTABLE_TABLE_ID', 'tblxMzwX1wWJKIOhY')},
+    'attendance': {'table': os.environ.get('AIRTABLE_ATTENDANCE_TABLE_ID', 'tblUnxGfJXHp2qSHp')},
+    'admin': {'table': os.environ.get('AIRTABLE_ADMIN_TABLE_ID', 'tblFQ7ofZ9CXZcydm'),
+              'fields': ['username', 'fullName', 'email', 'role', 'isActive', 'lastLogin']},
+}
+
+# Column dtypes per table, from the *_SCHEMA.md docs. Fields missing from a
+# page still get a column, so code can rely on them being there.
+TABLE_SCHEMAS = {
+    'participants': {
+        'ID': 'Int64', 'P-ID': 'string', 'A-ID': 'string', 'name': 'string',
+        'phone': 'string', 'email': 'string', 'setDate': 'string', 'setTime': 'string',
+        'status': 'category', 'skinColor': 'category', 'skinTone': 'category',
+    },
+    'attendance': {
+        'participantID': 'Int64', 'participantName': 'string', 'A-ID': 'string',
+        'attendanceStatus': 'category', 'checkinTime': 'datetime', 'rewardType': 'category',
+        'staffName': 'string', 'checkDate': 'string', 'checkTime': 'string',
+    },
+    'admin': {
+        'username': 'string', 'fullName': 'string', 'email': 'string',
+        'role': 'category', 'isActive': 'boolean', 'lastLogin': 'datetime',
+    },
+}
+
+
+async def _fetch_table(client: AirtableClient, pool: ThreadPoolExecutor, name: str, spec: dict,
+                       page_size: int = 100) -> List[dict]:
+    """All records of one table, keeping the next page's request in flight"""
+    loop = asyncio.get_running_loop()
+    url = client.table_url(spec['table'])
+    query = {'pageSize': page_size}
+    if spec.get('fields'):
+        query['fields[]'] = list(spec['fields'])
+    if spec.get('formula'):
+        query['filterByFormula'] = spec['formula']
+
+    def get(offset: Optional[str]) -> dict:
+        params = dict(query, offset=offset) if offset else query
+        return client.request('GET', url, params=params).json()
+
+    try:
+        data = await loop.run_in_executor(pool, get, None)
+    except AirtableError as e:
+        if spec.get('fields') and e.status == 422 and 'UNKNOWN_FIELD_NAME' in e.body:
+            print(f"  {name}: projected field missing, fetching all fields")
+            return await _fetch_table(client, pool, name, dict(spec, fields=None), page_size)
+        raise
+
+    records = []
+    while True:
+        offset = data.get('offset')
+        # Prefetch: the next page is on its way while this one is handled
+        upcoming = loop.run_in_executor(pool, get, offset) if offset else None
+        records.extend(data['records'])
+        if upcoming is None:
+            return records
+        data = await upcoming
+
+
+async def fetch_records_async(client: AirtableClient, specs: Dict[str, dict],
+                              page_size: int = 100) -> Dict[str, List[dict]]:
+    """
+    {name: {'table': table ID, 'fields': [...], 'formula': ...}} -> {name: records}
+
+    One worker thread per pooled connection; the client's token bucket paces
+    every table's requests together.
+    """
+    with ThreadPoolExecutor(max_workers=client.max_workers) as pool:
+        results = await asyncio.gather(*(_fetch_table(client, pool, name, spec, page_size)
+                                         for name, spec in specs.items()))
+    return dict(zip(specs, results))
+
+
+def fetch_records(client: AirtableClient, specs: Dict[str, dict], page_size: int = 100) -> Dict[str, List[dict]]:
+    return asyncio.run(fetch_records_async(client, specs, page_size))
+
+
+def to_frame(records: List[dict], schema: Optional[Dict[str, str]] = None) -> 'pd.DataFrame':
+    """Airtable records -> DataFrame with 'id', 'createdTime' and one typed column per field"""
+    # Imported here: the mirror and relay fetch through this module without pandas
+    import pandas as pd
+
+    frame = pd.DataFrame([r['fields'] for r in records])
+    frame.insert(0, 'id', pd.Series([r['id'] for r in records], dtype='string'))
+    frame.insert(1, 'createdTime', pd.to_datetime(pd.Series([r.get('createdTime') for r in records],
+                                                            dtype=object), utc=True, errors='coerce'))
+    for field, dtype in (schema or {}).items():
+        column = frame[field] if field in frame else pd.Series([None] * len(frame), dtype=object)
+        if dtype == 'datetime':
+            frame[field] = pd.to_datetime(column, utc=True, errors='coerce')
+        elif dtype in ('Int64', 'Float64'):
+            frame[field] = pd.to_numeric(column, errors='coerce').astype(dtype)
+        elif dtype == 'boolean':
+            # Airtable leaves unchecked checkboxes out of the record
+            frame[field] = column.fillna(False).astype(bool)
+        else:
+            frame[field] = column.astype(dtype)
+    return frame
+
+
+def fetch_frames(client: AirtableClient, specs: Optional[Dict[str, dict]] = None,
+                 schemas: Optional[Dict[str, Dict[str, str]]] = None) -> Dict[str, 'pd.DataFrame']:
+    """Fetch the tables concurrently and return one typed DataFrame per table"""
+    specs = specs or DEFAULT_TABLES
+    schemas = TABLE_SCHEMAS if schemas is None else schemas
+    records = fetch_records(client, specs)
+    return {name: to_frame(rows, schemas.get(name)) for name, rows in records.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fetch the Airtable tables concurrently')
+    parser.add_argument('--csv', metavar='DIR', help='write one CSV per table into DIR')
+    args = parser.parse_args()
+
+    api_key = os.environ.get('AIRTABLE_API_KEY')
+    if not api_key:
+        print("Set AIRTABLE_API_KEY (and AIRTABLE_API_URL to use the mock server)")
+        sys.exit(1)
+
+    client = AirtableClient(api_key, AIRTABLE_BASE_ID)
+    started = time.time()
+    frames = fetch_frames(client)
+    print(f"Fetched {len(frames)} tables in {time.time() - started:.2f}s")
+    for name, frame in frames.items():
+        print(f"  ✓ {name}: {len(frame)} rows, {len(frame.columns)} columns")
+        if args.csv:
+            os.makedirs(args.csv, exist_ok=True)
+            frame.to_csv(os.path.join(args.csv, f'{name}.csv'), index=False, encoding='utf-8-sig')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Small evaluator for the subset of Airtable formulas our pages and scripts
+send as filterByFormula (used by the local mock server and mirror through
+airtable_views)
+
+Supported: {Field} references, 'strings' / "strings", numbers,
+= != < > <= >= & + - * /, parentheses and the functions
+AND OR NOT IF BLANK TRUE FALSE LOWER UPPER TRIM LEN FIND SEARCH VALUE
+CONCATENATE ARRAYJOIN REGEX_MATCH REGEX_EXTRACT REGEX_REPLACE RECORD_ID
+CREATED_TIME LAST_MODIFIED_TIME IS_AFTER IS_BEFORE IS_SAME. Regular
+expressions run on Python's re rather than Airtable's RE2; keep them to
+the common subset.
+"""
+
+import re
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Callable, List, Optional
+
+TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<field>\{[^}]*\})
+      | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+      | (?P<number>\d+(?:\.\d+)?)
+      | (?P<op><=|>=|!=|=|<|>|&|\+|-|\*|/)
+      | (?P<punct>[(),])
+      | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+    )""", re.VERBOSE)
+
+
+class FormulaError(Exception):
+    pass
+
+
+def tokenize(formula: str) -> List[tuple]:
+    tokens, pos = [], 0
+    formula = formula.strip()
+    while pos < len(formula):
+        match = TOKEN_RE.match(formula, pos)
+        if not match or match.end() == pos:
+            raise FormulaError(f"unexpected input at {pos}: {formula[pos:pos + 20]!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'field':
+            value = value[1:-1]
+        elif kind == 'string':
+            value = re.sub(r'\\(.)', r'\1', value[1:-1])
+        elif kind == 'number':
+            value = float(value) if '.' in value else int(value)
+        tokens.append((kind, value))
+        pos = match.end()
+    return tokens
+
+
+def _blank(value) -> bool:
+    return value is None or value == '' or value == []
+
+
+def _text(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return ', '.join(_text(v) for v in value)
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _number(value) -> Optional[float]:
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _truthy(value) -> bool:
+    if isinstance(value, str):
+        return value != ''
+    if isinstance(value, list):
+        return len(value) > 0
+    return bool(value)
+
+
+def _datetime(value) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    text = _text(value).strip()
+    if not text:
+        return None
+    try:
+        parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _compare(op: str, left, right) -> bool:
+    if op in ('=', '!='):
+        if _blank(left) or _blank(right):
+            equal = _blank(left) and _blank(right)
+        else:
+            a, b = _number(left), _number(right)
+            equal = (a == b) if a is not None and b is not None else _text(left) == _text(right)
+        return equal if op == '=' else not equal
+
+    a, b = _number(left), _number(right)
+    if a is None or b is None:
+        a, b = _text(left), _text(right)
+    return {'<': a < b, '>': a > b, '<=': a <= b, '>=': a >= b}[op]
+
+
+def _find(needle, haystack, start=1, case_sensitive=True):
+    hay, sub = _text(haystack), _text(needle)
+    if not case_sensitive:
+        hay, sub = hay.lower(), sub.lower()
+    return hay.find(sub, max(int(_number(start) or 1) - 1, 0)) + 1
+
+
+def _regex_extract(text: str, pattern: str) -> Optional[str]:
+    match = re.search(pattern, text)
+    return match.group(0) if match else None
+
+
+FUNCTIONS = {
+    'AND': lambda *args: all(_truthy(a) for a in args),
+    'OR': lambda *args: any(_truthy(a) for a in args),
+    'NOT': lambda a: not _truthy(a),
+    'BLANK': lambda: None,
+    'TRUE': lambda: True,
+    'FALSE': lambda: False,
+    'LOWER': lambda a: _text(a).lower(),
+    'UPPER': lambda a: _text(a).upper(),
+    'TRIM': lambda a: _text(a).strip(),
+    'LEN': lambda a: len(_text(a)),
+    'FIND': lambda needle, hay, start=1: _find(needle, hay, start),
+    'SEARCH': lambda needle, hay, start=1: _find(needle, hay, start, case_sensitive=False) or None,
+    'VALUE': lambda a: _number(a),
+    'CONCATENATE': lambda *args: ''.join(_text(a) for a in args),
+    'ARRAYJOIN': lambda arr, sep=', ': _text(sep).join(_text(v) for v in (arr if isinstance(arr, list) else [arr]) if v is not None),
+    'REGEX_MATCH': lambda a, pattern: re.search(_text(pattern), _text(a)) is not None,
+    'REGEX_EXTRACT': lambda a, pattern: _regex_extract(_text(a), _text(pattern)),
+    'REGEX_REPLACE': lambda a, pattern, replacement: re.sub(_text(pattern), _text(replacement), _text(a)),
+    'IS_AFTER': lambda a, b: bool(_datetime(a) and _datetime(b) and _datetime(a) > _datetime(b)),
+    'IS_BEFORE': lambda a, b: bool(_datetime(a) and _datetime(b) and _datetime(a) < _datetime(b)),
+    'IS_SAME': lambda a, b, unit=None: bool(_datetime(a) and _datetime(b) and _datetime(a) == _datetime(b)),
+}
+
+# Functions that read the record itself rather than their arguments
+RECORD_FUNCTIONS = {
+    'RECORD_ID': lambda record: record.get('id'),
+    'CREATED_TIME': lambda record: record.get('createdTime'),
+    'LAST_MODIFIED_TIME': lambda record: record.get('lastModifiedTime') or record.get('createdTime'),
+}
+
+Evaluator = Callable[[dict], Any]
+
+
+class _Parser:
+    def __init__(self, tokens: List[tuple]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self, kind=None, value=None):
+        if self.pos >= len(self.tokens):
+            return None
+        tok = self.tokens[self.pos]
+        if kind and tok[0] != kind:
+            return None
+        if value is not None and tok[1] != value:
+            return None
+        return tok
+
+    def take(self, kind=None, value=None):
+        tok = self.peek(kind, value)
+        if tok is None:
+            found = self.tokens[self.pos] if self.pos < len(self.tokens) else 'end of formula'
+            raise FormulaError(f"expected {value or kind}, found {found}")
+        self.pos += 1
+        return tok
+
+    def parse(self) -> Evaluator:
+        node = self.comparison()
+        if self.pos != len(self.tokens):
+            raise FormulaError(f"unexpected {self.tokens[self.pos]}")
+        return node
+
+    def _binary(self, operand, ops, apply):
+        node = operand()
+        while self.peek('op') and self.peek('op')[1] in ops:
+            op = self.take('op')[1]
+            left, right = node, operand()
+            node = (lambda l, r, o: lambda rec: apply(o, l(rec), r(rec)))(left, right, op)
+        return node
+
+    def comparison(self):
+        return self._binary(self.concat, ('=', '!=', '<', '>', '<=', '>='), _compare)
+
+    def concat(self):
+        return self._binary(self.additive, ('&',), lambda o, a, b: _text(a) + _text(b))
+
+    def additive(self):
+        return self._binary(self.term, ('+', '-'),
+                            lambda o, a, b: (_number(a) or 0) + (_number(b) or 0) if o == '+'
+                            else (_number(a) or 0) - (_number(b) or 0))
+
+    def term(self):
+        def apply(o, a, b):
+            a, b = _number(a) or 0, _number(b) or 0
+            if o == '*':
+                return a * b
+            return a / b if b else None
+        return self._binary(self.unary, ('*', '/'), apply)
+
+    def unary(self):
+        if self.peek('op', '-'):
+            self.take()
+            inner = self.unary()
+            return lambda rec: -(_number(inner(rec)) or 0)
+        return self.primary()
+
+    def primary(self):
+        tok = self.peek()
+        if tok is None:
+            raise FormulaError("unexpected end of formula")
+        kind, value = tok
+
+        if kind in ('string', 'number'):
+            self.take()
+            return lambda rec: value
+        if kind == 'field':
+            self.take()
+            return lambda rec: rec.get('fields', {}).get(value)
+        if kind == 'punct' and value == '(':
+            self.take()
+            node = self.comparison()
+            self.take('punct', ')')
+            return node
+        if kind == 'ident':
+            self.take()
+            name = value.upper()
+            self.take('punct', '(')
+            args = []
+            if not self.peek('punct', ')'):
+                args.append(self.comparison())
+                while self.peek('punct', ','):
+                    self.take()
+                    args.append(self.comparison())
+            self.take('punct', ')')
+
+            if name in RECORD_FUNCTIONS:
+                func = RECORD_FUNCTIONS[name]
+                return lambda rec: func(rec)
+            if name == 'IF':
+                cond, then = args[0], args[1]
+                otherwise = args[2] if len(args) > 2 else (lambda rec: None)
+                return lambda rec: then(rec) if _truthy(cond(rec)) else otherwise(rec)
+            if name not in FUNCTIONS:
+                raise FormulaError(f"unsupported function {name}()")
+            func = FUNCTIONS[name]
+            return lambda rec: func(*(arg(rec) for arg in args))
+
+        raise FormulaError(f"unexpected {tok}")
+
+
+@lru_cache(maxsize=256)
+def compile_formula(formula: str) -> Evaluator:
+    """Compile once, then call the result with a record {'id', 'createdTime', 'fields'}"""
+    return _Parser(tokenize(formula)).parse()
+
+
+def matches(formula: str, record: dict) -> bool:
+    return _truthy(compile_formula(formula)(record))
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Local SQLite mirror of the Participants, Attendance and Administrators
+tables, refreshed incrementally.
+
+Each sync asks Airtable only for records changed since the previous one
+(filterByFormula on LAST_MODIFIED_TIME()); a periodic full pass picks up
+deletions. Scripts read the mirror with AirtableMirror.records(), and
+`serve` exposes a read-only, Airtable-compatible API so the dashboards can
+poll it instead of the base, plus the attendance page's check-in lookup
+index at /checkin-index (checkin_index.py). List responses also carry
+"mirror": {"table", "version"}, the table version the page was read at.
+
+    python airtable_mirror.py sync [--full]
+    python airtable_mirror.py serve --port 8788 --interval 30
+    python airtable_mirror.py status
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from airtable_client import AirtableClient, AirtableError
+from airtable_fetch import fetch_records
+from airtable_formula import FormulaError
+from airtable_views import MAX_PAGE_SIZE, field_list, list_view, public_record
+from checkin_index import build_checkin_index
+
+MIRROR_DB = 'airtable_mirror.db'
+AIRTABLE_BASE_ID = os.environ.get('AIRTABLE_BASE_ID', 'appZcPs57spwdoKQH')
+
+# mirror name -> Airtable table ID (same defaults as build.sh)
+MIRRORED_TABLES = {
+    'participants': os.environ.get('AIRTABLE_TABLE_ID', 'tblxMzwX1wWJKIOhY'),
+    'attendance': os.environ.get('AIRTABLE_ATTENDANCE_TABLE_ID', 'tblUnxGfJXHp2qSHp'),
+    'admin': os.environ.get('AIRTABLE_ADMIN_TABLE_ID', 'tblFQ7ofZ9CXZcydm'),
+}
+
+# Never copied into the mirror (and so never served by it)
+EXCLUDED_FIELDS = {'admin': {'password'}}
+
+# Re-read changes from slightly before the last sync in case the two clocks disagree
+CLOCK_SKEW = timedelta(seconds=60)
+# How often a sync is a full pass that also drops deleted records
+FULL_SYNC_INTERVAL = 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    table_name TEXT NOT NULL,
+    id TEXT NOT NULL,
+    created_time TEXT,
+    synced_at TEXT NOT NULL,
+    fields TEXT NOT NULL,
+    PRIMARY KEY (table_name, id)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    table_name TEXT PRIMARY KEY,
+    cursor TEXT,
+    last_full_sync REAL,
+    last_sync REAL,
+    record_count INTEGER
+);
+"""
+
+
+def iso_utc(moment: datetime) -> str:
+    return moment.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+class AirtableMirror:
+    """SQLite copy of MIRRORED_TABLES with incremental refresh"""
+
+    def __init__(self, client: Optional[AirtableClient] = None, db_path: str = MIRROR_DB,
+                 tables: Optional[Dict[str, str]] = None):
+        self.client = client
+        self.tables = dict(tables or MIRRORED_TABLES)
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        # Bumped on every change so readers can cache decoded rows
+        self.versions: Dict[str, int] = {name: 0 for name in self.tables}
+        self._cache: Dict[str, tuple] = {}
+        # Called as listener(name, version, upserted records, deleted ids) after each change
+        self.listeners: List[Callable[[str, int, List[dict], List[str]], None]] = []
+
+    def resolve(self, table: str) -> Optional[str]:
+        """Mirror name for a mirror name or Airtable table ID"""
+        if table in self.tables:
+            return table
+        return next((name for name, table_id in self.tables.items() if table_id == table), None)
+
+    def state(self, name: str) -> dict:
+        row = self.db.execute('SELECT cursor, last_full_sync, last_sync, record_count FROM sync_state '
+                              'WHERE table_name = ?', (name,)).fetchone()
+        if row is None:
+            return {'cursor': None, 'last_full_sync': None, 'last_sync': None, 'record_count': 0}
+        return dict(zip(('cursor', 'last_full_sync', 'last_sync', 'record_count'), row))
+
+    def _plan(self, name: str, full: bool) -> dict:
+        """
+        What the next sync of a table fetches. Incremental unless `full`, there
+        is no cursor yet, or the last full pass is older than FULL_SYNC_INTERVAL.
+        """
+        if self.client is None:
+            raise RuntimeError("mirror opened without an Airtable client")
+        state = self.state(name)
+        full = (full or not state['cursor'] or
+                (time.time() - (state['last_full_sync'] or 0)) > FULL_SYNC_INTERVAL)
+        return {
+            'started': time.time(),
+            'state': state,
+            'full': full,
+            # Taken before the request so changes made during the fetch are seen next time
+            'next_cursor': iso_utc(datetime.now(timezone.utc) - CLOCK_SKEW),
+            'formula': None if full else f"IS_AFTER(LAST_MODIFIED_TIME(), '{state['cursor']}')",
+        }
+
+    def sync(self, name: str, full: bool = False) -> dict:
+        """Bring one table up to date; see _plan() for when it is a full pass"""
+        plan = self._plan(name, full)
+        records = self.client.list_records(self.tables[name], formula=plan['formula'])
+        return self._store(name, plan, records)
+
+    def _store(self, name: str, plan: dict, records: List[dict]) -> dict:
+        started, state, full, next_cursor = plan['started'], plan['state'], plan['full'], plan['next_cursor']
+        excluded = EXCLUDED_FIELDS.get(name, set())
+        synced_at = iso_utc(datetime.now(timezone.utc))
+        rows = [(name, r['id'], r.get('createdTime'), synced_at,
+                 json.dumps({k: v for k, v in r['fields'].items() if k not in excluded}, ensure_ascii=False))
+                for r in records]
+
+        with self.lock, self.db:
+            # A delta re-reads the CLOCK_SKEW window, so keep only rows that really changed
+            stored_fields = {}
+            ids = [row[1] for row in rows]
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                stored_fields.update(self.db.execute(
+                    f"SELECT id, fields FROM records WHERE table_name = ? AND id IN ({','.join('?' * len(chunk))})",
+                    [name] + chunk))
+            rows = [row for row in rows if stored_fields.get(row[1]) != row[4]]
+            self.db.executemany(
+                'INSERT INTO records (table_name, id, created_time, synced_at, fields) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (table_name, id) DO UPDATE SET fields = excluded.fields, '
+                'synced_at = excluded.synced_at, created_time = excluded.created_time', rows)
+            gone = []
+            if full:
+                seen = {r['id'] for r in records}
+                stored = [row[0] for row in self.db.execute(
+                    'SELECT id FROM records WHERE table_name = ?', (name,))]
+                gone = [(name, record_id) for record_id in stored if record_id not in seen]
+                self.db.executemany('DELETE FROM records WHERE table_name = ? AND id = ?', gone)
+            count = self.db.execute('SELECT COUNT(*) FROM records WHERE table_name = ?', (name,)).fetchone()[0]
+            self.db.execute(
+                'INSERT INTO sync_state (table_name, cursor, last_full_sync, last_sync, record_count) '
+                'VALUES (?, ?, ?, ?, ?) ON CONFLICT (table_name) DO UPDATE SET cursor = excluded.cursor, '
+                'last_full_sync = excluded.last_full_sync, last_sync = excluded.last_sync, '
+                'record_count = excluded.record_count',
+                (name, next_cursor, started if full else state['last_full_sync'], started, count))
+            if rows or gone:
+                self.versions[name] = self.versions.get(name, 0) + 1
+            version = self.versions.get(name, 0)
+
+        if rows or gone:
+            upserted = [{'id': row[1], 'createdTime': row[2], 'fields': json.loads(row[4])} for row in rows]
+            for listener in self.listeners:
+                listener(name, version, upserted, [record_id for _, record_id in gone])
+
+        return {'table': name, 'mode': 'full' if full else 'delta', 'fetched': len(records),
+                'changed': len(rows), 'deleted': len(gone), 'records': count,
+                'seconds': round(time.time() - started, 3)}
+
+    def sync_all(self, full: bool = False) -> List[dict]:
+        """Sync every table; the fetches run concurrently under the client's rate limit"""
+        plans = {name: self._plan(name, full) for name in self.tables}
+        fetched = fetch_records(self.client, {name: {'table': self.tables[name], 'formula': plan['formula']}
+                                              for name, plan in plans.items()})
+        results = []
+        for name, plan in plans.items():
+            result = self._store(name, plan, fetched[name])
+            print(f"  ✓ {name}: {result['mode']}, {result['fetched']} fetched, {result['changed']} changed, "
+                  f"{result['deleted']} deleted, {result['records']} mirrored ({result['seconds']}s)")
+            results.append(result)
+        return results
+
+    def records(self, name: str) -> List[dict]:
+        """Mirrored records in Airtable's {'id', 'createdTime', 'fields'} shape"""
+        version = self.versions.get(name, 0)
+        cached = self._cache.get(name)
+        if cached and cached[0] == version:
+            return cached[1]
+        with self.lock:
+            rows = self.db.execute('SELECT id, created_time, fields FROM records WHERE table_name = ? '
+                                   'ORDER BY created_time, id', (name,)).fetchall()
+        result = [{'id': record_id, 'createdTime': created, 'fields': json.loads(fields)}
+                  for record_id, created, fields in rows]
+        self._cache[name] = (version, result)
+        return result
+
+    def find(self, name: str, field: str, value) -> List[dict]:
+        """Records whose `field` equals `value`, using SQLite's JSON functions"""
+        with self.lock:
+            rows = self.db.execute(
+                'SELECT id, created_time, fields FROM records WHERE table_name = ? '
+                'AND json_extract(fields, ?) = ?', (name, f'$."{field}"', value)).fetchall()
+        return [{'id': record_id, 'createdTime': created, 'fields': json.loads(fields)}
+                for record_id, created, fields in rows]
+
+    def status(self) -> dict:
+        return {name: self.state(name) for name in self.tables}
+
+
+def make_handler(mirror: AirtableMirror):
+    # (date, participants version, attendance version) -> encoded check-in index
+    checkin_indexes: Dict[tuple, bytes] = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body: dict):
+            payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Allow-Headers', 'Authorization, Content-Type')
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_OPTIONS(self):
+            self._send(204, {})
+
+        def _version_info(self, name: str, version: int) -> dict:
+            return {'table': name, 'version': version}
+
+        def _send_checkin_index(self, date: str):
+            key = (date, mirror.versions.get('participants', 0), mirror.versions.get('attendance', 0))
+            payload = checkin_indexes.get(key)
+            if payload is None:
+                index = build_checkin_index(mirror.records('participants'), mirror.records('attendance'), date or None)
+                payload = json.dumps(index, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                checkin_indexes.clear()
+                checkin_indexes[key] = payload
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = [p for p in url.path.split('/') if p]
+            if parts == ['status']:
+                self._send(200, mirror.status())
+                return
+            if parts == ['checkin-index']:
+                self._send_checkin_index(parse_qs(url.query).get('date', [''])[0])
+                return
+            # /v0/<base>/<table>[/<record>], the same shape as the Airtable API
+            if len(parts) < 3 or parts[0] != 'v0' or mirror.resolve(parts[2]) is None:
+                self._send(404, {'error': {'type': 'TABLE_NOT_FOUND', 'message': 'Not mirrored'}})
+                return
+
+            name = mirror.resolve(parts[2])
+            # Read before the rows: the page holds at least this version's changes
+            version = mirror.versions.get(name, 0)
+            rows = mirror.records(name)
+            if len(parts) > 3:
+                row = next((r for r in rows if r['id'] == parts[3]), None)
+                if row is None:
+                    self._send(404, {'error': {'type': 'NOT_FOUND', 'message': f'Record {parts[3]} not found'}})
+                else:
+                    self._send(200, public_record(row))
+                return
+
+            query = parse_qs(url.query)
+            try:
+                page_size = min(int(query.get('pageSize', [str(MAX_PAGE_SIZE)])[0]), MAX_PAGE_SIZE)
+                offset = int(query.get('offset', ['0'])[0] or 0)
+                view = list_view(rows, query)
+            except FormulaError as e:
+                self._send(422, {'error': {'type': 'INVALID_FILTER_BY_FORMULA', 'message': str(e)}})
+                return
+            except ValueError:
+                self._send(422, {'error': {'type': 'INVALID_REQUEST_UNKNOWN', 'message': 'Invalid request parameters'}})
+                return
+
+            fields = field_list(query)
+            body = {'records': [public_record(row, fields) for row in view[offset:offset + page_size]]}
+            if offset + page_size < len(view):
+                body['offset'] = str(offset + page_size)
+            body['mirror'] = self._version_info(name, version)
+            self._send(200, body)
+
+    return Handler
+
+
+def sync_forever(mirror: AirtableMirror, interval: float, stop: threading.Event):
+    while not stop.wait(interval):
+        try:
+            mirror.sync_all()
+        except AirtableError as e:
+            print(f"  ✗ Sync failed: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite mirror of the Airtable base')
+    parser.add_argument('command', choices=['sync', 'serve', 'status'])
+    parser.add_argument('--full', action='store_true', help='full pass (also removes deleted records)')
+    parser.add_argument('--db', default=MIRROR_DB)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8788)
+    parser.add_argument('--interval', type=float, default=30.0, help='seconds between syncs while serving')
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        for name, state in AirtableMirror(db_path=args.db).status().items():
+            print(f"  {name}: {state['record_count']} records, cursor {state['cursor']}")
+        return
+
+    api_key = os.environ.get('AIRTABLE_API_KEY')
+    if not api_key:
+        print("Please set the AIRTABLE_API_KEY environment variable")
+        sys.exit(1)
+    mirror = AirtableMirror(AirtableClient(api_key, AIRTABLE_BASE_ID), db_path=args.db)
+
+    print(f"Syncing {', '.join(mirror.tables)} into {args.db}...")
+    mirror.sync_all(full=args.full)
+    if args.command == 'sync':
+        return
+
+    stop = threading.Event()
+    threading.Thread(target=sync_forever, args=(mirror, args.interval, stop), daemon=True).start()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(mirror))
+    server.daemon_threads = True
+    print(f"✓ Mirror API on http://{args.host}:{args.port}/v0 (refresh every {args.interval:g}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        stop.set()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Airtable REST API, for benchmarking and testing the
+sync scripts and dashboards offline.
+
+Implements list (pageSize, offset, maxRecords, fields[], filterByFormula,
+sort), get, create and batch PATCH, with configurable latency and the
+5 requests/second/base limit (429 + optional Retry-After).
+
+    python airtable_mock_server.py --port 8787 --seed excel_analysis.json
+
+Point the Python client at it with AIRTABLE_API_URL=http://127.0.0.1:8787/v0,
+and the HTML pages with localStorage.setItem('AIRTABLE_API_URL', ...).
+"""
+
+import argparse
+import json
+import random
+import string
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from airtable_formula import FormulaError
+from airtable_views import MAX_PAGE_SIZE, field_list, list_view, public_record
+
+MAX_BATCH_SIZE = 10
+
+# Table IDs the pages use by default (see build.sh / .env.example)
+TABLE_IDS = {
+    'Participants': 'tblxMzwX1wWJKIOhY',
+    'Administrators': 'tblFQ7ofZ9CXZcydm',
+    'Attendance': 'tblUnxGfJXHp2qSHp',
+}
+
+
+def new_record_id() -> str:
+    return 'rec' + ''.join(random.choices(string.ascii_letters + string.digits, k=14))
+
+
+def timestamp() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+class MockBase:
+    """In-memory tables plus the per-base rate limit window"""
+
+    def __init__(self, rate_limit: float = 5.0, latency: float = 0.0, retry_after: Optional[float] = None):
+        self.tables: Dict[str, List[dict]] = {}
+        self.aliases: Dict[str, str] = {}
+        self.rate_limit = rate_limit
+        self.latency = latency
+        self.retry_after = retry_after
+        self.request_times: List[float] = []
+        self.stats = {'requests': 0, 'throttled': 0, 'by_method': {}}
+        self.lock = threading.Lock()
+
+    def table(self, name: str) -> Optional[List[dict]]:
+        """Look a table up by name or by its tbl... ID"""
+        return self.tables.get(self.aliases.get(name, name))
+
+    def add_table(self, name: str, table_id: Optional[str] = None) -> List[dict]:
+        if table_id:
+            self.aliases[table_id] = name
+        return self.tables.setdefault(name, [])
+
+    def new_row(self, fields: dict, record_id: Optional[str] = None,
+                created: Optional[str] = None) -> dict:
+        created = created or timestamp()
+        return {'id': record_id or new_record_id(), 'createdTime': created,
+                'lastModifiedTime': created, 'fields': dict(fields)}
+
+    def seed(self, table: str, records: List[dict]):
+        """records: list of field dicts (or full {'id', 'fields'} records)"""
+        rows = self.add_table(table)
+        for record in records:
+            if 'fields' in record:
+                rows.append(self.new_row(record['fields'], record.get('id'), record.get('createdTime')))
+            else:
+                rows.append(self.new_row(record))
+
+    def admit(self, method: str = 'GET') -> bool:
+        """Sliding one-second window, like Airtable's 5 requests/second/base"""
+        with self.lock:
+            now = time.monotonic()
+            self.stats['requests'] += 1
+            by_method = self.stats['by_method']
+            by_method[method] = by_method.get(method, 0) + 1
+            self.request_times = [t for t in self.request_times if now - t < 1.0]
+            if self.rate_limit and len(self.request_times) >= self.rate_limit:
+                self.stats['throttled'] += 1
+                return False
+            self.request_times.append(now)
+            return True
+
+
+def _error(error_type: str, message: str) -> dict:
+    return {'error': {'type': error_type, 'message': message}}
+
+
+def make_handler(base: MockBase):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _cors_headers(self):
+            # The dashboards call the API straight from the browser
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Allow-Headers', 'Authorization, Content-Type')
+            self.send_header('Access-Control-Allow-Methods', 'GET, POST, PATCH, OPTIONS')
+
+        def _send(self, status: int, body: dict, headers: Optional[dict] = None):
+            payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self._cors_headers()
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _read_body(self) -> dict:
+            length = int(self.headers.get('Content-Length') or 0)
+            raw = self.rfile.read(length) if length else b''
+            try:
+                return json.loads(raw or b'{}')
+            except json.JSONDecodeError:
+                return {}
+
+        def _route(self):
+            """-> (table name, record id or None) for /v0/<base>/<table>[/<record>]"""
+            parts = [p for p in urlparse(self.path).path.split('/') if p]
+            if len(parts) < 3 or parts[0] != 'v0':
+                return None, None
+            return parts[2], (parts[3] if len(parts) > 3 else None)
+
+        def _begin(self):
+            """Admit the request; returns (table rows, record id) or None once answered"""
+            # Always drain the body so a rejected request doesn't corrupt the keep-alive stream
+            self.body = self._read_body()
+            admitted = base.admit(self.command)
+            if base.latency:
+                time.sleep(base.latency)
+            if not admitted:
+                headers = {'Retry-After': str(base.retry_after)} if base.retry_after is not None else {}
+                self._send(429, {'errors': [{'error': 'RATE_LIMIT_REACHED',
+                                             'message': 'Rate limit exceeded. Please try again later'}]}, headers)
+                return None
+            if not self.headers.get('Authorization', '').startswith('Bearer '):
+                self._send(401, _error('AUTHENTICATION_REQUIRED', 'Authentication required'))
+                return None
+
+            table, record_id = self._route()
+            rows = base.table(table) if table else None
+            if rows is None:
+                self._send(404, _error('TABLE_NOT_FOUND', f'Could not find table {table}'))
+                return None
+            return rows, record_id
+
+        def _find(self, rows: List[dict], record_id: str) -> Optional[dict]:
+            return next((row for row in rows if row['id'] == record_id), None)
+
+        def do_OPTIONS(self):
+            # CORS preflight; not counted against the rate limit
+            self.send_response(204)
+            self._cors_headers()
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def do_GET(self):
+            route = self._begin()
+            if route is None:
+                return
+            rows, record_id = route
+
+            if record_id:
+                row = self._find(rows, record_id)
+                if row is None:
+                    self._send(404, _error('NOT_FOUND', f'Record {record_id} not found'))
+                else:
+                    self._send(200, public_record(row))
+                return
+
+            query = parse_qs(urlparse(self.path).query)
+            try:
+                page_size = min(int(query.get('pageSize', [str(MAX_PAGE_SIZE)])[0]), MAX_PAGE_SIZE)
+                offset = int(query.get('offset', ['0'])[0] or 0)
+                with base.lock:
+                    view = list_view(rows, query)
+            except FormulaError as e:
+                self._send(422, _error('INVALID_FILTER_BY_FORMULA', f'The formula for filtering records is invalid: {e}'))
+                return
+            except ValueError:
+                self._send(422, _error('INVALID_REQUEST_UNKNOWN', 'Invalid request parameters'))
+                return
+
+            fields = field_list(query)
+            body = {'records': [public_record(row, fields) for row in view[offset:offset + page_size]]}
+            if offset + page_size < len(view):
+                body['offset'] = str(offset + page_size)
+            self._send(200, body)
+
+        def do_POST(self):
+            route = self._begin()
+            if route is None:
+                return
+            rows, record_id = route
+            if record_id:
+                self._send(404, _error('NOT_FOUND', 'Could not find what you are looking for'))
+                return
+
+            body = self.body
+            single = 'records' not in body
+            records = [{'fields': body.get('fields', {})}] if single else body['records']
+            if len(records) > MAX_BATCH_SIZE:
+                self._send(422, _error('INVALID_RECORDS', f'At most {MAX_BATCH_SIZE} records per request'))
+                return
+
+            with base.lock:
+                created = [base.new_row(record.get('fields', {})) for record in records]
+                rows.extend(created)
+            result = [public_record(row) for row in created]
+            self._send(200, result[0] if single else {'records': result})
+
+        def do_PATCH(self):
+            route = self._begin()
+            if route is None:
+                return
+            rows, record_id = route
+
+            body = self.body
+            # Single-record PATCH /<table>/<id> behaves like a batch of one
+            records = [{'id': record_id, 'fields': body.get('fields', {})}] if record_id else body.get('records', [])
+            if len(records) > MAX_BATCH_SIZE:
+                self._send(422, _error('INVALID_RECORDS', f'At most {MAX_BATCH_SIZE} records per request'))
+                return
+
+            with base.lock:
+                by_id = {row['id']: row for row in rows}
+                missing = [r.get('id') for r in records if r.get('id') not in by_id]
+                if missing:
+                    self._send(404, _error('ROW_DOES_NOT_EXIST', f'Record {missing[0]} not found'))
+                    return
+                updated = []
+                modified = timestamp()
+                for record in records:
+                    row = by_id[record['id']]
+                    row['fields'].update(record.get('fields', {}))
+                    row['lastModifiedTime'] = modified
+                    updated.append(public_record(row))
+            self._send(200, updated[0] if record_id else {'records': updated})
+
+    return Handler
+
+
+def start_mock_server(base: MockBase, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    """Serve `base` on a background thread; port 0 picks a free port"""
+    server = ThreadingHTTPServer((host, port), make_handler(base))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def server_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f'http://{host}:{port}/v0'
+
+
+def participant_fields(participant: dict) -> dict:
+    """Airtable Participants fields for one excel_analysis.json row"""
+    pid = str(participant.get('P-ID') or '')
+    digits = ''.join(ch for ch in pid if ch.isdigit())
+    name_key = next((k for k in participant if k.startswith('What is your full name')), None)
+    fields = {
+        'ID': int(digits) if digits else None,
+        'P-ID': pid,
+        'A-ID': participant.get('A-ID'),
+        'name': participant.get(name_key) if name_key else None,
+        'setDate': participant.get('setDate'),
+        'setTime': participant.get('setTime'),
+        'status': 'Confirmed',
+    }
+    return {k: v for k, v in fields.items() if v not in (None, '')}
+
+
+def synthetic_participants(count: int) -> List[dict]:
+    dates, times = ['9/22', '9/23', '9/24', '9/25'], ['10:00', '11:00', '13:00', '14:00', '15:00', '16:00']
+    rng = random.Random(count)
+    return [{
+        'ID': i,
+        'P-ID': f'P{i:03d}',
+        'A-ID': f'A{100 + i}',
+        'name': f'PARTICIPANT {i}',
+        'setDate': rng.choice(dates),
+        'setTime': rng.choice(times),
+        'status': rng.choice(['Confirmed'] * 8 + ['Cancelled', 'Duplicate']),
+    } for i in range(1, count + 1)]
+
+
+def seed_default_tables(base: MockBase, analysis_path: Optional[str] = None, synthetic: int = 0):
+    """Participants (from excel_analysis.json or synthetic), Administrators and an empty Attendance"""
+    participants = base.add_table('Participants', TABLE_IDS['Participants'])
+    if analysis_path:
+        with open(analysis_path, 'r', encoding='utf-8') as f:
+            analysis_data = json.load(f)
+        base.seed('Participants', [participant_fields(p) for p in analysis_data.get('participant_data', [])])
+    if synthetic:
+        base.seed('Participants', synthetic_participants(synthetic))
+
+    base.add_table('Administrators', TABLE_IDS['Administrators'])
+    base.seed('Administrators', [
+        {'username': 'admin', 'password': 'admin123', 'name': 'Mock Admin', 'userType': 'admin'},
+        {'username': 'staff', 'password': 'staff123', 'name': 'Mock Staff', 'userType': 'staff'},
+    ])
+    base.add_table('Attendance', TABLE_IDS['Attendance'])
+    return len(participants)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local Airtable-compatible mock server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every request')
+    parser.add_argument('--rate', type=float, default=5.0, help='requests per second before 429 (0 = unlimited)')
+    parser.add_argument('--retry-after', type=float, default=None, help='Retry-After header sent with 429s')
+    parser.add_argument('--seed', metavar='JSON', help='seed Participants from excel_analysis.json')
+    parser.add_argument('--synthetic', type=int, default=0, help='add N synthetic participants')
+    args = parser.parse_args()
+
+    base = MockBase(rate_limit=args.rate, latency=args.latency, retry_after=args.retry_after)
+    count = seed_default_tables(base, args.seed, args.synthetic)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(base))
+    server.daemon_threads = True
+
+    print(f"✓ Mock Airtable listening on {server_url(server)}")
+    print(f"  Tables: {', '.join(f'{name} ({len(rows)})' for name, rows in base.tables.items())}")
+    limit = f"{args.rate:g} req/s limit" if args.rate else "no rate limit"
+    print(f"  {count} participants, {args.latency * 1000:.0f} ms latency, {limit}")
+    print(f"  export AIRTABLE_API_URL={server_url(server)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nRequests: {base.stats['requests']} ({base.stats['throttled']} throttled)")
+
+
+if __name__ == "__main__":
+    main()
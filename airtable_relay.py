@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Change relay for the dashboards
+
+One process keeps the SQLite mirror (airtable_mirror.py) up to date
+with a delta sync every few seconds, and pushes every change to any
+number of open dashboards over Server-Sent Events. Airtable sees the same
+few requests per interval however many staff have a dashboard open.
+
+    GET /events?since=<event id>          text/event-stream
+    GET /v0/<base>/<table>[/<record>]     read API, same as the mirror's
+    GET /status
+
+List responses from the read API carry "mirror": {"table", "version",
+"epoch"}. A page connects with ?since= built from the versions it loaded,
+so changes committed between its load and the stream opening are still
+pushed (airtable-relay.js does this).
+
+Every table has a version number that goes up with each change. Events:
+
+    hello   {"epoch", "versions": {table: version}}
+    change  {"table", "version", "upserted": [records], "deleted": [ids]}
+    reset   {"table", "version"}    too far behind: reload the table from /v0
+
+Each change's SSE id is "<epoch>|table:version,...". EventSource sends
+it back as Last-Event-ID after a reconnect, and the stream resumes from
+there. A relay restart (new epoch) resets every table. Tables missing
+from ?since= are taken as current.
+
+    python airtable_relay.py --port 8789 --interval 10
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from http.server import ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from airtable_client import AirtableClient
+from airtable_mirror import AIRTABLE_BASE_ID, MIRROR_DB, AirtableMirror, sync_forever
+from airtable_mirror import make_handler as mirror_handler
+
+# Changes kept per table for clients catching up; older gaps get a reset
+HISTORY_SIZE = 200
+# Comment line sent to idle streams so proxies don't close them
+KEEPALIVE_SECONDS = 15
+
+
+class ChangeFeed:
+    """Per-table change history fed by the mirror, with a condition to wake streams"""
+
+    def __init__(self, mirror: AirtableMirror, history: int = HISTORY_SIZE):
+        self.mirror = mirror
+        self.epoch = str(int(time.time()))
+        self.changes: Dict[str, deque] = {name: deque(maxlen=history) for name in mirror.tables}
+        # Latest published version per table; moves together with self.changes
+        self.current: Dict[str, int] = {name: mirror.versions.get(name, 0) for name in mirror.tables}
+        self.condition = threading.Condition()
+        mirror.listeners.append(self.publish)
+
+    def publish(self, table: str, version: int, upserted: List[dict], deleted: List[str]):
+        with self.condition:
+            self.changes[table].append({'table': table, 'version': version,
+                                        'upserted': upserted, 'deleted': deleted})
+            self.current[table] = version
+            self.condition.notify_all()
+
+    def versions(self) -> Dict[str, int]:
+        with self.condition:
+            return dict(self.current)
+
+    def event_id(self, versions: Dict[str, int]) -> str:
+        return f"{self.epoch}|" + ','.join(f'{name}:{version}' for name, version in versions.items())
+
+    def parse_event_id(self, event_id: str) -> Optional[Dict[str, int]]:
+        """Versions a client has seen, or None if they are from another relay run"""
+        epoch, _, versions = (event_id or '').partition('|')
+        if epoch != self.epoch:
+            return None
+        seen = {}
+        for item in versions.split(','):
+            name, _, version = item.partition(':')
+            if name in self.changes and version.isdigit():
+                seen[name] = int(version)
+        return seen
+
+    def pending(self, seen: Dict[str, int]) -> List[tuple]:
+        """
+        (event, payload) pairs that bring `seen` up to date, oldest first:
+        each retained change the client hasn't had, or a reset when the
+        history no longer reaches back to its version. Updates `seen`.
+        """
+        events = []
+        with self.condition:
+            for name, history in self.changes.items():
+                current = self.current[name]
+                known = seen.get(name, 0)
+                if known >= current:
+                    continue
+                missed = [change for change in history if change['version'] > known]
+                if not missed or missed[0]['version'] != known + 1:
+                    events.append(('reset', {'table': name, 'version': current}))
+                else:
+                    events.extend(('change', change) for change in missed)
+                seen[name] = current
+        return events
+
+    def wait(self, seen: Dict[str, int], timeout: float):
+        """Block until some table is past `seen`, or the timeout"""
+        with self.condition:
+            self.condition.wait_for(lambda: any(version > seen.get(name, 0)
+                                                for name, version in self.current.items()), timeout)
+
+
+def make_handler(feed: ChangeFeed):
+    Base = mirror_handler(feed.mirror)
+
+    class Handler(Base):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path.rstrip('/') != '/events':
+                super().do_GET()
+                return
+            query = parse_qs(url.query)
+            last_id = self.headers.get('Last-Event-ID') or query.get('since', [''])[0]
+            self._stream(feed.parse_event_id(last_id), restarted=bool(last_id))
+
+        def _version_info(self, name: str, version: int) -> dict:
+            return dict(super()._version_info(name, version), epoch=feed.epoch)
+
+        def _event(self, event: str, payload: dict, event_id: Optional[str] = None):
+            message = ''
+            if event_id:
+                message += f'id: {event_id}\n'
+            message += f'event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n'
+            self.wfile.write(message.encode('utf-8'))
+
+        def _stream(self, seen: Optional[Dict[str, int]], restarted: bool = False):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+
+            resets = []
+            if seen is None:
+                # New client: it loads the tables itself, then follows changes. A client
+                # whose versions come from another relay run reloads everything.
+                seen = feed.versions()
+                if restarted:
+                    resets = list(seen)
+            else:
+                # Tables the client never loaded from us are not its concern
+                seen = dict(feed.versions(), **seen)
+            try:
+                self._event('hello', {'epoch': feed.epoch, 'versions': dict(seen)}, feed.event_id(seen))
+                for name in resets:
+                    self._event('reset', {'table': name, 'version': seen[name]}, feed.event_id(seen))
+                self.wfile.flush()
+                while True:
+                    for event, payload in feed.pending(seen):
+                        self._event(event, payload, feed.event_id(seen))
+                    self.wfile.write(b': keepalive\n\n')
+                    self.wfile.flush()
+                    feed.wait(seen, KEEPALIVE_SECONDS)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Push Airtable changes to the dashboards over SSE')
+    parser.add_argument('--db', default=MIRROR_DB)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8789)
+    parser.add_argument('--interval', type=float, default=10.0, help='seconds between delta syncs')
+    args = parser.parse_args()
+
+    api_key = os.environ.get('AIRTABLE_API_KEY')
+    if not api_key:
+        print("Please set the AIRTABLE_API_KEY environment variable")
+        sys.exit(1)
+    mirror = AirtableMirror(AirtableClient(api_key, AIRTABLE_BASE_ID), db_path=args.db)
+    feed = ChangeFeed(mirror)
+
+    print(f"Syncing {', '.join(mirror.tables)} into {args.db}...")
+    mirror.sync_all()
+
+    stop = threading.Event()
+    threading.Thread(target=sync_forever, args=(mirror, args.interval, stop), daemon=True).start()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(feed))
+    server.daemon_threads = True
+    print(f"✓ Relay on http://{args.host}:{args.port} (events at /events, read API at /v0, "
+          f"sync every {args.interval:g}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        stop.set()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+List-request semantics shared by the local Airtable mock server and the
+read-through mirror: filterByFormula, sort[], maxRecords and fields[]
+applied to rows shaped {'id', 'createdTime', 'fields'}
+"""
+
+import re
+from typing import Dict, List, Optional
+
+from airtable_formula import FormulaError, compile_formula, matches
+
+MAX_PAGE_SIZE = 100
+
+
+def public_record(row: dict, fields: Optional[List[str]] = None) -> dict:
+    """Strip internal bookkeeping and apply a fields[] projection"""
+    values = row['fields'] if not fields else {k: v for k, v in row['fields'].items() if k in fields}
+    return {'id': row['id'], 'createdTime': row['createdTime'], 'fields': dict(values)}
+
+
+def _sort_spec(query: Dict[str, List[str]]) -> List[tuple]:
+    """sort[0][field]=setDate&sort[0][direction]=desc -> [('setDate', True)]"""
+    spec = {}
+    for key, values in query.items():
+        match = re.fullmatch(r'sort\[(\d+)\]\[(field|direction)\]', key)
+        if match:
+            spec.setdefault(int(match.group(1)), {})[match.group(2)] = values[0]
+    return [(s['field'], s.get('direction', 'asc') == 'desc') for _, s in sorted(spec.items()) if 'field' in s]
+
+
+def field_list(query: Dict[str, List[str]]) -> List[str]:
+    """fields[]=a&fields[]=b (or fields[0]=a / fields=a)"""
+    fields = []
+    for key, values in query.items():
+        if key in ('fields', 'fields[]') or re.fullmatch(r'fields\[\d+\]', key):
+            fields.extend(values)
+    return fields
+
+
+def _sort_key(value):
+    # Blanks first, numbers before text, like Airtable's ascending order
+    if value is None or value == '':
+        return (0, 0, '')
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (1, value, '')
+    return (2, 0, str(value))
+
+
+def list_view(rows: List[dict], query: Dict[str, List[str]]) -> List[dict]:
+    """Filter and sort a table for a list request (raises FormulaError)"""
+    formula = query.get('filterByFormula', [''])[0].strip()
+    if formula:
+        compile_formula(formula)
+        try:
+            rows = [row for row in rows if matches(formula, row)]
+        except TypeError as e:  # wrong number of function arguments
+            raise FormulaError(str(e))
+    for field, descending in reversed(_sort_spec(query)):
+        rows = sorted(rows, key=lambda row: _sort_key(row['fields'].get(field)), reverse=descending)
+    max_records = query.get('maxRecords', [''])[0]
+    if max_records:
+        rows = rows[:int(max_records)]
+    return rows
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Versioned binary snapshot of excel_analysis.json
+
+Layout (all integers little-endian):
+    b'FAMSNAP' + format version (1 byte)
+    header length (uint32) + msgpack header
+        {'version', 'created', 'sections': {name: {'offset', 'length'}},
+         'json': {'size', 'mtime_ns'} of the excel_analysis.json written with it}
+    section payloads, each an independent msgpack document
+
+Sections: 'meta' (total_participants, columns), 'summary_stats',
+'participant_data'. Readers memory-map the file and decode only the
+sections they ask for. excel_analysis.json is still exported next to the
+snapshot for the browser dashboards and older scripts. load_analysis()
+uses the snapshot only while the JSON still matches the stamp in its
+header, so a JSON rewritten by anything else wins.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+try:
+    import msgpack
+except ImportError:  # optional; without it everything goes through JSON
+    msgpack = None
+
+from json_output import dump_json, to_plain
+from stage_profile import profiled
+
+MAGIC = b'FAMSNAP'
+FORMAT_VERSION = 1
+
+SNAPSHOT_FILE = 'excel_analysis.snapshot'
+JSON_FILE = 'excel_analysis.json'
+
+SECTIONS = ('meta', 'summary_stats', 'participant_data')
+META_KEYS = ('total_participants', 'columns')
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _split_sections(analysis_data: dict) -> dict:
+    meta = {k: analysis_data[k] for k in META_KEYS if k in analysis_data}
+    # Keep any extra top-level keys so a round trip is lossless
+    meta.update({k: v for k, v in analysis_data.items()
+                 if k not in META_KEYS and k not in SECTIONS})
+    return {
+        'meta': meta,
+        'summary_stats': analysis_data.get('summary_stats', {}),
+        'participant_data': analysis_data.get('participant_data', []),
+    }
+
+
+def json_stamp(path: str = JSON_FILE) -> Optional[dict]:
+    """Size and mtime of a JSON export, or None if there is none"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def write_snapshot(analysis_data: dict, path: str = SNAPSHOT_FILE, json_path: Optional[str] = JSON_FILE,
+                   default=None) -> dict:
+    """
+    Write the snapshot atomically (temp file + rename); returns the header.
+    The header stamps `json_path` as holding the same data, so values are
+    converted exactly as the JSON export converts them (numpy -> numbers,
+    NaN -> None, the rest through `default`).
+    """
+    if msgpack is None:
+        raise SnapshotError("msgpack is not installed (pip install msgpack)")
+
+    payloads = {name: msgpack.packb(to_plain(value, default), use_bin_type=True)
+                for name, value in _split_sections(analysis_data).items()}
+
+    # Offsets are relative to the end of the header so the header size doesn't matter
+    sections, offset = {}, 0
+    for name in SECTIONS:
+        sections[name] = {'offset': offset, 'length': len(payloads[name])}
+        offset += len(payloads[name])
+
+    header = {'version': FORMAT_VERSION, 'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'sections': sections}
+    stamp = json_stamp(json_path) if json_path else None
+    if stamp is not None:
+        header['json'] = stamp
+    header_bytes = msgpack.packb(header, use_bin_type=True)
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC + bytes([FORMAT_VERSION]))
+        f.write(struct.pack('<I', len(header_bytes)))
+        f.write(header_bytes)
+        for name in SECTIONS:
+            f.write(payloads[name])
+    os.replace(tmp_path, path)
+
+    print(f"✓ Wrote {path} ({offset + len(header_bytes) + 12:,} bytes, format v{FORMAT_VERSION})")
+    return header
+
+
+def _read_header(buf) -> tuple:
+    if buf[:len(MAGIC)] != MAGIC:
+        raise SnapshotError("not an analysis snapshot")
+    version = buf[len(MAGIC)]
+    if version > FORMAT_VERSION:
+        raise SnapshotError(f"snapshot format v{version} is newer than this reader (v{FORMAT_VERSION})")
+    (header_len,) = struct.unpack_from('<I', buf, len(MAGIC) + 1)
+    body_start = len(MAGIC) + 5 + header_len
+    header = msgpack.unpackb(buf[len(MAGIC) + 5:body_start], raw=False)
+    return header, body_start
+
+
+def read_header(path: str = SNAPSHOT_FILE) -> dict:
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        return _read_header(buf)[0]
+
+
+def read_snapshot(path: str = SNAPSHOT_FILE, sections: Optional[Iterable[str]] = None) -> dict:
+    """
+    Decode the requested sections (default: all) into the familiar
+    excel_analysis.json shape; sections not requested are simply absent.
+    """
+    if msgpack is None:
+        raise SnapshotError("msgpack is not installed (pip install msgpack)")
+
+    wanted = list(sections) if sections is not None else list(SECTIONS)
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        header, body_start = _read_header(buf)
+        result = {}
+        for name in wanted:
+            info = header['sections'].get(name)
+            if info is None:
+                raise SnapshotError(f"section '{name}' not in snapshot")
+            start = body_start + info['offset']
+            value = msgpack.unpackb(buf[start:start + info['length']], raw=False, strict_map_key=False)
+            if name == 'meta':
+                result.update(value)
+            else:
+                result[name] = value
+    return result
+
+
+def snapshot_is_current() -> bool:
+    """
+    True when the snapshot holds the same data as excel_analysis.json: its
+    header stamp matches the JSON (snapshots without a stamp fall back to
+    comparing mtimes), or there is no JSON at all.
+    """
+    if msgpack is None or not Path(SNAPSHOT_FILE).exists():
+        return False
+    stamp = json_stamp(JSON_FILE)
+    if stamp is None:
+        return True
+    try:
+        header = read_header(SNAPSHOT_FILE)
+    except (OSError, ValueError, SnapshotError):
+        return False
+    if 'json' in header:
+        return header['json'] == stamp
+    return Path(SNAPSHOT_FILE).stat().st_mtime_ns >= stamp['mtime_ns']
+
+
+@profiled('load analysis')
+def load_analysis(sections: Optional[Iterable[str]] = None) -> dict:
+    """
+    Load analysis data, preferring the snapshot while it matches the JSON
+    export.
+    """
+    if snapshot_is_current():
+        return read_snapshot(SNAPSHOT_FILE, sections)
+
+    with open(JSON_FILE, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if sections is None:
+        return data
+    wanted = set(sections)
+    return {k: v for k, v in data.items()
+            if (k in SECTIONS and k in wanted) or (k not in SECTIONS and 'meta' in wanted)}
+
+
+def save_analysis(analysis_data: dict, json_export: bool = True, default=None):
+    """
+    Write the JSON export, then the snapshot (when msgpack is available)
+    stamped with it. Without the export the snapshot is unstamped and wins
+    as long as it is newer than the JSON.
+    """
+    if json_export or msgpack is None:
+        dump_json(analysis_data, JSON_FILE, default=default)
+    if msgpack is not None:
+        write_snapshot(analysis_data, SNAPSHOT_FILE, JSON_FILE if json_export else None, default=default)
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'info'
+
+    if command == 'import':
+        # excel_analysis.json -> snapshot
+        with open(JSON_FILE, 'r', encoding='utf-8') as f:
+            write_snapshot(json.load(f))
+    elif command == 'export':
+        # snapshot -> excel_analysis.json, restamping the snapshot
+        save_analysis(read_snapshot())
+    elif command == 'info':
+        header = read_header(SNAPSHOT_FILE)
+        print(f"{SNAPSHOT_FILE}: format v{header['version']}, created {header['created']}")
+        print(f"  in step with {JSON_FILE}: {'yes' if snapshot_is_current() else 'no'}")
+        for name, info in header['sections'].items():
+            print(f"  {name}: {info['length']:,} bytes")
+    else:
+        print("Usage: python analysis_snapshot.py [import|export|info]")
+        sys.exit(1)
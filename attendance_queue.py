@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Write-behind queue for check-ins
+
+When a session opens, dozens of participants arrive within minutes and
+every phone sent its own POST/PATCH to the Attendance table, so the base's
+5 requests/second limit turned into failed check-ins. This server accepts
+a check-in, stores it in a SQLite queue and answers 202 at once. Writer
+threads then drain the queue in 10-record batches (PATCHes to the same
+record are merged) through one AirtableClient, whose token bucket keeps
+every write under the rate limit.
+
+    POST /checkins          {"id"?, "recordId"?, "fields": {...}} -> 202 {"id", "status"}
+                            id: client-chosen key, so a retried POST is not queued twice
+                            recordId: Attendance record to update; without it a record is created
+    GET  /checkins/<id>     {"id", "status", "recordId", "error", "attempts"}; 404 {"status": "missing"}
+    GET  /checkins?ids=a,b  the same for several check-ins
+    GET  /status            queue counts
+
+A second create for a participant and checkDate whose first create is not
+written yet (staff pressing submit again) follows the first one: it waits
+until that record exists and is then sent as a PATCH to it, so Attendance
+never gets two records for one check-in. Updates wait while another PATCH
+to the same record is in flight.
+
+Status goes queued -> sending -> written (or failed). A create whose POST
+times out, drops or gets a 5xx may have been written anyway, so it is not
+resent: it goes to unknown until a lookup in Airtable either finds its
+record (written) or doesn't (queued again). Check-ins still queued or
+sending when the server stops are picked up again on restart; creates that
+were in flight go through the same lookup, so nothing is written twice.
+
+    python attendance_queue.py --port 8792 [--db attendance_queue.db]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from airtable_client import MAX_BATCH_SIZE, AirtableClient, AirtableError, chunked, formula_any_of
+
+QUEUE_DB = 'attendance_queue.db'
+AIRTABLE_BASE_ID = os.environ.get('AIRTABLE_BASE_ID', 'appZcPs57spwdoKQH')
+ATTENDANCE_TABLE_ID = os.environ.get('AIRTABLE_ATTENDANCE_TABLE_ID', 'tblUnxGfJXHp2qSHp')
+
+# A batch that isn't full waits this long for more check-ins before it is sent
+LINGER_SECONDS = 0.5
+# Attempts before a check-in is marked failed on server/connection errors
+MAX_ATTEMPTS = 5
+# An unknown create is looked up only after this long, so a POST Airtable
+# was still committing when the client gave up has landed by then
+UNKNOWN_SETTLE_SECONDS = 10.0
+# participantIDs per lookup, keeping the formula well under the URL limit
+LOOKUP_CHUNK = 100
+WRITERS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkins (
+    id TEXT PRIMARY KEY,
+    record_id TEXT,
+    fields TEXT NOT NULL,
+    status TEXT NOT NULL,
+    airtable_id TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    sent REAL,
+    checkin_key TEXT,
+    follows TEXT
+);
+CREATE INDEX IF NOT EXISTS checkins_status ON checkins (status, created);
+"""
+# Columns added after the first release; older queue files get them on open
+ADDED_COLUMNS = {'checkin_key': 'TEXT', 'follows': 'TEXT'}
+CHECKIN_KEY_INDEX = 'CREATE INDEX IF NOT EXISTS checkins_key ON checkins (checkin_key, created)'
+# Claimable: queued, not waiting for an earlier create, and no PATCH to the same record in flight
+CLAIMABLE = ("status = 'queued' AND follows IS NULL AND (record_id IS NULL OR record_id NOT IN "
+             "(SELECT record_id FROM checkins WHERE status = 'sending' AND record_id IS NOT NULL))")
+
+
+def checkin_key(fields: dict) -> Optional[str]:
+    """One Attendance record per participant and appointment date"""
+    if not fields.get('participantID'):
+        return None
+    return json.dumps([fields['participantID'], fields.get('checkDate') or ''])
+
+
+class AttendanceQueue:
+    """Durable check-in queue drained into Attendance in batches"""
+
+    def __init__(self, client: AirtableClient, db_path: str = QUEUE_DB, table: str = ATTENDANCE_TABLE_ID,
+                 linger: float = LINGER_SECONDS):
+        self.client = client
+        self.table = table
+        self.linger = linger
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        # An acknowledged check-in must survive a power cut
+        self.db.execute('PRAGMA synchronous=FULL')
+        self.db.executescript(SCHEMA)
+        columns = {row[1] for row in self.db.execute('PRAGMA table_info(checkins)')}
+        for column, kind in ADDED_COLUMNS.items():
+            if column not in columns:
+                self.db.execute(f'ALTER TABLE checkins ADD COLUMN {column} {kind}')
+        self.db.execute(CHECKIN_KEY_INDEX)
+        self.db.commit()
+        self.lock = threading.Lock()
+        self.arrived = threading.Condition(self.lock)
+        # One writer at a time looks up unknown creates; the others keep draining
+        self.reconciling = threading.Lock()
+        self.next_reconcile = 0.0
+
+    # --- intake ---
+
+    def enqueue(self, fields: dict, record_id: Optional[str] = None, item_id: Optional[str] = None) -> dict:
+        """
+        Store one check-in; re-sending an existing id returns its current
+        status. A create for a check-in whose earlier create is still in the
+        queue follows it (or, once written, becomes a PATCH to its record).
+        """
+        item_id = item_id or uuid.uuid4().hex
+        key = checkin_key(fields) if record_id is None else None
+        follows = None
+        now = time.time()
+        with self.arrived:
+            if key and not self.db.execute('SELECT 1 FROM checkins WHERE id = ?', (item_id,)).fetchone():
+                lead = self.db.execute("SELECT id, status, airtable_id FROM checkins WHERE checkin_key = ? "
+                                       "AND record_id IS NULL AND follows IS NULL AND status != 'failed' "
+                                       "ORDER BY created DESC LIMIT 1", (key,)).fetchone()
+                if lead and lead[1] == 'written':
+                    record_id = lead[2]
+                elif lead:
+                    follows = lead[0]
+            self.db.execute('INSERT OR IGNORE INTO checkins (id, record_id, fields, status, created, updated, '
+                            'checkin_key, follows) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                            (item_id, record_id, json.dumps(fields, ensure_ascii=False), 'queued', now, now,
+                             key, follows))
+            self.db.commit()
+            self.arrived.notify()
+        return self.get([item_id])[0]
+
+    def get(self, ids: List[str]) -> List[dict]:
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT id, status, airtable_id, error, attempts FROM checkins "
+                f"WHERE id IN ({','.join('?' * len(ids))})", ids).fetchall()
+        found = {row[0]: {'id': row[0], 'status': row[1], 'recordId': row[2], 'error': row[3], 'attempts': row[4]}
+                 for row in rows}
+        return [found.get(item_id, {'id': item_id, 'status': 'missing'}) for item_id in ids]
+
+    def status(self) -> dict:
+        with self.lock:
+            counts = dict(self.db.execute('SELECT status, COUNT(*) FROM checkins GROUP BY status').fetchall())
+            oldest = self.db.execute("SELECT MIN(created) FROM checkins WHERE status = 'queued'").fetchone()[0]
+        return {'counts': counts, 'oldest_queued_seconds': round(time.time() - oldest, 1) if oldest else 0}
+
+    # --- draining ---
+
+    def _release_followers(self):
+        """
+        Check-ins following a create that has settled: a written create
+        turns them into PATCHes to its record; a failed one hands the
+        create over to the earliest follower. Call with the lock held.
+        """
+        rows = self.db.execute("SELECT f.id, l.status, l.airtable_id, l.id FROM checkins f "
+                               "JOIN checkins l ON l.id = f.follows "
+                               "WHERE f.follows IS NOT NULL AND l.status IN ('written', 'failed') "
+                               "ORDER BY f.created").fetchall()
+        successor = {}
+        for item_id, status, airtable_id, lead in rows:
+            if status == 'written':
+                self.db.execute('UPDATE checkins SET record_id = ?, follows = NULL WHERE id = ?', (airtable_id, item_id))
+            elif lead not in successor:
+                successor[lead] = item_id
+                self.db.execute('UPDATE checkins SET follows = NULL WHERE id = ?', (item_id,))
+            else:
+                self.db.execute('UPDATE checkins SET follows = ? WHERE id = ?', (successor[lead], item_id))
+
+    def _claim(self) -> List[dict]:
+        """
+        Take up to one batch of queued check-ins (all creates or all
+        updates) and mark them sending. Waits up to `linger` for a batch
+        to fill; returns [] if the queue is empty.
+        """
+        with self.arrived:
+            while True:
+                self._release_followers()
+                oldest = self.db.execute(f"SELECT created, record_id IS NULL FROM checkins WHERE {CLAIMABLE} "
+                                         f"ORDER BY created LIMIT 1").fetchone()
+                if oldest is None:
+                    return []
+                creates = bool(oldest[1])
+                kind = 'record_id IS NULL' if creates else 'record_id IS NOT NULL'
+                rows = self.db.execute(f"SELECT id, record_id, fields FROM checkins WHERE {CLAIMABLE} "
+                                       f"AND {kind} ORDER BY created LIMIT 100").fetchall()
+                groups = len(rows) if creates else len({row[1] for row in rows})
+                remaining = oldest[0] + self.linger - time.time()
+                if groups >= MAX_BATCH_SIZE or remaining <= 0:
+                    break
+                self.arrived.wait(remaining)
+
+            # Updates to the same record become one PATCH, later fields winning
+            batch: 'OrderedDict[str, dict]' = OrderedDict()
+            for item_id, record_id, fields in rows:
+                key = item_id if creates else record_id
+                if key not in batch:
+                    if len(batch) == MAX_BATCH_SIZE:
+                        continue
+                    batch[key] = {'record_id': record_id, 'fields': {}, 'ids': []}
+                batch[key]['fields'].update(json.loads(fields))
+                batch[key]['ids'].append(item_id)
+
+            claimed = [item_id for entry in batch.values() for item_id in entry['ids']]
+            now = time.time()
+            self.db.executemany("UPDATE checkins SET status = 'sending', sent = ?, updated = ? WHERE id = ?",
+                                [(now, now, item_id) for item_id in claimed])
+            self.db.commit()
+        return list(batch.values())
+
+    def _finish(self, entries: List[dict], status: str, airtable_ids: Optional[List[Optional[str]]] = None,
+                error: Optional[str] = None):
+        now = time.time()
+        rows = []
+        for index, entry in enumerate(entries):
+            airtable_id = airtable_ids[index] if airtable_ids else entry['record_id']
+            rows.extend((status, airtable_id, error, now, item_id) for item_id in entry['ids'])
+        with self.arrived:
+            if status == 'queued':
+                # Retry later; give up after MAX_ATTEMPTS
+                self.db.executemany("UPDATE checkins SET status = CASE WHEN attempts + 1 >= ? THEN 'failed' "
+                                    "ELSE 'queued' END, attempts = attempts + 1, airtable_id = ?, error = ?, "
+                                    "updated = ? WHERE id = ?",
+                                    [(MAX_ATTEMPTS,) + row[1:] for row in rows])
+            else:
+                self.db.executemany('UPDATE checkins SET status = ?, airtable_id = ?, error = ?, updated = ?, '
+                                    'attempts = attempts + 1 WHERE id = ?', rows)
+            self.db.commit()
+            # Followers of these creates and PATCHes held back behind them can go now
+            self.arrived.notify_all()
+
+    def _write(self, entries: List[dict]) -> bool:
+        """Send one batch; False if it should be retried after a pause"""
+        creates = entries[0]['record_id'] is None
+        method = 'POST' if creates else 'PATCH'
+        records = [{'fields': entry['fields']} if creates else {'id': entry['record_id'], 'fields': entry['fields']}
+                   for entry in entries]
+        written, failed = self.client.write_records(method, self.table, records, retry_post=False)
+        if not failed:
+            self._finish(entries, 'written', [record['id'] for record in written])
+            return True
+
+        error = failed[0][1]
+        if isinstance(error, AirtableError) and error.status is not None and 400 <= error.status < 500:
+            # Airtable rejects the whole batch for one bad record; find it by sending one at a time
+            if len(entries) > 1:
+                for entry in entries:
+                    self._write([entry])
+            else:
+                self._finish(entries, 'failed', error=f'{error.status}: {error.body[:500]}')
+            return True
+        # A create may have landed even though the request failed; reconcile() decides
+        self._finish(entries, 'unknown' if creates else 'queued', error=str(error))
+        return False
+
+    def drain(self, stop: threading.Event):
+        """Writer thread: claim and send batches until `stop`"""
+        while not stop.is_set():
+            self.reconcile()
+            entries = self._claim()
+            if not entries:
+                with self.arrived:
+                    self.arrived.wait(1.0)
+                continue
+            if not self._write(entries):
+                stop.wait(5.0)
+
+    def reconcile(self, settle: float = UNKNOWN_SETTLE_SECONDS) -> int:
+        """
+        Settle creates left 'unknown'. A record for the same participant,
+        created after the check-in was sent and not linked to another
+        check-in, counts as its write; the rest are queued again (failed
+        after MAX_ATTEMPTS). If the lookup itself fails they stay unknown
+        and are tried again after `settle`. Returns how many were found.
+        """
+        if not self.reconciling.acquire(blocking=False):
+            return 0
+        try:
+            now = time.time()
+            with self.lock:
+                if now < self.next_reconcile:
+                    return 0
+                rows = self.db.execute("SELECT id, fields, sent FROM checkins WHERE status = 'unknown' "
+                                       "AND updated <= ?", (now - settle,)).fetchall()
+            if not rows:
+                return 0
+            unknown = [(item_id, json.loads(fields), sent) for item_id, fields, sent in rows]
+
+            existing: Dict[object, List[dict]] = {}
+            participant_ids = list(dict.fromkeys(fields['participantID'] for _, fields, _ in unknown
+                                                 if fields.get('participantID')))
+            try:
+                for chunk in chunked(participant_ids, LOOKUP_CHUNK):
+                    for record in self.client.list_records(self.table, formula=formula_any_of('participantID', chunk)):
+                        existing.setdefault(record['fields'].get('participantID'), []).append(record)
+            except AirtableError as e:
+                print(f"  Could not look up {len(unknown)} unconfirmed check-ins: {e}")
+                self.next_reconcile = time.time() + settle
+                return 0
+
+            found = 0
+            now = time.time()
+            with self.arrived:
+                taken = {row[0] for row in self.db.execute('SELECT airtable_id FROM checkins '
+                                                           'WHERE airtable_id IS NOT NULL')}
+                for item_id, fields, sent in unknown:
+                    for record in existing.get(fields.get('participantID'), []):
+                        created = datetime.fromisoformat(record['createdTime'].replace('Z', '+00:00')).timestamp()
+                        if record['id'] not in taken and created >= (sent or 0) - 5:
+                            taken.add(record['id'])
+                            found += 1
+                            self.db.execute("UPDATE checkins SET status = 'written', airtable_id = ?, error = NULL, "
+                                            "updated = ? WHERE id = ? AND status = 'unknown'",
+                                            (record['id'], now, item_id))
+                            break
+                    else:
+                        self.db.execute("UPDATE checkins SET status = CASE WHEN attempts >= ? THEN 'failed' "
+                                        "ELSE 'queued' END, updated = ? WHERE id = ? AND status = 'unknown'",
+                                        (MAX_ATTEMPTS, now, item_id))
+                self.db.commit()
+                self.arrived.notify_all()
+            print(f"  Settled {len(unknown)} unconfirmed check-ins ({found} already in Airtable)")
+            return found
+        finally:
+            self.reconciling.release()
+
+    def recover(self):
+        """
+        Pick up check-ins left 'sending' by a previous run: updates are
+        queued again, creates may already be in Airtable and are settled
+        by reconcile() before anything is resent.
+        """
+        with self.lock:
+            stale = self.db.execute("UPDATE checkins SET status = CASE WHEN record_id IS NULL THEN 'unknown' "
+                                    "ELSE 'queued' END WHERE status = 'sending'").rowcount
+            self.db.commit()
+        if stale:
+            print(f"  Recovered {stale} in-flight check-ins")
+        self.reconcile(settle=0)
+
+
+def make_handler(queue: AttendanceQueue):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body):
+            payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_OPTIONS(self):
+            self._send(204, {})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = [p for p in url.path.split('/') if p]
+            if parts == ['status']:
+                self._send(200, queue.status())
+            elif parts == ['checkins']:
+                ids = [i for i in parse_qs(url.query).get('ids', [''])[0].split(',') if i]
+                self._send(200, {'checkins': queue.get(ids) if ids else []})
+            elif len(parts) == 2 and parts[0] == 'checkins':
+                item = queue.get([parts[1]])[0]
+                self._send(404 if item['status'] == 'missing' else 200, item)
+            else:
+                self._send(404, {'error': 'Not found'})
+
+        def do_POST(self):
+            if urlparse(self.path).path.rstrip('/') != '/checkins':
+                self._send(404, {'error': 'Not found'})
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+            except ValueError:
+                self._send(400, {'error': 'Body must be JSON'})
+                return
+            if not isinstance(body.get('fields'), dict) or not body['fields']:
+                self._send(422, {'error': 'fields must be a non-empty object'})
+                return
+            self._send(202, queue.enqueue(body['fields'], body.get('recordId'), body.get('id')))
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Queue check-ins and write them to Attendance in batches')
+    parser.add_argument('--db', default=QUEUE_DB)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8792)
+    parser.add_argument('--writers', type=int, default=WRITERS, help='batches in flight at once')
+    parser.add_argument('--linger', type=float, default=LINGER_SECONDS, help='seconds a batch waits to fill')
+    args = parser.parse_args()
+
+    api_key = os.environ.get('AIRTABLE_API_KEY')
+    if not api_key:
+        print("Please set the AIRTABLE_API_KEY environment variable")
+        sys.exit(1)
+    queue = AttendanceQueue(AirtableClient(api_key, AIRTABLE_BASE_ID), db_path=args.db, linger=args.linger)
+    queue.recover()
+
+    stop = threading.Event()
+    for _ in range(args.writers):
+        threading.Thread(target=queue.drain, args=(stop,), daemon=True).start()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(queue))
+    server.daemon_threads = True
+    print(f"✓ Check-in queue on http://{args.host}:{args.port}/checkins "
+          f"({args.writers} writers, {queue.status()['counts'].get('queued', 0)} queued)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        stop.set()
+
+
+if __name__ == "__main__":
+    main()
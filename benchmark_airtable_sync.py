@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark Airtable participant writes against the local mock server:
+the old one-PATCH-per-record loop vs. the batched, rate-limited engine
+"""
+
+import argparse
+import time
+
+import requests
+
+from airtable_client import AirtableClient
+from airtable_mock_server import MockBase, server_url, start_mock_server
+from sync_metrics import SyncMetrics, print_report
+
+BASE_ID = "appMockBase000000"
+TABLE = "Participants"
+
+
+def seed_participants(base: MockBase, count: int):
+    base.tables[TABLE] = []
+    base.seed(TABLE, [{'P-ID': f'P{i:05d}', 'name': f'Participant {i}'} for i in range(count)])
+
+
+def legacy_sync(url: str, records: list) -> float:
+    """The original loop: one PATCH per record, 1.1 s sleep after every 5"""
+    headers = {"Authorization": "Bearer mock", "Content-Type": "application/json"}
+    started = time.time()
+    for i, record in enumerate(records):
+        requests.patch(f"{url}/{BASE_ID}/{TABLE}/{record['id']}", headers=headers,
+                       json={'fields': record['fields']})
+        if (i + 1) % 5 == 0:
+            time.sleep(1.1)
+    return time.time() - started
+
+
+def batched_sync(url: str, records: list, workers: int) -> float:
+    metrics = SyncMetrics('benchmark')
+    client = AirtableClient('mock', BASE_ID, api_url=url, max_workers=workers, metrics=metrics)
+    started = time.time()
+    updated, failed = client.patch_records(TABLE, records)
+    elapsed = time.time() - started
+    if failed:
+        print(f"  {sum(len(b) for b, _ in failed)} records failed")
+    metrics.add_records('updated', len(updated))
+    metrics.finish()
+    print_report(metrics.report())
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--records', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.15, help='mock server latency per request (s)')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--legacy', action='store_true', help='also time the old per-record loop')
+    args = parser.parse_args()
+
+    base = MockBase(rate_limit=5, latency=args.latency, retry_after=30)
+    server = start_mock_server(base)
+    url = server_url(server)
+    print(f"Mock Airtable at {url} ({args.latency * 1000:.0f} ms latency, 5 req/s)")
+
+    seed_participants(base, args.records)
+    records = [{'id': row['id'], 'fields': {'skinColor': '3(LM)', 'skinTone': 'Warm'}}
+               for row in base.tables[TABLE]]
+
+    results = {}
+    if args.legacy:
+        print(f"\nLegacy loop ({args.records} records)...")
+        results['legacy'] = legacy_sync(url, records)
+
+    print(f"\nBatched engine ({args.records} records, {args.workers} workers)...")
+    throttled_before = base.stats['throttled']
+    results['batched'] = batched_sync(url, records, args.workers)
+    throttled = base.stats['throttled'] - throttled_before
+
+    print("\n=== Results ===")
+    for name, elapsed in results.items():
+        print(f"  {name:8s}: {elapsed:7.2f}s  {args.records / elapsed:6.1f} records/s")
+    print(f"  429 responses during batched run: {throttled}")
+    print(f"  Theoretical ceiling: {5 * 10} records/s (5 req/s x 10 records)")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of the workbook pipeline on synthetic workbooks
+(synthetic_workbook.py) at several sizes
+
+Stages, each timed on its own. The image stages call the pipeline
+scripts' own functions, writing into the work directory instead of the
+dashboard's folders:
+
+    ingest      pd.read_excel of the sheet
+    anchors     openpyxl's parse of the drawing XML, pictures indexed by anchor cell
+    extract     extract_excel_images_final.extract_and_map_images (its own openpyxl
+                load included) -> participant_images_final/, excel_images/
+    hash        identify_reference_images.identify_reference_images: average_hash
+                of every picture, distinct hashes counted
+    mapping     create_final_image_mapping.create_final_mapping
+                -> participant_final_mapping.json
+    stats       summary distributions plus multi-select counts and co-occurrence
+    html        detail bundles, lazy dashboard and search index (generate_final_dashboard.py)
+
+The scripts' progress output is silenced while they are timed.
+
+Results are written to a JSON file; pass an earlier one as --baseline to
+list the stages that got slower than --tolerance allows (exit status 1).
+With --profile the stages are also written as a Chrome trace with CPU
+time and memory peaks (stage_profile.py); timings taken that way carry
+tracemalloc's overhead.
+
+    python benchmark_pipeline.py [--rows 1000,10000,100000] [--out pipeline_benchmark.json]
+                                 [--baseline old.json] [--work-dir bench_work] [--face-size 160x90]
+                                 [--profile trace.json] [--cprofile prof/]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+from openpyxl import load_workbook
+
+import stage_profile
+from create_final_image_mapping import create_final_mapping
+from detail_bundles import inject_lazy_dashboard, split_participants, write_detail_bundles
+from extract_excel_images_final import extract_and_map_images
+from identify_reference_images import identify_reference_images
+from multiselect import analyze_multiselect
+from search_index import inject_search, write_search_index
+from synthetic_workbook import (DEFAULT_FACE_SIZE, DEFAULT_REFERENCE_SIZE, GENERATOR_VERSION,
+                                generate_workbook, parse_size)
+
+RESULTS_FILE = 'pipeline_benchmark.json'
+DEFAULT_ROWS = [1000, 10000, 100000]
+DEFAULT_TOLERANCE = 1.25  # a stage 25% slower than the baseline is a regression
+NOISE_FLOOR = 0.05  # stages faster than this (s) in both runs are not compared
+TEMPLATE = 'makeup-test-dashboard-v2.html'
+
+
+def _records(df: pd.DataFrame) -> List[dict]:
+    """DataFrame rows as participant_data-style dicts (NaN -> None)"""
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+def _quietly(function: Callable, *args):
+    """Call one of the pipeline scripts' functions without its progress output"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        return function(*args)
+
+
+class PipelineRun:
+    """One pass over one workbook; each stage method returns how many items it handled"""
+
+    def __init__(self, workbook: str, work_dir: Path):
+        self.workbook = workbook
+        self.work_dir = work_dir
+        self.images_dir = work_dir / 'excel_images'
+        self.df: Optional[pd.DataFrame] = None
+        self.image_types: dict = {}
+        self.mapping: Dict[str, dict] = {}
+        self.anchored: Dict[Tuple[int, int], list] = {}
+
+    def ingest(self) -> int:
+        self.df = pd.read_excel(self.workbook)
+        return len(self.df)
+
+    def index_anchors(self) -> int:
+        # The same load extract_and_map_images does; openpyxl parses the drawings into ws._images
+        ws = load_workbook(self.workbook, data_only=True, keep_links=False).active
+        self.anchored = {}
+        for image in getattr(ws, '_images', []):
+            cell = image.anchor._from
+            self.anchored.setdefault((cell.row + 1, cell.col), []).append(image)
+        return sum(len(images) for images in self.anchored.values())
+
+    def extract(self) -> int:
+        result = _quietly(extract_and_map_images, self.workbook, str(self.work_dir / 'participant_images_final'),
+                          str(self.work_dir / 'final_image_mapping.json'), str(self.images_dir))
+        return result['statistics']['total_images']
+
+    def hash(self) -> int:
+        self.image_types = _quietly(identify_reference_images, str(self.images_dir),
+                                    str(self.work_dir / 'image_type_mapping.json'))
+        return self.image_types['statistics']['total_images']
+
+    def map(self) -> int:
+        self.mapping = _quietly(create_final_mapping, self.workbook, str(self.work_dir / 'image_type_mapping.json'),
+                                str(self.images_dir), str(self.work_dir / 'participant_final_mapping.json'))
+        return len(self.mapping)
+
+    def stats(self) -> int:
+        df = self.df
+        self.summary = {
+            'total_participants': len(df),
+            'gender_distribution': df['What is your gender? '].value_counts().to_dict(),
+            'brightness_distribution': {str(k): int(v) for k, v in df['밝기판정'].value_counts().items()},
+            'tone_distribution': {str(k): int(v) for k, v in df['톤'].value_counts().items()},
+            'nationality_distribution': df['What is your nationality?'].value_counts().head(5).to_dict(),
+            'ethnic_distribution': df['Please select the ethnic group you identify with:'].value_counts().to_dict(),
+        }
+        self.multiselect = analyze_multiselect(df)
+        return len(df)
+
+    def _write_dashboard(self) -> int:
+        participants = _records(self.df)
+        analysis = {'total_participants': len(participants), 'columns': list(self.df.columns),
+                    'summary_stats': self.summary}
+        detail_dir = self.work_dir / 'participant_details'
+        list_rows, bundles = split_participants(participants, self.mapping)
+        write_detail_bundles(bundles, str(detail_dir))
+        with open(TEMPLATE, 'r', encoding='utf-8') as f:
+            html = inject_lazy_dashboard(f.read(), list_rows, analysis, str(detail_dir))
+        index_path = str(self.work_dir / 'participant_search_index.json')
+        write_search_index(list_rows, index_path)
+        html = inject_search(html, index_path)
+        with open(self.work_dir / 'dashboard.html', 'w', encoding='utf-8') as f:
+            f.write(html)
+        return len(list_rows)
+
+    def html(self) -> int:
+        return _quietly(self._write_dashboard)
+
+    def stages(self) -> List[Tuple[str, Callable[[], int]]]:
+        return [('ingest', self.ingest), ('anchors', self.index_anchors), ('extract', self.extract),
+                ('hash', self.hash), ('mapping', self.map), ('stats', self.stats), ('html', self.html)]
+
+
+def run_benchmark(rows: int, work_dir: Path, face_size: Tuple[int, int] = DEFAULT_FACE_SIZE,
+                  reference_size: Tuple[int, int] = DEFAULT_REFERENCE_SIZE, reuse: bool = True) -> dict:
+    """Generate (or reuse) a `rows`-row workbook and time every stage on it"""
+    run_dir = work_dir / f'rows_{rows}'
+    if run_dir.exists():
+        shutil.rmtree(run_dir)
+    run_dir.mkdir(parents=True)
+    workbook = work_dir / f'synthetic_v{GENERATOR_VERSION}_{rows}_{face_size[0]}x{face_size[1]}.xlsx'
+
+    result = {'rows': rows, 'face_size': list(face_size), 'stages': {}}
+    if not (reuse and workbook.exists()):
+        started = time.perf_counter()
+        with stage_profile.stage('generate', rows=rows):
+            generated = generate_workbook(str(workbook), rows, face_size, reference_size)
+        result['generate_seconds'] = round(time.perf_counter() - started, 3)
+        print(f"  generated {generated['images']:,} images in {result['generate_seconds']}s")
+    result['workbook_bytes'] = workbook.stat().st_size
+
+    run = PipelineRun(str(workbook), run_dir)
+    for name, stage in run.stages():
+        started = time.perf_counter()
+        with stage_profile.stage(name, rows=rows):
+            items = stage()
+        seconds = time.perf_counter() - started
+        result['stages'][name] = {'seconds': round(seconds, 4), 'items': items}
+        print(f"  {name:8s} {seconds:9.3f}s  {items:>9,} items")
+    result['distinct_images'] = run.image_types['statistics']['unique_hashes']
+    result['total_seconds'] = round(sum(s['seconds'] for s in result['stages'].values()), 4)
+    return result
+
+
+def compare(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """Print current vs baseline per size and stage; returns the regressions"""
+    regressions = []
+    print(f"\n=== Compared with baseline from {baseline.get('created', '?')} ===")
+    for size, run in results['runs'].items():
+        before = baseline.get('runs', {}).get(size)
+        if not before:
+            print(f"  {size} rows: no baseline")
+            continue
+        for stage, timing in run['stages'].items():
+            old = before['stages'].get(stage, {}).get('seconds')
+            if not old or max(old, timing['seconds']) < NOISE_FLOOR:
+                continue
+            ratio = timing['seconds'] / old
+            flag = ''
+            if ratio > tolerance:
+                flag = '  <- slower'
+                regressions.append(f'{size} rows {stage}: {old}s -> {timing["seconds"]}s')
+            print(f"  {size:>7} rows {stage:8s} {old:9.3f}s -> {timing['seconds']:9.3f}s  x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the workbook pipeline on synthetic workbooks')
+    parser.add_argument('--rows', default=','.join(map(str, DEFAULT_ROWS)), help='comma-separated sizes')
+    parser.add_argument('--work-dir', default='bench_work', help='generated workbooks and stage outputs')
+    parser.add_argument('--face-size', type=parse_size, default=DEFAULT_FACE_SIZE, help='WxH of face photos')
+    parser.add_argument('--reference-size', type=parse_size, default=DEFAULT_REFERENCE_SIZE, help='WxH')
+    parser.add_argument('--regenerate', action='store_true', help='do not reuse workbooks from the work dir')
+    parser.add_argument('--out', default=RESULTS_FILE)
+    parser.add_argument('--baseline', help='earlier results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='slowdown ratio counted as a regression')
+    parser.add_argument('--profile', metavar='TRACE', help='also write a per-stage Chrome trace')
+    parser.add_argument('--cprofile', metavar='DIR', help='with --profile, dump cProfile stats per stage')
+    args = parser.parse_args()
+
+    if args.profile:
+        stage_profile.enable('benchmark_pipeline', args.cprofile)
+
+    work_dir = Path(args.work_dir)
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'machine': f'{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs',
+        'runs': {},
+    }
+    for rows in (int(r) for r in args.rows.split(',') if r.strip()):
+        print(f"\n{rows:,} rows")
+        results['runs'][str(rows)] = run_benchmark(rows, work_dir, args.face_size, args.reference_size,
+                                                   reuse=not args.regenerate)
+
+    if args.profile:
+        results['profile'] = args.profile
+        stage_profile.print_summary(stage_profile.disable(args.profile))
+        print(f"✓ Wrote profile trace to {args.profile}")
+
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✓ Saved results to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) slower than x{args.tolerance}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,11 @@
 cat > env-config.js << EOF
 // Auto-generated environment configuration from Netlify
 window.AIRTABLE_API_KEY = '${AIRTABLE_API_KEY}';
+window.AIRTABLE_API_URL = '${AIRTABLE_API_URL}';
+window.AIRTABLE_RELAY_URL = '${AIRTABLE_RELAY_URL}';
+window.IMAGE_INGEST_URL = '${IMAGE_INGEST_URL}';
+window.ATTENDANCE_QUEUE_URL = '${ATTENDANCE_QUEUE_URL}';
+window.CHECKIN_INDEX_URL = '${CHECKIN_INDEX_URL}';
 window.AIRTABLE_BASE_ID = '${AIRTABLE_BASE_ID}';
 window.AIRTABLE_TABLE_ID = '${AIRTABLE_TABLE_ID}';
 window.AIRTABLE_ADMIN_TABLE_ID = '${AIRTABLE_ADMIN_TABLE_ID}';
@@ -16,6 +21,16 @@ cat > config.js << EOF
 const AIRTABLE_CONFIG = {
     // API Key should be set via environment variable for production
     API_KEY: window.AIRTABLE_API_KEY || localStorage.getItem('AIRTABLE_API_KEY') || '',
+    // Override to point the pages at a local mock (python airtable_mock_server.py)
+    API_URL: window.AIRTABLE_API_URL || localStorage.getItem('AIRTABLE_API_URL') || 'https://api.airtable.com/v0',
+    // Change relay (python airtable_relay.py); dashboards read from it and get pushed updates
+    RELAY_URL: window.AIRTABLE_RELAY_URL || localStorage.getItem('AIRTABLE_RELAY_URL') || '',
+    // Image ingest service (python image_ingest.py); check-in photos are uploaded there as binary
+    INGEST_URL: window.IMAGE_INGEST_URL || localStorage.getItem('IMAGE_INGEST_URL') || '',
+    // Check-in queue (python attendance_queue.py); check-ins are batched into Attendance there
+    QUEUE_URL: window.ATTENDANCE_QUEUE_URL || localStorage.getItem('ATTENDANCE_QUEUE_URL') || '',
+    // Check-in lookup index (python checkin_index.py); defaults to the relay's /checkin-index
+    CHECKIN_INDEX_URL: window.CHECKIN_INDEX_URL || '',
     BASE_ID: window.AIRTABLE_BASE_ID || 'appZcPs57spwdoKQH',
     TABLE_ID: window.AIRTABLE_TABLE_ID || 'tblxMzwX1wWJKIOhY',
     ADMIN_TABLE_ID: window.AIRTABLE_ADMIN_TABLE_ID || 'tblFQ7ofZ9CXZcydm',
@@ -0,0 +1,101 @@
+// Check-in lookup index (python checkin_index.py)
+// The roster plus a key -> rows map, loaded once; a search is a few Map probes
+// instead of a scan of every participant. Keys cover substrings of names, IDs
+// and A-IDs, as the scan did. lookupKeys() mirrors checkin_index.lookup_keys(),
+// tokens() mirrors search_index.tokenize().
+
+const CheckinIndex = {
+    MAX_PREFIX: 12,
+    index: null,
+
+    // Index URL from config.js / localStorage, else the relay's, or '' when there is none
+    url() {
+        const config = typeof AIRTABLE_CONFIG !== 'undefined' ? AIRTABLE_CONFIG : {};
+        const configured = config.CHECKIN_INDEX_URL || localStorage.getItem('CHECKIN_INDEX_URL');
+        if (configured) return configured;
+        const relay = (config.RELAY_URL || localStorage.getItem('AIRTABLE_RELAY_URL') || '').replace(/\/+$/, '');
+        return relay ? `${relay}/checkin-index` : '';
+    },
+
+    // <input type=date> value '2025-09-22' -> '9/22' (checkin_index.day_key), '' for none
+    dayKey(value) {
+        const parts = String(value || '').split('-').filter(Boolean);
+        return parts.length === 3 ? `${parseInt(parts[1], 10)}/${parseInt(parts[2], 10)}` : '';
+    },
+
+    // True when the loaded index is one event day's roster and `day` is another
+    needsReload(day) {
+        return Boolean(this.index && this.index.date && this.index.date !== day);
+    },
+
+    // Load the index, just the roster of `day` ('9/22') when one is given
+    async load(url = this.url(), day = '') {
+        if (day) url += `${url.includes('?') ? '&' : '?'}date=${encodeURIComponent(day)}`;
+        const response = await fetch(url);
+        if (!response.ok) throw new Error(`Check-in index: HTTP ${response.status}`);
+        const raw = await response.json();
+        this.index = {
+            date: raw.date,
+            columns: raw.columns,
+            rows: raw.rows,
+            keys: new Map(Object.entries(raw.keys))
+        };
+        return this.index;
+    },
+
+    // The roster in Airtable's {id, fields} shape, for code that lists records
+    records() {
+        const [, ...fields] = this.index.columns;
+        return this.index.rows.map(([recordId, ...values]) => {
+            const record = { id: recordId, fields: {} };
+            fields.forEach((field, i) => {
+                if (values[i] !== null && values[i] !== undefined) record.fields[field] = values[i];
+            });
+            return record;
+        });
+    },
+
+    tokens(text) {
+        const normalized = String(text ?? '').normalize('NFKD').replace(/[\u0300-\u036f]/g, '').toLowerCase().trim();
+        return normalized.match(/[\p{L}\p{N}]+/gu) || [];
+    },
+
+    phoneKey(digits) {
+        return digits.startsWith('82') && digits.length >= 11 ? `0${digits.slice(2)}` : digits;
+    },
+
+    lookupKeys(query) {
+        const text = String(query ?? '').trim();
+        const compact = text.replace(/[\s\-().+]/g, '');
+        const any = [];
+        if (/^\d+$/.test(compact)) {
+            any.push(`i:${parseInt(compact, 10)}`, `d:${compact.slice(0, this.MAX_PREFIX)}`);
+            if (compact.length === 4) any.push(`p4:${compact}`);
+            if (compact.length >= 9) any.push(`p:${this.phoneKey(compact)}`);
+        } else if (/^[pP]\d+$/.test(compact)) {
+            any.push(`i:${parseInt(compact.slice(1), 10)}`, `ip:${compact.slice(1, this.MAX_PREFIX + 1)}`);
+        }
+        if (/^[A-Za-z0-9]+$/.test(compact)) any.push(`a:${compact.toUpperCase().slice(0, this.MAX_PREFIX)}`);
+        const all = this.tokens(text).map(token => `n:${token.slice(0, this.MAX_PREFIX)}`);
+        return { any, all };
+    },
+
+    // Record ids matching a search box query, in roster order; null when
+    // nothing in the query can be probed (the caller scans instead)
+    lookup(query) {
+        const { keys, rows } = this.index;
+        const { any, all } = this.lookupKeys(query);
+        if (!any.length && !all.length) return null;
+        const found = new Set();
+        any.forEach(key => (keys.get(key) || []).forEach(row => found.add(row)));
+        if (all.length) {
+            let byName = null;
+            all.forEach(key => {
+                const hits = keys.get(key) || [];
+                byName = byName === null ? new Set(hits) : new Set(hits.filter(row => byName.has(row)));
+            });
+            byName.forEach(row => found.add(row));
+        }
+        return [...found].sort((a, b) => a - b).map(row => rows[row][0]);
+    }
+};
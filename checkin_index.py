@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Check-in lookup index for the attendance page
+
+The page paged the whole Participants table from Airtable and scanned every
+row on each keystroke. This builds the roster once (optionally just one
+event day) with a key -> row map, so a search is a few dictionary probes.
+The page's scan matched substrings, so the keys do too:
+
+    i:<number>     ID / P-ID ('P-007', 'p7', '007' -> i:7)
+    d:<digits>     substrings of the ID number ('12' finds 112)
+    ip:<digits>    prefixes of the ID number ('P-12' finds P-120)
+    a:<text>       substrings of the A-ID, upper case ('A101', '101', '01')
+    p:<phone>      phone digits, +82 turned into a leading 0
+    p4:<digits>    last four phone digits
+    n:<text>       substrings of each name token (search_index.normalize),
+                   so '민수' finds '김민수'
+
+checkin-index.js loads it and mirrors lookup_keys(). The mirror, relay and
+aggregates servers serve it at /checkin-index?date=9/22; or write a file:
+
+    python checkin_index.py [--date 9/22] [--out checkin_index.json] [--query 'kim 5678']
+"""
+
+import argparse
+import json
+import re
+import time
+from typing import Dict, Iterable, List, Optional
+
+from search_index import MAX_PREFIX, substrings, tokenize
+
+INDEX_FILE = 'checkin_index.json'
+
+# Participant fields the attendance page reads (its PARTICIPANT_FIELDS, plus A-ID)
+ROSTER_FIELDS = ['ID', 'name', 'phone', 'setDate', 'setTime', 'status', 'skinColor', 'A-ID']
+EXCLUDED_STATUSES = {'Cancelled', 'Duplicate'}
+
+
+def day_key(value) -> str:
+    """'9/22', '2025-09-22', '2025.9.22', '2025/9/22' -> '9/22' (as the page compares dates)"""
+    parts = [p for p in re.split(r'[-./]', str(value or '').strip()) if p]
+    if len(parts) == 3:
+        parts = parts[1:]
+    if len(parts) != 2 or not all(p.isdigit() for p in parts):
+        return ''
+    return f'{int(parts[0])}/{int(parts[1])}'
+
+
+def phone_key(value) -> str:
+    digits = re.sub(r'\D', '', str(value or ''))
+    if digits.startswith('82') and len(digits) >= 11:
+        digits = '0' + digits[2:]
+    return digits
+
+
+def participant_keys(fields: dict) -> set:
+    keys = set()
+    for value in (fields.get('ID'), fields.get('P-ID')):
+        match = re.search(r'\d+', str(value if value is not None else ''))
+        if match:
+            number = str(int(match.group(0)))
+            keys.add(f'i:{number}')
+            keys.update(f'd:{text}' for text in substrings(number))
+            keys.update(f'ip:{number[:length]}' for length in range(1, len(number) + 1))
+    aid = re.sub(r'\s+', '', str(fields.get('A-ID') or '')).upper()
+    keys.update(f'a:{text}' for text in substrings(aid))
+    phone = phone_key(fields.get('phone'))
+    if phone:
+        keys.add(f'p:{phone}')
+        if len(phone) >= 4:
+            keys.add(f'p4:{phone[-4:]}')
+    for token in tokenize(fields.get('name')):
+        keys.update(f'n:{text}' for text in substrings(token))
+    return keys
+
+
+def build_checkin_index(participants: List[dict], attendance: Iterable[dict] = (),
+                        date: Optional[str] = None) -> dict:
+    """
+    Mirror/Airtable records -> {'columns', 'rows', 'keys': {key: [row, ...]}}.
+    Rows are the roster in setTime order, each [recordId] + ROSTER_FIELDS;
+    A-IDs missing on a participant are taken from its attendance record.
+    """
+    aids = {}
+    for record in attendance:
+        fields = record['fields']
+        if fields.get('A-ID') and fields.get('participantID') is not None:
+            aids.setdefault(fields['participantID'], fields['A-ID'])
+
+    day = day_key(date) if date else None
+    roster = []
+    for record in participants:
+        fields = dict(record['fields'])
+        if fields.get('status') in EXCLUDED_STATUSES:
+            continue
+        if day and day_key(fields.get('setDate')) != day:
+            continue
+        if not fields.get('A-ID') and fields.get('ID') in aids:
+            fields['A-ID'] = aids[fields['ID']]
+        roster.append((record['id'], fields))
+    roster.sort(key=lambda item: (str(item[1].get('setTime') or ''), item[0]))
+
+    keys: Dict[str, List[int]] = {}
+    for row, (_, fields) in enumerate(roster):
+        for key in participant_keys(fields):
+            keys.setdefault(key, []).append(row)
+
+    return {
+        'version': 2,
+        'date': day,
+        'built': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'columns': ['recordId'] + ROSTER_FIELDS,
+        'rows': [[record_id] + [fields.get(field) for field in ROSTER_FIELDS] for record_id, fields in roster],
+        'keys': dict(sorted(keys.items())),
+    }
+
+
+def lookup_keys(query: str) -> dict:
+    """
+    Keys to probe for a search box query: {'any': [...]} (ID, A-ID and
+    phone readings, unioned) and {'all': [...]} (name tokens, intersected).
+    Parts longer than MAX_PREFIX are probed by their first MAX_PREFIX
+    characters. Both lists are empty when nothing in the query can be
+    probed; the page then scans the roster instead.
+    """
+    text = str(query or '').strip()
+    compact = re.sub(r'[\s\-().+]', '', text)
+    any_keys = []
+    if compact.isdigit():
+        any_keys += [f'i:{int(compact)}', f'd:{compact[:MAX_PREFIX]}']
+        if len(compact) == 4:
+            any_keys.append(f'p4:{compact}')
+        if len(compact) >= 9:
+            any_keys.append(f'p:{phone_key(compact)}')
+    elif re.fullmatch(r'[pP]\d+', compact):
+        any_keys += [f'i:{int(compact[1:])}', f'ip:{compact[1:MAX_PREFIX + 1]}']
+    if re.fullmatch(r'[A-Za-z0-9]+', compact):
+        any_keys.append(f'a:{compact.upper()[:MAX_PREFIX]}')
+    all_keys = [f'n:{token[:MAX_PREFIX]}' for token in tokenize(text)]
+    return {'any': any_keys, 'all': all_keys}
+
+
+def lookup(index: dict, query: str) -> Optional[List[int]]:
+    """Roster rows matching `query` (what checkin-index.js returns), None if it can't be probed"""
+    probes = lookup_keys(query)
+    if not probes['any'] and not probes['all']:
+        return None
+    found = set()
+    for key in probes['any']:
+        found.update(index['keys'].get(key, []))
+    if probes['all']:
+        by_name = None
+        for key in probes['all']:
+            rows = set(index['keys'].get(key, []))
+            by_name = rows if by_name is None else by_name & rows
+        found |= by_name or set()
+    return sorted(found)
+
+
+def main():
+    from airtable_mirror import MIRROR_DB, AirtableMirror
+
+    parser = argparse.ArgumentParser(description='Build the check-in lookup index from the SQLite mirror')
+    parser.add_argument('--db', default=MIRROR_DB)
+    parser.add_argument('--date', help="event day, e.g. 9/22 (default: every active participant)")
+    parser.add_argument('--out', default=INDEX_FILE)
+    parser.add_argument('--query', action='append', default=[], help='print the matches for a test query')
+    args = parser.parse_args()
+
+    mirror = AirtableMirror(db_path=args.db)
+    index = build_checkin_index(mirror.records('participants'), mirror.records('attendance'), args.date)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+    print(f"✓ Wrote {args.out}: {len(index['rows'])} participants, {len(index['keys'])} keys"
+          f"{' for ' + index['date'] if index['date'] else ''}")
+
+    name_col = index['columns'].index('name')
+    for query in args.query:
+        rows = lookup(index, query)
+        if rows is None:
+            print(f"  {query!r}: nothing to probe, the page scans the roster")
+        else:
+            print(f"  {query!r}: {[index['rows'][row][name_col] for row in rows][:10]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,12 @@ import pandas as pd
 import json
 from pathlib import Path
 
+from participant_shards import write_participant_shards
+from search_index import search_index_js, write_search_index
+
+SHARD_DIR = 'table_shards'
+SEARCH_INDEX_FILE = f'{SHARD_DIR}/search.json'
+
 # Load Excel data
 df = pd.read_excel('/Users/owlers_dylan/APCLT/makeuptest_AP_Bueatylink_20250927.xlsx')
 print(f"Loaded {len(df)} participants")
@@ -56,6 +62,11 @@ for idx, row in df.iterrows():
         if img_path.exists():
             image_mapping[aid]['images'][img_type] = f'images_organized_by_aid/{aid}_{img_type}.png'
 
+# Pre-sort and shard participants for deferred paging in the browser
+shard_index = write_participant_shards(participant_data, SHARD_DIR, image_mapping)
+# The search box looks participants up in the inverted index instead of scanning shards
+write_search_index(participant_data, SEARCH_INDEX_FILE)
+
 # Create HTML
 html_content = '''<!DOCTYPE html>
 <html lang="en">
@@ -293,6 +304,7 @@ html_content = '''<!DOCTYPE html>
                         <th>Gender</th>
                         <th>Nationality</th>
                         <th>Birth Year</th>
+                        <th>Set Date</th>
                         <th>Skin Brightness</th>
                         <th>Skin Tone</th>
                         <th>Ethnic Group</th>
@@ -324,11 +336,99 @@ html_content = '''<!DOCTYPE html>
     <script src="https://cdn.datatables.net/1.13.7/js/jquery.dataTables.min.js"></script>
     <script src="https://cdn.datatables.net/1.13.7/js/dataTables.bootstrap5.min.js"></script>
     <script>
-        // Embed data
-        const allParticipants = ''' + json.dumps(participant_data, ensure_ascii=False) + ''';
-        const imageMapping = ''' + json.dumps(image_mapping, ensure_ascii=False) + ''';
+        // Only the summary is embedded; participants are paged in from static shards
+        const SHARD_DIR = "''' + SHARD_DIR + '''";
         const summaryStats = ''' + json.dumps(summary_stats, ensure_ascii=False) + ''';
 
+        // Column index (table) -> shard sort key; other columns are not sortable
+        const SORT_COLUMNS = { 0: 'aid', 6: 'setDate', 7: 'brightness' };
+        const COL = {
+            aid: 0, pid: 1, name: 2, gender: 3, nationality: 4, birthYear: 5,
+            setDate: 6, brightness: 7, tone: 8, ethnic: 9, images: 10
+        };
+
+        // Keep at most a few shards in memory regardless of table size
+        const MAX_CACHED_SHARDS = 4;
+        const shardCache = new Map();
+        const rowsByAid = new Map();
+        let shardIndex = null;
+
+        async function loadShardIndex() {
+            if (!shardIndex) {
+                const response = await fetch(`${SHARD_DIR}/index.json`);
+                shardIndex = await response.json();
+            }
+            return shardIndex;
+        }
+
+        async function loadShard(sortKey, shardNo) {
+            const cacheKey = `${sortKey}/${shardNo}`;
+            if (shardCache.has(cacheKey)) {
+                const rows = shardCache.get(cacheKey);
+                shardCache.delete(cacheKey);
+                shardCache.set(cacheKey, rows);
+                return rows;
+            }
+
+            const file = `page-${String(shardNo).padStart(5, '0')}.json`;
+            const response = await fetch(`${SHARD_DIR}/${sortKey}/${file}`);
+            const rows = await response.json();
+
+            shardCache.set(cacheKey, rows);
+            while (shardCache.size > MAX_CACHED_SHARDS) {
+                shardCache.delete(shardCache.keys().next().value);
+            }
+            return rows;
+        }
+
+        // Read rows [start, start + length) in the requested order
+        async function readRows(sortKey, dir, start, length) {
+            const index = await loadShardIndex();
+            const total = index.total;
+            const end = Math.min(start + length, total);
+            if (start >= end) return [];
+
+            // Descending pages are the ascending shards read from the end
+            const ascStart = dir === 'desc' ? total - end : start;
+            const ascEnd = dir === 'desc' ? total - start : end;
+
+            const firstShard = Math.floor(ascStart / index.shard_size);
+            const lastShard = Math.floor((ascEnd - 1) / index.shard_size);
+            let rows = [];
+            for (let shardNo = firstShard; shardNo <= lastShard; shardNo++) {
+                const shard = await loadShard(sortKey, shardNo);
+                const offset = shardNo * index.shard_size;
+                rows = rows.concat(shard.slice(
+                    Math.max(ascStart - offset, 0),
+                    Math.min(ascEnd - offset, shard.length)
+                ));
+            }
+            return dir === 'desc' ? rows.reverse() : rows;
+        }
+''' + search_index_js(SEARCH_INDEX_FILE) + '''
+        const rankCache = new Map();
+
+        async function loadRanks(sortKey) {
+            if (!rankCache.has(sortKey)) {
+                const response = await fetch(`${SHARD_DIR}/${sortKey}/ranks.json`);
+                rankCache.set(sortKey, await response.json());
+            }
+            return rankCache.get(sortKey);
+        }
+
+        // Page [start, start + length) of the search hits `ids`, in the requested order
+        async function readHits(sortKey, dir, ids, start, length) {
+            const index = await loadShardIndex();
+            const ranks = await loadRanks(sortKey);
+            const ordered = Array.from(ids, id => ranks[id]).sort((a, b) => dir === 'desc' ? b - a : a - b);
+            const rows = [];
+            for (const rank of ordered.slice(start, start + length)) {
+                const shard = await loadShard(sortKey, Math.floor(rank / index.shard_size));
+                rows.push(shard[rank % index.shard_size]);
+            }
+            return rows;
+        }
+
         // Update statistics
         function updateStats() {
             document.getElementById('femaleCount').textContent = summaryStats.gender_distribution['Female'] || 0;
@@ -338,15 +438,31 @@ html_content = '''<!DOCTYPE html>
             document.getElementById('neutralCount').textContent = summaryStats.tone_distribution['Neutral'] || 0;
         }
 
-        // Show participant images
+        function imageItem(src, alt, label, emptyText) {
+            if (src) {
+                return `
+                    <div class="image-item">
+                        <img src="${src}" alt="${alt}">
+                        <h6>${label}</h6>
+                    </div>`;
+            }
+            return `
+                    <div class="image-item">
+                        <div class="no-image">${emptyText}</div>
+                        <h6>${label}</h6>
+                    </div>`;
+        }
+
+        // Show participant images (row comes from the currently loaded page)
         function showImages(aid) {
-            const participant = allParticipants.find(p => p['A-ID'] === aid);
-            const mapping = imageMapping[aid];
+            const row = rowsByAid.get(aid);
+            if (!row) return;
+            const images = row[COL.images] || {};
 
             const modalTitle = document.getElementById('modalTitle');
             const modalBody = document.getElementById('modalBody');
 
-            modalTitle.textContent = `${participant['What is your full name? (Please write exactly as shown in your ARC or passport)']} (${aid})`;
+            modalTitle.textContent = `${row[COL.name]} (${aid})`;
 
             let modalContent = `
                 <div class="participant-info">
@@ -354,35 +470,35 @@ html_content = '''<!DOCTYPE html>
                     <div class="info-grid">
                         <div class="info-item">
                             <span class="info-label">A-ID:</span>
-                            <span class="info-value">${participant['A-ID']}</span>
+                            <span class="info-value">${row[COL.aid]}</span>
                         </div>
                         <div class="info-item">
                             <span class="info-label">P-ID:</span>
-                            <span class="info-value">${participant['P-ID']}</span>
+                            <span class="info-value">${row[COL.pid]}</span>
                         </div>
                         <div class="info-item">
                             <span class="info-label">Gender:</span>
-                            <span class="info-value">${participant['What is your gender? '] || 'N/A'}</span>
+                            <span class="info-value">${row[COL.gender] || 'N/A'}</span>
                         </div>
                         <div class="info-item">
                             <span class="info-label">Nationality:</span>
-                            <span class="info-value">${participant['What is your nationality?'] || 'N/A'}</span>
+                            <span class="info-value">${row[COL.nationality] || 'N/A'}</span>
                         </div>
                         <div class="info-item">
                             <span class="info-label">Birth Year:</span>
-                            <span class="info-value">${participant['Please enter your 4-digit year of birth(e.g., 1980) '] || 'N/A'}</span>
+                            <span class="info-value">${row[COL.birthYear] || 'N/A'}</span>
                         </div>
                         <div class="info-item">
                             <span class="info-label">Ethnic Group:</span>
-                            <span class="info-value">${participant['Please select the ethnic group you identify with:'] || 'N/A'}</span>
+                            <span class="info-value">${row[COL.ethnic] || 'N/A'}</span>
                         </div>
                         <div class="info-item">
                             <span class="info-label">Skin Brightness:</span>
-                            <span class="info-value">${participant['밝기판정'] || 'N/A'}</span>
+                            <span class="info-value">${row[COL.brightness] || 'N/A'}</span>
                         </div>
                         <div class="info-item">
                             <span class="info-label">Skin Tone:</span>
-                            <span class="info-value">${participant['톤'] || 'N/A'}</span>
+                            <span class="info-value">${row[COL.tone] || 'N/A'}</span>
                         </div>
                     </div>
                 </div>
@@ -390,65 +506,10 @@ html_content = '''<!DOCTYPE html>
                 <h5>Images</h5>
                 <div class="image-grid">`;
 
-            // Add face photo
-            if (mapping.images.face_photo) {
-                modalContent += `
-                    <div class="image-item">
-                        <img src="${mapping.images.face_photo}" alt="Face Photo">
-                        <h6>Face Photo</h6>
-                    </div>`;
-            } else {
-                modalContent += `
-                    <div class="image-item">
-                        <div class="no-image">No Face Photo</div>
-                        <h6>Face Photo</h6>
-                    </div>`;
-            }
-
-            // Add skin brightness
-            if (mapping.images.skin_brightness) {
-                modalContent += `
-                    <div class="image-item">
-                        <img src="${mapping.images.skin_brightness}" alt="Skin Brightness">
-                        <h6>Skin Brightness Reference</h6>
-                    </div>`;
-            } else {
-                modalContent += `
-                    <div class="image-item">
-                        <div class="no-image">No Image</div>
-                        <h6>Skin Brightness Reference</h6>
-                    </div>`;
-            }
-
-            // Add hair
-            if (mapping.images.hair) {
-                modalContent += `
-                    <div class="image-item">
-                        <img src="${mapping.images.hair}" alt="Hair">
-                        <h6>Hair Reference</h6>
-                    </div>`;
-            } else {
-                modalContent += `
-                    <div class="image-item">
-                        <div class="no-image">No Image</div>
-                        <h6>Hair Reference</h6>
-                    </div>`;
-            }
-
-            // Add eye color
-            if (mapping.images.eye_color) {
-                modalContent += `
-                    <div class="image-item">
-                        <img src="${mapping.images.eye_color}" alt="Eye Color">
-                        <h6>Eye Color Reference</h6>
-                    </div>`;
-            } else {
-                modalContent += `
-                    <div class="image-item">
-                        <div class="no-image">No Image</div>
-                        <h6>Eye Color Reference</h6>
-                    </div>`;
-            }
+            modalContent += imageItem(images.face_photo, 'Face Photo', 'Face Photo', 'No Face Photo');
+            modalContent += imageItem(images.skin_brightness, 'Skin Brightness', 'Skin Brightness Reference', 'No Image');
+            modalContent += imageItem(images.hair, 'Hair', 'Hair Reference', 'No Image');
+            modalContent += imageItem(images.eye_color, 'Eye Color', 'Eye Color Reference', 'No Image');
 
             modalContent += '</div>';
             modalBody.innerHTML = modalContent;
@@ -457,46 +518,71 @@ html_content = '''<!DOCTYPE html>
             modal.show();
         }
 
+        function renderRow(row) {
+            const images = row[COL.images] || {};
+            const hasImages = Object.keys(images).length > 0;
+            return [
+                `<strong>${row[COL.aid]}</strong>`,
+                row[COL.pid],
+                row[COL.name],
+                row[COL.gender] || '-',
+                row[COL.nationality] || '-',
+                row[COL.birthYear] || '-',
+                row[COL.setDate] || '-',
+                `<span class="badge-brightness">${row[COL.brightness] || '-'}</span>`,
+                `<span class="badge-tone">${row[COL.tone] || '-'}</span>`,
+                row[COL.ethnic] || '-',
+                hasImages ?
+                    `<button class="btn btn-view-images" onclick="showImages('${row[COL.aid]}')">View Images</button>` :
+                    '<span class="text-muted">No Images</span>'
+            ];
+        }
+
         // Initialize table
         $(document).ready(function() {
-            // Populate table
-            const tableBody = document.getElementById('tableBody');
-            let tableHtml = '';
-
-            allParticipants.forEach(participant => {
-                const mapping = imageMapping[participant['A-ID']] || {};
-                const hasImages = mapping.images && Object.keys(mapping.images).length > 0;
-
-                tableHtml += `
-                    <tr>
-                        <td><strong>${participant['A-ID']}</strong></td>
-                        <td>${participant['P-ID']}</td>
-                        <td>${participant['What is your full name? (Please write exactly as shown in your ARC or passport)']}</td>
-                        <td>${participant['What is your gender? '] || '-'}</td>
-                        <td>${participant['What is your nationality?'] || '-'}</td>
-                        <td>${participant['Please enter your 4-digit year of birth(e.g., 1980) '] || '-'}</td>
-                        <td><span class="badge-brightness">${participant['밝기판정'] || '-'}</span></td>
-                        <td><span class="badge-tone">${participant['톤'] || '-'}</span></td>
-                        <td>${participant['Please select the ethnic group you identify with:'] || '-'}</td>
-                        <td>
-                            ${hasImages ?
-                                `<button class="btn btn-view-images" onclick="showImages('${participant['A-ID']}')">View Images</button>` :
-                                '<span class="text-muted">No Images</span>'}
-                        </td>
-                    </tr>`;
-            });
-
-            tableBody.innerHTML = tableHtml;
-
-            // Initialize DataTable
             $('#participantsTable').DataTable({
+                serverSide: true,
+                deferRender: true,
+                searching: true,
+                searchDelay: 200,
                 pageLength: 25,
+                lengthMenu: [10, 25, 50, 100],
                 responsive: true,
                 order: [[0, 'asc']],
+                columnDefs: [
+                    { targets: Object.keys(SORT_COLUMNS).map(Number), orderable: true },
+                    { targets: '_all', orderable: false }
+                ],
+                ajax: function(request, callback) {
+                    const order = request.order[0] || { column: 0, dir: 'asc' };
+                    const sortKey = SORT_COLUMNS[order.column] || 'aid';
+                    const query = (request.search && request.search.value) || '';
+
+                    Promise.all([loadShardIndex(), query ? loadSearchIndex() : null])
+                        .then(async ([index]) => {
+                            const ids = query ? searchParticipants(query) : null;
+                            const rows = ids === null
+                                ? await readRows(sortKey, order.dir, request.start, request.length)
+                                : await readHits(sortKey, order.dir, ids, request.start, request.length);
+                            rowsByAid.clear();
+                            rows.forEach(row => rowsByAid.set(row[COL.aid], row));
+                            callback({
+                                draw: request.draw,
+                                recordsTotal: index.total,
+                                recordsFiltered: ids === null ? index.total : ids.length,
+                                data: rows.map(renderRow)
+                            });
+                        })
+                        .catch(error => {
+                            console.error('Failed to load participant shard:', error);
+                            callback({ draw: request.draw, recordsTotal: 0, recordsFiltered: 0, data: [] });
+                        });
+                },
                 language: {
-                    search: "Search participants:",
+                    search: "Search name / A-ID / P-ID:",
                     lengthMenu: "Show _MENU_ participants per page",
                     info: "Showing _START_ to _END_ of _TOTAL_ participants",
+                    infoFiltered: "(filtered from _MAX_)",
                     paginate: {
                         first: "First",
                         last: "Last",
@@ -519,6 +605,6 @@ with open('makeup-test-dashboard-table.html', 'w', encoding='utf-8') as f:
 print("\n=== Table Dashboard Created ===")
 print(f"✓ Total participants: 133")
 print(f"✓ Full table view with all participant details")
-print(f"✓ Searchable and sortable DataTable")
+print(f"✓ Sortable DataTable paged from {SHARD_DIR}/ ({shard_index['shard_count']} shard(s) per sort key)")
 print(f"✓ Image modal popup for viewing")
 print("\nNew dashboard saved as makeup-test-dashboard-table.html")
\ No newline at end of file
@@ -6,22 +6,16 @@ Create dashboard with dynamic makeup visualization
 import pandas as pd
 import json
 from pathlib import Path
-from collections import Counter
+
+from multiselect import BASE_PRODUCTS_COLUMN, option_counts
 
 # Load Excel data
 df = pd.read_excel('/Users/owlers_dylan/APCLT/makeuptest_AP_Bueatylink_20250927.xlsx')
 print(f"Loaded {len(df)} participants")
 
 # Analyze base products usage
-base_products_column = 'Please select all face/base makeup products you typically use: for your daily makeup routine (Select at least one)'
-all_products = []
-
-for product_list in df[base_products_column].dropna():
-    if isinstance(product_list, str):
-        products = [p.strip() for p in product_list.replace('\n', ',').split(',') if p.strip()]
-        all_products.extend(products)
-
-product_counts = Counter(all_products)
+base_products_column = BASE_PRODUCTS_COLUMN
+product_counts = option_counts(df[base_products_column])
 
 # Create participant data
 participants = []
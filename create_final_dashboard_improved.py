@@ -6,26 +6,20 @@ Create improved final dashboard with base products chart and better layout
 import pandas as pd
 import json
 from pathlib import Path
-from collections import Counter
+
+from multiselect import BASE_PRODUCTS_COLUMN, option_counts
 
 # Load Excel data
 df = pd.read_excel('/Users/owlers_dylan/APCLT/makeuptest_AP_Bueatylink_20250927.xlsx')
 print(f"Loaded {len(df)} participants")
 
 # Analyze base products usage
-base_products_column = 'Please select all face/base makeup products you typically use: for your daily makeup routine (Select at least one)'
-all_products = []
-
-for product_list in df[base_products_column].dropna():
-    if isinstance(product_list, str):
-        # Split by newline or comma
-        products = [p.strip() for p in product_list.replace('\n', ',').split(',') if p.strip()]
-        all_products.extend(products)
+base_products_column = BASE_PRODUCTS_COLUMN
 
 # Count product frequencies
-product_counts = Counter(all_products)
+product_counts = option_counts(df[base_products_column])
 print(f"\nBase Products Usage:")
-for product, count in product_counts.most_common():
+for product, count in product_counts.items():
     print(f"  {product}: {count}")
 
 # Create participant data
@@ -290,7 +284,7 @@ html = f'''<!DOCTYPE html>
         // Data
         const data = {json.dumps(participants, ensure_ascii=False)};
         const imgs = {json.dumps(images, ensure_ascii=False)};
-        const productCounts = {json.dumps(dict(product_counts), ensure_ascii=False)};
+        const productCounts = {json.dumps(product_counts, ensure_ascii=False)};
 
         console.log('Loaded', data.length, 'participants');
 
@@ -3,36 +3,43 @@
 Create final image mapping based on Excel data and image analysis
 """
 
-import pandas as pd
 import json
 import os
-from PIL import Image
 
-def create_final_mapping():
+from stage_profile import stage
+
+def create_final_mapping(excel_path='makeuptest_AP_Bueatylink_20250927.xlsx',
+                         image_types_path='image_type_mapping.json', images_dir='excel_images',
+                         output_path='participant_final_mapping.json'):
     """Create the final participant to image mapping"""
+    # Loaded here so importing this module (famigo, the benchmark) stays cheap
+    import pandas as pd
+    from PIL import Image
 
     # Read Excel data
-    df = pd.read_excel('makeuptest_AP_Bueatylink_20250927.xlsx')
+    with stage('read excel', path=str(excel_path)):
+        df = pd.read_excel(excel_path)
 
     # Load image type mapping
-    with open('image_type_mapping.json', 'r') as f:
+    with open(image_types_path, 'r') as f:
         image_types = json.load(f)
 
     # Get image sizes
-    image_sizes = {}
-    for img_file in os.listdir('excel_images'):
-        if img_file.lower().endswith(('.png', '.jpg', '.jpeg')):
-            img_path = os.path.join('excel_images', img_file)
-            try:
-                img = Image.open(img_path)
-                width, height = img.size
-                image_sizes[img_file] = {
-                    'width': width,
-                    'height': height,
-                    'area': width * height
-                }
-            except:
-                pass
+    with stage('decode image sizes'):
+        image_sizes = {}
+        for img_file in os.listdir(images_dir):
+            if img_file.lower().endswith(('.png', '.jpg', '.jpeg')):
+                img_path = os.path.join(images_dir, img_file)
+                try:
+                    img = Image.open(img_path)
+                    width, height = img.size
+                    image_sizes[img_file] = {
+                        'width': width,
+                        'height': height,
+                        'area': width * height
+                    }
+                except:
+                    pass
 
     # Sort images by size to identify individual photos
     sorted_images = sorted(image_sizes.items(), key=lambda x: x[1]['area'], reverse=True)
@@ -46,66 +53,67 @@ def create_final_mapping():
     # Create participant mapping
     final_mapping = {}
 
-    for idx, row in df.iterrows():
-        aid = row['A-ID']
-        pid = row['P-ID']
-        name = row['What is your full name? (Please write exactly as shown in your ARC or passport)']
-
-        # Assign individual photo (from large images)
-        face_photo = individual_photos[idx] if idx < len(individual_photos) else None
-
-        # Get data values
-        skin_brightness = str(row['밝기판정']) if pd.notna(row['밝기판정']) else ''
-        skin_tone = row['톤'] if pd.notna(row['톤']) else ''
-        hair_type = str(row['What is your Natural-born hair(not styled)?[Please select from the 10 options below]']) if pd.notna(row['What is your Natural-born hair(not styled)?[Please select from the 10 options below]']) else ''
-        eye_color = str(row['Which of the following options most matches your natural eye color?']) if pd.notna(row['Which of the following options most matches your natural eye color?']) else ''
-
-        # Map reference images based on values
-        # Use first 7 small images for skin colors
-        skin_ref_map = {
-            '1': reference_images[0] if len(reference_images) > 0 else None,
-            '2': reference_images[1] if len(reference_images) > 1 else None,
-            '3': reference_images[2] if len(reference_images) > 2 else None,
-            '4': reference_images[3] if len(reference_images) > 3 else None,
-            '5': reference_images[4] if len(reference_images) > 4 else None,
-            '6': reference_images[5] if len(reference_images) > 5 else None,
-            '7': reference_images[6] if len(reference_images) > 6 else None,
-        }
-
-        # Use next 10 for hair types (simplified mapping)
-        hair_ref_idx = hash(hair_type.lower()) % 10 + 7
-        hair_ref = reference_images[hair_ref_idx] if len(reference_images) > hair_ref_idx else None
-
-        # Use next 7 for eye colors (simplified mapping)
-        eye_ref_idx = hash(eye_color.lower()) % 7 + 17
-        eye_ref = reference_images[eye_ref_idx] if len(reference_images) > eye_ref_idx else None
-
-        final_mapping[aid] = {
-            'pid': pid,
-            'name': name,
-            'data': {
-                'skin_brightness': skin_brightness,
-                'skin_tone': skin_tone,
-                'hair_type': hair_type,
-                'eye_color': eye_color,
-                'skin_type': row['What is your skin type?'] if pd.notna(row['What is your skin type?']) else '',
-                'nationality': row['What is your nationality?'] if pd.notna(row['What is your nationality?']) else '',
-                'ethnicity': row['Please select the ethnic group you identify with:'] if pd.notna(row['Please select the ethnic group you identify with:']) else '',
-                'birth_year': row['Please enter your 4-digit year of birth(e.g., 1980) '] if pd.notna(row['Please enter your 4-digit year of birth(e.g., 1980) ']) else '',
-                'gender': row['What is your gender? '] if pd.notna(row['What is your gender? ']) else '',
-                'makeup_frequency': row['How often do you usually apply face makeup? '] if pd.notna(row['How often do you usually apply face makeup? ']) else '',
-                'cushion_usage': row['Have you ever used a cushion foundation?'] if pd.notna(row['Have you ever used a cushion foundation?']) else '',
-            },
-            'images': {
-                'face_photo': face_photo,
-                'skin_brightness_ref': skin_ref_map.get(skin_brightness),
-                'hair_type_ref': hair_ref,
-                'eye_color_ref': eye_ref
+    with stage('map participants', rows=len(df)):
+        for idx, row in df.iterrows():
+            aid = row['A-ID']
+            pid = row['P-ID']
+            name = row['What is your full name? (Please write exactly as shown in your ARC or passport)']
+
+            # Assign individual photo (from large images)
+            face_photo = individual_photos[idx] if idx < len(individual_photos) else None
+
+            # Get data values
+            skin_brightness = str(row['밝기판정']) if pd.notna(row['밝기판정']) else ''
+            skin_tone = row['톤'] if pd.notna(row['톤']) else ''
+            hair_type = str(row['What is your Natural-born hair(not styled)?[Please select from the 10 options below]']) if pd.notna(row['What is your Natural-born hair(not styled)?[Please select from the 10 options below]']) else ''
+            eye_color = str(row['Which of the following options most matches your natural eye color?']) if pd.notna(row['Which of the following options most matches your natural eye color?']) else ''
+
+            # Map reference images based on values
+            # Use first 7 small images for skin colors
+            skin_ref_map = {
+                '1': reference_images[0] if len(reference_images) > 0 else None,
+                '2': reference_images[1] if len(reference_images) > 1 else None,
+                '3': reference_images[2] if len(reference_images) > 2 else None,
+                '4': reference_images[3] if len(reference_images) > 3 else None,
+                '5': reference_images[4] if len(reference_images) > 4 else None,
+                '6': reference_images[5] if len(reference_images) > 5 else None,
+                '7': reference_images[6] if len(reference_images) > 6 else None,
+            }
+
+            # Use next 10 for hair types (simplified mapping)
+            hair_ref_idx = hash(hair_type.lower()) % 10 + 7
+            hair_ref = reference_images[hair_ref_idx] if len(reference_images) > hair_ref_idx else None
+
+            # Use next 7 for eye colors (simplified mapping)
+            eye_ref_idx = hash(eye_color.lower()) % 7 + 17
+            eye_ref = reference_images[eye_ref_idx] if len(reference_images) > eye_ref_idx else None
+
+            final_mapping[aid] = {
+                'pid': pid,
+                'name': name,
+                'data': {
+                    'skin_brightness': skin_brightness,
+                    'skin_tone': skin_tone,
+                    'hair_type': hair_type,
+                    'eye_color': eye_color,
+                    'skin_type': row['What is your skin type?'] if pd.notna(row['What is your skin type?']) else '',
+                    'nationality': row['What is your nationality?'] if pd.notna(row['What is your nationality?']) else '',
+                    'ethnicity': row['Please select the ethnic group you identify with:'] if pd.notna(row['Please select the ethnic group you identify with:']) else '',
+                    'birth_year': row['Please enter your 4-digit year of birth(e.g., 1980) '] if pd.notna(row['Please enter your 4-digit year of birth(e.g., 1980) ']) else '',
+                    'gender': row['What is your gender? '] if pd.notna(row['What is your gender? ']) else '',
+                    'makeup_frequency': row['How often do you usually apply face makeup? '] if pd.notna(row['How often do you usually apply face makeup? ']) else '',
+                    'cushion_usage': row['Have you ever used a cushion foundation?'] if pd.notna(row['Have you ever used a cushion foundation?']) else '',
+                },
+                'images': {
+                    'face_photo': face_photo,
+                    'skin_brightness_ref': skin_ref_map.get(skin_brightness),
+                    'hair_type_ref': hair_ref,
+                    'eye_color_ref': eye_ref
+                }
             }
-        }
 
     # Save the final mapping
-    with open('participant_final_mapping.json', 'w', encoding='utf-8') as f:
+    with stage('write mapping'), open(output_path, 'w', encoding='utf-8') as f:
         json.dump(final_mapping, f, ensure_ascii=False, indent=2)
 
     print(f"=== Final Mapping Created ===")
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Precomputed admin-dashboard aggregates, served over HTTP
+
+The admin dashboard downloads every participant and attendance record and
+then joins and counts them in the browser on each refresh. This server
+does that work once, on the SQLite mirror (airtable_mirror.py), and keeps
+the results current as the mirror's delta syncs report changes. Only the
+participants a change touches are re-counted.
+
+    GET /aggregates            slot / status / reward / skin-quota counts, visits, recent check-ins
+    GET /aggregates/joined     participants joined with their attendance (as mergeData() builds them)
+                               ?setDate=9/22&setTime=13:00&status=Confirmed&attendanceStatus=Attended
+    GET /v0/..., /status       the mirror's read API
+
+Against the mock: AIRTABLE_API_URL=http://127.0.0.1:8787/v0 AIRTABLE_API_KEY=mock \\
+    python dashboard_aggregates.py
+From an existing mirror, without touching Airtable: python dashboard_aggregates.py --offline
+"""
+
+import argparse
+import os
+import sys
+import threading
+from collections import Counter, defaultdict
+from http.server import ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from airtable_client import AirtableClient
+from airtable_mirror import AIRTABLE_BASE_ID, MIRROR_DB, AirtableMirror, sync_forever
+from airtable_mirror import make_handler as mirror_handler
+
+# Same buckets as the dashboard's reward bars (updateRewardDistribution)
+REWARD_KINDS = {'Gift-Card': 'MobileVoucher', 'MobileVoucher': 'MobileVoucher',
+                'Transfer': 'Cash', 'Cash': 'Cash'}
+
+RECENT_CHECKINS = 10
+
+
+def reward_kind(reward_type: Optional[str]) -> str:
+    return REWARD_KINDS.get(reward_type or '', 'None')
+
+
+class DashboardAggregates:
+    """
+    Participant/attendance join and counters, updated per changed record.
+
+    Every participant contributes a handful of counter keys derived from
+    its joined row; a change subtracts the old keys of the participants it
+    touches and adds their new ones.
+    """
+
+    def __init__(self, mirror: AirtableMirror, participants: str = 'participants',
+                 attendance: str = 'attendance'):
+        self.mirror = mirror
+        self.participants_table = participants
+        self.attendance_table = attendance
+        self.lock = threading.Lock()
+        self.participants: Dict[str, dict] = {}           # record id -> fields
+        self.attendance: Dict[str, dict] = {}             # record id -> fields + createdTime
+        self.by_participant_id: Dict[object, set] = defaultdict(set)      # ID -> participant record ids
+        self.attendance_by_pid: Dict[object, List[str]] = defaultdict(list)  # participantID -> attendance ids
+        self.joined: Dict[str, dict] = {}
+        self.keys: Dict[str, List[tuple]] = {}
+        self.counts: Counter = Counter()
+        self.visits: Counter = Counter()
+        self.version = 0
+
+        for record in mirror.records(attendance):
+            self._put_attendance(record)
+        for record in mirror.records(participants):
+            self._put_participant(record)
+        for record_id in self.participants:
+            self._rejoin(record_id)
+        mirror.listeners.append(self.on_change)
+
+    # --- record bookkeeping ---
+
+    def _put_participant(self, record: dict):
+        old = self.participants.get(record['id'])
+        if old is not None:
+            self.by_participant_id[old.get('ID')].discard(record['id'])
+        self.participants[record['id']] = record['fields']
+        self.by_participant_id[record['fields'].get('ID')].add(record['id'])
+
+    def _drop_participant(self, record_id: str):
+        old = self.participants.pop(record_id, None)
+        if old is not None:
+            self.by_participant_id[old.get('ID')].discard(record_id)
+
+    def _put_attendance(self, record: dict):
+        self._drop_attendance(record['id'])
+        fields = dict(record['fields'], _created=record.get('createdTime') or '')
+        self.attendance[record['id']] = fields
+        ids = self.attendance_by_pid[fields.get('participantID')]
+        ids.append(record['id'])
+        # The dashboard joins each participant to its first attendance record (mirror order)
+        ids.sort(key=lambda i: (self.attendance[i]['_created'], i))
+        if fields.get('attendanceStatus') == 'Attended':
+            self.visits[fields.get('participantID')] += 1
+
+    def _drop_attendance(self, record_id: str):
+        old = self.attendance.pop(record_id, None)
+        if old is None:
+            return
+        self.attendance_by_pid[old.get('participantID')].remove(record_id)
+        if old.get('attendanceStatus') == 'Attended':
+            self.visits[old.get('participantID')] -= 1
+
+    # --- join and counters ---
+
+    def _join(self, record_id: str) -> dict:
+        fields = self.participants[record_id]
+        row = dict(fields, recordId=record_id, attendanceStatus='Pending')
+        attendance_ids = self.attendance_by_pid.get(fields.get('ID')) or []
+        if attendance_ids:
+            attendance = self.attendance[attendance_ids[0]]
+            row.update({
+                'attendanceStatus': attendance.get('attendanceStatus') or 'Pending',
+                'checkinTime': attendance.get('checkinTime'),
+                'rewardType': attendance.get('rewardType'),
+                'staffName': attendance.get('staffName'),
+                'aID': attendance.get('A-ID'),
+                'attendanceRecordId': attendance_ids[0],
+            })
+        return row
+
+    @staticmethod
+    def _keys(row: dict) -> List[tuple]:
+        keys = [('status', row.get('status') or 'Unknown')]
+        if row.get('status') == 'Confirmed':
+            attendance = row['attendanceStatus']
+            keys += [
+                ('attendance', attendance),
+                ('slot', row.get('setDate') or '', row.get('setTime') or '', attendance),
+                ('quota', row.get('skinColor') or '', row.get('skinTone') or '', attendance),
+            ]
+        if row['attendanceStatus'] == 'Attended':
+            keys.append(('reward', reward_kind(row.get('rewardType'))))
+        return keys
+
+    def _rejoin(self, record_id: str):
+        for key in self.keys.pop(record_id, []):
+            self.counts[key] -= 1
+        self.joined.pop(record_id, None)
+        if record_id not in self.participants:
+            return
+        row = self._join(record_id)
+        self.joined[record_id] = row
+        self.keys[record_id] = self._keys(row)
+        for key in self.keys[record_id]:
+            self.counts[key] += 1
+
+    def on_change(self, table: str, version: int, upserted: List[dict], deleted: List[str]):
+        """Mirror listener: apply one table's changes and re-count the participants they touch"""
+        if table not in (self.participants_table, self.attendance_table):
+            return
+        with self.lock:
+            touched = set()
+            if table == self.participants_table:
+                for record_id in deleted:
+                    self._drop_participant(record_id)
+                    touched.add(record_id)
+                for record in upserted:
+                    self._put_participant(record)
+                    touched.add(record['id'])
+            else:
+                pids = set()
+                for record_id in deleted:
+                    if record_id in self.attendance:
+                        pids.add(self.attendance[record_id].get('participantID'))
+                    self._drop_attendance(record_id)
+                for record in upserted:
+                    if record['id'] in self.attendance:
+                        pids.add(self.attendance[record['id']].get('participantID'))
+                    self._put_attendance(record)
+                    pids.add(record['fields'].get('participantID'))
+                for pid in pids:
+                    touched |= self.by_participant_id.get(pid, set())
+            for record_id in touched:
+                self._rejoin(record_id)
+            self.version += 1
+
+    # --- views ---
+
+    def summary(self) -> dict:
+        with self.lock:
+            slots: Dict[str, Dict[str, Counter]] = defaultdict(lambda: defaultdict(Counter))
+            quotas: Dict[str, Dict[str, Counter]] = defaultdict(lambda: defaultdict(Counter))
+            status, attendance, rewards = Counter(), Counter(), Counter()
+            for key, count in self.counts.items():
+                if count <= 0:
+                    continue
+                if key[0] == 'slot':
+                    slots[key[1]][key[2]][key[3]] += count
+                elif key[0] == 'quota':
+                    quotas[key[1]][key[2]][key[3]] += count
+                elif key[0] == 'status':
+                    status[key[1]] += count
+                elif key[0] == 'attendance':
+                    attendance[key[1]] += count
+                elif key[0] == 'reward':
+                    rewards[key[1]] += count
+
+            recent = sorted((row for row in self.joined.values() if row.get('checkinTime')),
+                            key=lambda row: (row['checkinTime'], row['recordId']), reverse=True)[:RECENT_CHECKINS]
+            return {
+                'version': self.version,
+                'participants': len(self.participants),
+                'attendanceRecords': len(self.attendance),
+                'status': dict(status),
+                'attendance': dict(attendance),
+                # setDate -> setTime -> {Attended, Pending, No-show}, confirmed participants only
+                'slots': {date: {time: dict(c) for time, c in sorted(times.items())}
+                          for date, times in sorted(slots.items())},
+                # skinColor -> skinTone -> {Attended, Pending, No-show}, confirmed participants only
+                'quotas': {color: {tone: dict(c) for tone, c in sorted(tones.items())}
+                           for color, tones in sorted(quotas.items())},
+                'rewards': {kind: rewards.get(kind, 0) for kind in ('MobileVoucher', 'Cash', 'None')},
+                'visits': {str(pid): count for pid, count in self.visits.items() if count > 0},
+                'recentCheckins': recent,
+            }
+
+    def joined_rows(self, filters: Optional[Dict[str, str]] = None) -> List[dict]:
+        filters = filters or {}
+        with self.lock:
+            return [row for row in self.joined.values()
+                    if all(str(row.get(field)) == value for field, value in filters.items())]
+
+
+def make_handler(aggregates: DashboardAggregates):
+    Base = mirror_handler(aggregates.mirror)
+
+    class Handler(Base):
+        def do_GET(self):
+            url = urlparse(self.path)
+            path = url.path.rstrip('/')
+            if path == '/aggregates':
+                self._send(200, aggregates.summary())
+            elif path == '/aggregates/joined':
+                filters = {field: values[0] for field, values in parse_qs(url.query).items()}
+                rows = aggregates.joined_rows(filters)
+                self._send(200, {'version': aggregates.version, 'count': len(rows), 'rows': rows})
+            else:
+                super().do_GET()
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve precomputed admin dashboard aggregates')
+    parser.add_argument('--db', default=MIRROR_DB)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8790)
+    parser.add_argument('--interval', type=float, default=10.0, help='seconds between delta syncs')
+    parser.add_argument('--offline', action='store_true', help='serve the mirror as it is, without syncing')
+    args = parser.parse_args()
+
+    if args.offline:
+        mirror = AirtableMirror(db_path=args.db)
+    else:
+        api_key = os.environ.get('AIRTABLE_API_KEY')
+        if not api_key:
+            print("Please set the AIRTABLE_API_KEY environment variable (or use --offline)")
+            sys.exit(1)
+        mirror = AirtableMirror(AirtableClient(api_key, AIRTABLE_BASE_ID), db_path=args.db)
+        print(f"Syncing {', '.join(mirror.tables)} into {args.db}...")
+        mirror.sync_all()
+
+    aggregates = DashboardAggregates(mirror)
+    print(f"✓ {len(aggregates.participants)} participants, {len(aggregates.attendance)} attendance records")
+
+    stop = threading.Event()
+    if not args.offline:
+        threading.Thread(target=sync_forever, args=(mirror, args.interval, stop), daemon=True).start()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(aggregates))
+    server.daemon_threads = True
+    print(f"✓ Aggregates on http://{args.host}:{args.port}/aggregates")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        stop.set()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Split participant records into list-view rows (embedded in the dashboard)
+and lazily fetched per-A-ID detail bundles for the participant modal
+"""
+
+import json
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from stage_profile import profiled
+
+NAME_COLUMN = 'What is your full name? (Please write exactly as shown in your ARC or passport)'
+
+# Columns the participant table and its filters read
+LIST_COLUMNS = [
+    'A-ID',
+    'P-ID',
+    NAME_COLUMN,
+    'What is your nationality?',
+    'Please select the ethnic group you identify with:',
+    'Please enter your 4-digit year of birth(e.g., 1980) ',
+    '밝기판정',
+    '톤',
+    'What is your skin type?',
+    'setDate',
+]
+
+# Columns only the detail modal reads
+DETAIL_COLUMNS = [
+    'What is your gender? ',
+    'How would you rate your English speaking ability?',
+    'How long have you been living in Korea?',
+    'Which of the following options most matches your natural eye color?',
+    'What is your Natural-born hair(not styled)?[Please select from the 10 options below]',
+    'How often do you usually apply face makeup? ',
+    'Have you ever used a cushion foundation?',
+    'How often do you usually use sunscreen products?',
+    'How many times do you visit cosmetic store?',
+    'Please check the one that best describes how you usually buy cosmetics.',
+    'setTime',
+    'Which of the following makeup looks do you prefer the most after applying makeup?',
+]
+
+DEFAULT_GROUP_SIZE = 256
+
+
+def _clean(value):
+    """Make a cell JSON-safe (NaN -> None)"""
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+def bundle_name(index: int, aid: str, group_size: int) -> str:
+    """File stem of the bundle holding the participant at list position `index`"""
+    if group_size == 1:
+        return str(aid)
+    return f'group-{index // group_size:05d}'
+
+
+@profiled('split participants')
+def split_participants(participants: List[dict], image_mapping: Optional[Dict[str, dict]] = None,
+                       group_size: int = DEFAULT_GROUP_SIZE) -> Tuple[List[dict], Dict[str, dict]]:
+    """
+    Return (list_rows, bundles).
+
+    list_rows keep only LIST_COLUMNS plus a `_bundle` pointer; bundles maps
+    bundle name -> {A-ID: {'participant', 'data', 'images'}}.
+    """
+    image_mapping = image_mapping or {}
+    list_rows = []
+    bundles: Dict[str, dict] = {}
+
+    for index, participant in enumerate(participants):
+        aid = participant.get('A-ID')
+        name = bundle_name(index, aid, group_size)
+
+        row = {col: _clean(participant.get(col)) for col in LIST_COLUMNS}
+        row['_bundle'] = name
+        list_rows.append(row)
+
+        mapping = image_mapping.get(aid, {})
+        bundles.setdefault(name, {})[aid] = {
+            'participant': {col: _clean(participant.get(col)) for col in DETAIL_COLUMNS
+                            if _clean(participant.get(col)) is not None},
+            'data': mapping.get('data', {}),
+            'images': mapping.get('images', {}),
+        }
+
+    return list_rows, bundles
+
+
+@profiled('write detail bundles')
+def write_detail_bundles(bundles: Dict[str, dict], out_dir: str) -> int:
+    """Write one compact JSON file per bundle; returns the number of files written"""
+    out_path = Path(out_dir)
+    if out_path.exists():
+        shutil.rmtree(out_path)
+    out_path.mkdir(parents=True)
+
+    for name, members in bundles.items():
+        with open(out_path / f'{name}.json', 'w', encoding='utf-8') as f:
+            json.dump(members, f, ensure_ascii=False, separators=(',', ':'))
+
+    print(f"✓ Wrote {len(bundles)} detail bundle(s) to {out_path}/")
+    return len(bundles)
+
+
+# Fetches bundles on demand and keeps the most recently used ones in memory
+LAZY_DETAIL_JS = """
+        // Lazy detail bundles (fetched when the modal opens, LRU cached)
+        const DETAIL_BUNDLE_DIR = '__DETAIL_DIR__';
+        const MAX_CACHED_BUNDLES = __MAX_CACHED__;
+        const detailBundleCache = new Map();
+
+        async function loadDetailBundle(name) {
+            if (detailBundleCache.has(name)) {
+                const cached = detailBundleCache.get(name);
+                detailBundleCache.delete(name);
+                detailBundleCache.set(name, cached);
+                return cached;
+            }
+
+            const pending = fetch(`${DETAIL_BUNDLE_DIR}/${encodeURIComponent(name)}.json`)
+                .then(response => {
+                    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                    return response.json();
+                });
+            detailBundleCache.set(name, pending);
+            while (detailBundleCache.size > MAX_CACHED_BUNDLES) {
+                detailBundleCache.delete(detailBundleCache.keys().next().value);
+            }
+
+            try {
+                return await pending;
+            } catch (error) {
+                detailBundleCache.delete(name);
+                throw error;
+            }
+        }
+
+        async function loadParticipantDetail(participant) {
+            try {
+                const bundle = await loadDetailBundle(participant._bundle || participant['A-ID']);
+                return bundle[participant['A-ID']] || { participant: {}, data: {}, images: {} };
+            } catch (error) {
+                console.error('Error loading participant detail:', error);
+                return { participant: {}, data: {}, images: {} };
+            }
+        }
+"""
+
+
+def lazy_detail_js(detail_dir: str, max_cached: int = 32) -> str:
+    return (LAZY_DETAIL_JS
+            .replace('__DETAIL_DIR__', detail_dir)
+            .replace('__MAX_CACHED__', str(max_cached)))
+
+
+# Detail modal that merges the list row with its lazily loaded bundle
+SHOW_PARTICIPANT_DETAIL_JS = """
+        // Show participant detail modal with enhanced image display
+        async function showParticipantDetail(listRow) {
+            const modal = document.getElementById('participantModal');
+            const aid = listRow['A-ID'];
+            const name = listRow['What is your full name? (Please write exactly as shown in your ARC or passport)'] || 'Unknown';
+
+            // Update modal header
+            document.getElementById('modalParticipantName').textContent = name;
+            document.getElementById('modalParticipantId').textContent = `A-ID: ${aid} | P-ID: ${listRow['P-ID'] || '-'}`;
+
+            // Detail-only fields and image references come from the bundle
+            const detail = await loadParticipantDetail(listRow);
+            const participant = Object.assign({}, listRow, detail.participant);
+            const images = detail.images || {};
+            const data = detail.data || {};
+
+            // Personal Information
+            const personalInfo = document.getElementById('personalInfo');
+            personalInfo.innerHTML = `
+                <div class="detail-item">
+                    <span class="detail-label">Name:</span>
+                    <span class="detail-value">${name}</span>
+                </div>
+                <div class="detail-item">
+                    <span class="detail-label">Gender:</span>
+                    <span class="detail-value">${data.gender || participant['What is your gender? '] || '-'}</span>
+                </div>
+                <div class="detail-item">
+                    <span class="detail-label">Birth Year:</span>
+                    <span class="detail-value">${data.birth_year || participant['Please enter your 4-digit year of birth(e.g., 1980) '] || '-'}</span>
+                </div>
+                <div class="detail-item">
+                    <span class="detail-label">Nationality:</span>
+                    <span class="detail-value">${data.nationality || participant['What is your nationality?'] || '-'}</span>
+                </div>
+                <div class="detail-item">
+                    <span class="detail-label">Ethnicity:</span>
+                    <span class="detail-value">${data.ethnicity || participant['Please select the ethnic group you identify with:'] || '-'}</span>
+                </div>
+            `;
+
+            // Skin Analysis with images
+            const skinColor = data.skin_brightness || participant['밝기판정'] || '-';
+            const skinTone = data.skin_tone || participant['톤'] || '-';
+            const colorInfo = skinColorInfo[skinColor] || { hex: '#ccc', label: skinColor };
+
+            const skinInfo = document.getElementById('skinInfo');
+            skinInfo.innerHTML = `
+                <div class="detail-item">
+                    <span class="detail-label">Skin Color:</span>
+                    <span class="detail-value">
+                        <span class="skin-color-box" style="background: ${colorInfo.hex};"></span>
+                        ${skinColor}(${colorInfo.label})
+                        ${images.skin_brightness_ref ? `<br><img src="excel_images/${images.skin_brightness_ref}" style="max-width: 100px; margin-top: 5px; border-radius: 5px;">` : ''}
+                    </span>
+                </div>
+                <div class="detail-item">
+                    <span class="detail-label">Skin Tone:</span>
+                    <span class="detail-value">
+                        <span class="tone-badge ${skinTone}">${skinTone}</span>
+                    </span>
+                </div>
+                <div class="detail-item">
+                    <span class="detail-label">Skin Type:</span>
+                    <span class="detail-value">${data.skin_type || participant['What is your skin type?'] || '-'}</span>
+                </div>
+                <div class="detail-item">
+                    <span class="detail-label">Eye Color:</span>
+                    <span class="detail-value">
+                        ${data.eye_color || participant['Which of the following options most matches your natural eye color?'] || '-'}
+                        ${images.eye_color_ref ? `<br><img src="excel_images/${images.eye_color_ref}" style="max-width: 100px; margin-top: 5px; border-radius: 5px;">` : ''}
+                    </span>
+                </div>
+                <div class="detail-item">
+                    <span class="detail-label">Hair Type:</span>
+                    <span class="detail-value">
+                        ${data.hair_type || participant['What is your Natural-born hair(not styled)?[Please select from the 10 options below]'] || '-'}
+                        ${images.hair_type_ref ? `<br><img src="excel_images/${images.hair_type_ref}" style="max-width: 100px; margin-top: 5px; border-radius: 5px;">` : ''}
+                    </span>
+                </div>
+            `;
+
+            // Makeup Preferences
+            const makeupInfo = document.getElementById('makeupInfo');
+            makeupInfo.innerHTML = `
+                <div class="detail-item">
+                    <span class="detail-label">Makeup Frequency:</span>
+                    <span class="detail-value">${data.makeup_frequency || participant['How often do you usually apply face makeup? '] || '-'}</span>
+                </div>
+                <div class="detail-item">
+                    <span class="detail-label">Cushion Usage:</span>
+                    <span class="detail-value">${data.cushion_usage || participant['Have you ever used a cushion foundation?'] || '-'}</span>
+                </div>
+                <div class="detail-item">
+                    <span class="detail-label">Sunscreen Usage:</span>
+                    <span class="detail-value">${participant['How often do you usually use sunscreen products?'] || '-'}</span>
+                </div>
+            `;
+
+            // Survey Responses
+            const surveyInfo = document.getElementById('surveyInfo');
+            surveyInfo.innerHTML = `
+                <div class="detail-item">
+                    <span class="detail-label">Set Date:</span>
+                    <span class="detail-value">${participant['setDate'] || '-'}</span>
+                </div>
+                <div class="detail-item">
+                    <span class="detail-label">Set Time:</span>
+                    <span class="detail-value">${participant['setTime'] || '-'}</span>
+                </div>
+            `;
+
+            // Load participant face photo
+            const imagesContainer = document.getElementById('participantImages');
+            if (images.face_photo) {
+                imagesContainer.innerHTML = `
+                    <div class="participant-image" style="max-width: 400px; margin: 0 auto;">
+                        <img src="excel_images/${images.face_photo}"
+                             alt="${name} - Face Photo"
+                             style="width: 100%; height: auto; border-radius: 10px; box-shadow: 0 5px 15px rgba(0,0,0,0.1);"
+                             onerror="this.parentElement.innerHTML='<div class=\\"no-images\\">No face photo available</div>'">
+                    </div>
+                `;
+            } else {
+                imagesContainer.innerHTML = '<div class="no-images">No face photo available for this participant</div>';
+            }
+
+            // Show modal
+            modal.style.display = 'block';
+        }"""
+
+
+@profiled('inject lazy dashboard')
+def inject_lazy_dashboard(html_template: str, list_rows: List[dict], analysis_data: dict,
+                          detail_dir: str, max_cached: int = 32) -> str:
+    """
+    Embed only the list-view rows and summary into the v2 dashboard template
+    and swap its detail modal for the lazily loading one.
+    """
+    summary_only = {k: v for k, v in analysis_data.items() if k != 'participant_data'}
+
+    script_inject = f"""let allParticipants = {json.dumps(list_rows, ensure_ascii=False)};
+        let analysisData = {json.dumps(summary_only, ensure_ascii=False)};
+        let imageMapping = {{}};
+{lazy_detail_js(detail_dir, max_cached)}"""
+
+    html = html_template.replace(
+        'let allParticipants = [];\n        let analysisData = null;\n        let imageMapping = {};',
+        script_inject
+    )
+
+    # Comment out fetch functions
+    html = html.replace('await loadAnalysisData();', '// Data embedded directly')
+    html = html.replace('await loadImageMapping();', '// Details loaded on demand')
+    html = html.replace('await loadParticipantData();', 'displayParticipants(allParticipants);')
+
+    # Replace the showParticipantDetail function
+    start_idx = html.find("// Show participant detail modal")
+    end_idx = html.find("// Close participant modal")
+    if start_idx != -1 and end_idx != -1:
+        html = html[:start_idx] + SHOW_PARTICIPANT_DETAIL_JS.lstrip() + "\n\n        " + html[end_idx:]
+
+    return html
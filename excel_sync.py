@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Generic Excel -> Airtable field sync
+
+A mapping lists which Excel column feeds which Airtable field and how the
+value is transformed. The Excel sheet is joined to the fetched records on
+the normalized P-ID with one merge, every mapped field is compared column
+by column, and each record gets a PATCH carrying only the fields that
+actually changed. Records are written 10 per request whatever the number
+of fields, so a 20-field sync costs the same requests as a 2-field one.
+
+    mapping = [
+        {'column': '밝기판정', 'field': 'skinColor', 'transform': SKIN_COLOR_MAP},
+        {'column': '톤', 'field': 'skinTone', 'transform': SKIN_TONE_MAP},
+    ]
+
+'column' is an exact column name or a list of substrings to look for;
+'transform' is a dict (unknown values pass through) or a callable. 'type'
+says what the Airtable field holds: 'text' (the default), 'number', 'date'
+(YYYY-MM-DD), 'checkbox' or 'list' (multi-select; cells split on commas),
+so values are sent as that type rather than as text. Blank Excel cells
+never clear an Airtable field unless the entry sets 'clear'. An entry
+marked 'optional' is dropped when its column isn't in the sheet.
+
+Excel rows with no matching record can be created instead (upsert):
+compute_creates() builds their fields and write_creates() POSTs them 10
+per request through the same client.
+"""
+
+import csv
+import time
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from airtable_client import AirtableClient, chunked, formula_any_of
+from sync_journal import SyncJournal
+
+KEY_FIELDS = ('P-ID', 'ID')
+
+FieldMapping = List[dict]
+
+
+def find_column(df: pd.DataFrame, column: Union[str, List[str]]) -> Optional[str]:
+    """Exact column name, or the first column containing one of the given substrings"""
+    if isinstance(column, str):
+        return column if column in df.columns else None
+    for candidate in column:
+        for col in df.columns:
+            if candidate in str(col):
+                return col
+    return None
+
+
+def as_text(series: pd.Series) -> pd.Series:
+    """Cell values as stripped strings (NA for blanks); 3.0 -> '3'"""
+    def text(value):
+        if value is None or (isinstance(value, float) and pd.isna(value)):
+            return pd.NA
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        value = str(value).strip()
+        return value if value else pd.NA
+    return series.map(text).astype('string')
+
+
+def pid_text(series: pd.Series) -> pd.Series:
+    """P-IDs as written: trimmed, upper-case text (NA for blanks); 123.0 -> '123'"""
+    return as_text(series).str.upper()
+
+
+# 'P007', 'p-7', '007', 7 and 7.0 all name participant 7
+PID_PATTERN = r'^P?-?0*(\d+)$'
+
+
+def normalize_pid(series: pd.Series) -> pd.Series:
+    """
+    Join key for P-IDs and numeric IDs: 'P' + the number without leading
+    zeros ('P007', ' p7', '007', 7.0 -> 'P7'). Values that aren't a
+    number with an optional P prefix keep their upper-case text, minus spaces.
+    """
+    text = pid_text(series).str.replace(r'\s+', '', regex=True)
+    digits = text.str.extract(PID_PATTERN, expand=False)
+    return ('P' + digits).fillna(text)
+
+
+def _blank(value) -> bool:
+    """None, NaN/NaT, '' and [] (pd.isna can't take lists)"""
+    if isinstance(value, (list, tuple)):
+        return not value
+    if isinstance(value, str):
+        return not value.strip()
+    return value is None or bool(pd.isna(value))
+
+
+def typed_value(value, kind: str = 'text'):
+    """One Excel cell as the Airtable field type expects it; None for blanks"""
+    if _blank(value):
+        return None
+    if kind == 'list':
+        items = value if isinstance(value, (list, tuple)) else str(value).split(',')
+        items = [str(item).strip() for item in items if not _blank(item)]
+        return items or None
+    if kind == 'number':
+        number = value if isinstance(value, (int, float)) else pd.to_numeric(str(value).strip(), errors='coerce')
+        if _blank(number):
+            return None
+        number = number.item() if hasattr(number, 'item') else number
+        return int(number) if isinstance(number, float) and number.is_integer() else number
+    if kind == 'date':
+        if isinstance(value, (datetime, date)):
+            return value.strftime('%Y-%m-%d')
+        parsed = pd.to_datetime(str(value).strip(), errors='coerce')
+        return str(value).strip() if pd.isna(parsed) else parsed.strftime('%Y-%m-%d')
+    if kind == 'checkbox':
+        if isinstance(value, str):
+            return value.strip().lower() in ('true', 'yes', 'y', '1', 'o', 'x', '✓')
+        return bool(value)
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def comparable(value):
+    """
+    Excel and Airtable values in one form for comparison: blanks -> None,
+    lists element by element, everything else as text (3.0 == 3 == '3')
+    """
+    if _blank(value):
+        return None
+    if isinstance(value, (list, tuple)):
+        return tuple(comparable(item) for item in value)
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def apply_transform(series: pd.Series, transform: Union[None, Dict, Callable], kind: str = 'text') -> pd.Series:
+    if kind != 'text':
+        # Built as plain lists: Series.map would turn [3, None] into floats and NaN
+        values = [typed_value(value, kind) for value in series]
+        if isinstance(transform, dict):
+            values = [value if value is None or isinstance(value, list) else transform.get(value, value)
+                      for value in values]
+        elif transform is not None:
+            values = [None if value is None else transform(value) for value in values]
+        return pd.Series([None if _blank(value) else value for value in values], index=series.index, dtype=object)
+
+    values = as_text(series)
+    if transform is None:
+        return values.astype(object).where(values.notna(), None)
+    if isinstance(transform, dict):
+        mapped = values.map(transform, na_action='ignore')
+        result = mapped.where(mapped.notna(), values)
+    else:
+        result = values.map(transform, na_action='ignore')
+    return result.astype(object).where(result.notna(), None)
+
+
+def records_frame(records: List[dict], fields: List[str]) -> pd.DataFrame:
+    """Airtable records -> DataFrame with 'id', '_key' (P-ID, else ID) and the given fields"""
+    frame = pd.DataFrame({'id': [r['id'] for r in records]})
+    for field in dict.fromkeys(list(KEY_FIELDS) + list(fields)):
+        frame[field] = [r['fields'].get(field) for r in records]
+    frame['_key'] = normalize_pid(frame['P-ID']).fillna(normalize_pid(frame['ID']))
+    return frame
+
+
+def resolve_mapping(excel_df: pd.DataFrame, mapping: FieldMapping) -> FieldMapping:
+    """Fill in each entry's actual Excel column; raises KeyError if a required one is missing"""
+    resolved = []
+    for entry in mapping:
+        col = find_column(excel_df, entry['column'])
+        if col is None and entry.get('optional'):
+            continue
+        if col is None:
+            raise KeyError(f"No Excel column for {entry['field']} ({entry['column']})")
+        resolved.append(dict(entry, column=col))
+    return resolved
+
+
+def compute_diffs(excel_df: pd.DataFrame, records: List[dict], mapping: FieldMapping,
+                  pid_column: str) -> Tuple[List[dict], dict]:
+    """
+    Join Excel rows to Airtable records on the normalized P-ID (one merge)
+    and return ([{'id', 'pid', 'name', 'fields': {changed only}, 'old': {...}}, ...], stats).
+
+    Excel P-IDs that match more than one Airtable record are ambiguous:
+    they are reported in stats and left alone rather than guessed at.
+    """
+    mapping = resolve_mapping(excel_df, mapping)
+    fields = [entry['field'] for entry in mapping]
+
+    excel = pd.DataFrame({'_key': normalize_pid(excel_df[pid_column]), '_pid': pid_text(excel_df[pid_column])})
+    for entry in mapping:
+        excel[f"new:{entry['field']}"] = apply_transform(excel_df[entry['column']], entry.get('transform'),
+                                                         entry.get('type', 'text'))
+    excel = excel[excel['_key'].notna()]
+    duplicates = int(excel['_key'].duplicated().sum())
+    excel = excel.drop_duplicates('_key', keep='last')
+
+    airtable = records_frame(records, fields + ['name'])
+    airtable = airtable[airtable['_key'].notna()]
+    multiplicity = airtable['_key'].value_counts()
+    ambiguous_keys = multiplicity.index[multiplicity > 1]
+    candidates = airtable[airtable['_key'].isin(ambiguous_keys)].groupby('_key')['id'].agg(list)
+
+    merged = excel.merge(airtable[~airtable['_key'].isin(ambiguous_keys)], on='_key', how='left', indicator=True)
+    ambiguous = merged['_key'].isin(ambiguous_keys)
+    unmatched = (merged['_merge'] == 'left_only') & ~ambiguous
+    matched = merged[merged['_merge'] == 'both'].reset_index(drop=True)
+
+    changed = pd.DataFrame(index=matched.index)
+    for entry in mapping:
+        field = entry['field']
+        new = matched[f'new:{field}'].map(comparable)
+        old = matched[field].map(comparable)
+        same = pd.Series([a == b for a, b in zip(new, old)], index=matched.index, dtype=bool)
+        if not entry.get('clear'):
+            same |= new.isna()
+        changed[field] = ~same
+
+    diffs = []
+    rows = matched[changed.any(axis=1)]
+    for idx, row in rows.iterrows():
+        changed_fields = [field for field in fields if changed.at[idx, field]]
+        diffs.append({
+            'id': row['id'],
+            'pid': row['_pid'],
+            'name': row['name'] if isinstance(row['name'], str) else 'Unknown',
+            'fields': {field: row[f'new:{field}'] for field in changed_fields},
+            'old': {field: None if _blank(row[field]) else row[field] for field in changed_fields},
+        })
+
+    stats = {
+        'excel_rows': len(excel),
+        'duplicate_pids': duplicates,
+        'matched': len(matched),
+        'no_ops': len(matched) - len(diffs),
+        'noop_pids': matched.loc[~changed.any(axis=1), '_pid'].tolist(),
+        'unmatched': int(unmatched.sum()),
+        'unmatched_pids': merged.loc[unmatched, '_pid'].tolist(),
+        'ambiguous': int(ambiguous.sum()),
+        # Excel P-ID -> the Airtable record ids it could mean
+        'ambiguous_pids': {row['_pid']: candidates[row['_key']] for _, row in merged[ambiguous].iterrows()},
+        'records_to_update': len(diffs),
+        'field_changes': {field: int(changed[field].sum()) for field in fields},
+    }
+    return diffs, stats
+
+
+def compute_creates(excel_df: pd.DataFrame, mapping: FieldMapping, pid_column: str,
+                    pids: List[str], key_field: str = 'P-ID') -> List[dict]:
+    """
+    Fields for the Excel rows whose P-ID is in `pids` (usually
+    stats['unmatched_pids']): [{'pid', 'name', 'fields'}, ...]. The P-ID
+    is written as it appears in Excel. Blank cells are left out; duplicate
+    P-IDs keep the last row.
+    """
+    mapping = resolve_mapping(excel_df, mapping)
+    keys = normalize_pid(excel_df[pid_column])
+    rows = excel_df[keys.isin(set(normalize_pid(pd.Series(list(pids), dtype=object)).dropna())).fillna(False)]
+    keys = keys[rows.index]
+    written = pid_text(rows[pid_column])
+
+    values = {entry['field']: apply_transform(rows[entry['column']], entry.get('transform'), entry.get('type', 'text'))
+              for entry in mapping}
+    creates = {}
+    for idx, key in keys.items():
+        fields = {field: column[idx] for field, column in values.items() if column[idx] is not None}
+        fields[key_field] = written[idx]
+        creates[key] = {'pid': written[idx], 'name': fields.get('name') or 'Unknown', 'fields': fields}
+    return list(creates.values())
+
+
+def print_diff_summary(diffs: List[dict], stats: dict, sample: int = 10):
+    print(f"\nMatching results:")
+    print(f"  Matched: {stats['matched']}")
+    print(f"  Unmatched: {stats['unmatched']}")
+    for pid in stats['unmatched_pids'][:5]:
+        print(f"    No match for P-ID: {pid}")
+    if stats['ambiguous']:
+        print(f"  Ambiguous (several Airtable records, skipped): {stats['ambiguous']}")
+        for pid, record_ids in list(stats['ambiguous_pids'].items())[:5]:
+            print(f"    {pid}: {', '.join(record_ids)}")
+    if stats['duplicate_pids']:
+        print(f"  Duplicate P-IDs in Excel (last row wins): {stats['duplicate_pids']}")
+    print(f"  Updates needed: {stats['records_to_update']}")
+    print(f"  Already up to date: {stats['no_ops']}")
+    for field, count in stats['field_changes'].items():
+        print(f"    {field}: {count}")
+
+    if diffs:
+        print(f"\nFirst {min(sample, len(diffs))} updates to be made:")
+        for i, diff in enumerate(diffs[:sample]):
+            print(f"  {i + 1}. {diff['name']} (P-ID: {diff['pid']})")
+            for field, value in diff['fields'].items():
+                print(f"     {field}: {diff['old'][field]} → {value}")
+
+
+def _journaled_write(client: AirtableClient, method: str, table: str, journal: Optional[SyncJournal],
+                     run: Optional[str], batches: Dict[int, List[dict]],
+                     on_batch: Optional[Callable]) -> Tuple[int, int]:
+    """
+    Send each planned batch as its own request and acknowledge (or fail)
+    exactly that batch id in the journal. Batches a replay has trimmed stay
+    short rather than being re-chunked, so no request mixes planned batches.
+    """
+    ids = list(batches)
+    bodies = [[{'id': r['id'], 'fields': r['fields']} if method == 'PATCH' else {'fields': r['fields']}
+               for r in batch] for batch in batches.values()]
+    # write_batches reports back once per batch, in submission order
+    order = iter(ids)
+
+    def acknowledge(batch, error):
+        i = next(order)
+        if journal and run:
+            if error:
+                # A 4xx rejects the batch itself; sending it again would fail the same way
+                permanent = getattr(error, 'status', None) is not None and 400 <= error.status < 500
+                journal.fail(run, i, f"{error.status}: {error.body[:200]}" if error.status else str(error),
+                             permanent)
+            else:
+                journal.ack(run, i, len(batch))
+        if on_batch:
+            on_batch(batch, error)
+
+    written, failed = client.write_batches(method, table, bodies, on_batch=acknowledge)
+    return len(written), sum(len(batch) for batch, _ in failed)
+
+
+def _write_planned(client: AirtableClient, method: str, table: str, planned: List[dict],
+                   on_batch: Optional[Callable], journal: Optional[SyncJournal], source: str,
+                   key_field: Optional[str] = None) -> Tuple[int, int]:
+    batches = dict(enumerate(chunked(planned)))
+    run = journal.plan(table, list(batches.values()), source, method, key_field) if journal else None
+
+    success, errors = _journaled_write(client, method, table, journal, run, batches, on_batch)
+    if journal and journal.settled(run):
+        journal.done(run)
+    return success, errors
+
+
+def write_diffs(client: AirtableClient, table: str, diffs: List[dict],
+                on_batch: Optional[Callable] = None, journal: Optional[SyncJournal] = None,
+                source: str = '') -> Tuple[int, int]:
+    """
+    PATCH each record's changed fields, 10 records per request; -> (success, errors).
+
+    With a journal, every batch is planned (with its old values) before the
+    first request and acknowledged as it lands; see replay_pending().
+    """
+    planned = [{'id': diff['id'], 'fields': diff['fields'], 'old': diff.get('old', {}),
+                'label': f"{diff.get('pid', '')} {diff.get('name', '')}".strip()} for diff in diffs]
+    return _write_planned(client, 'PATCH', table, planned, on_batch, journal, source)
+
+
+def write_creates(client: AirtableClient, table: str, creates: List[dict],
+                  on_batch: Optional[Callable] = None, journal: Optional[SyncJournal] = None,
+                  source: str = '', key_field: str = 'P-ID') -> Tuple[int, int]:
+    """POST the records from compute_creates(), 10 per request; -> (success, errors)"""
+    planned = [{'fields': create['fields'], 'label': f"{create['pid']} {create['name']}"} for create in creates]
+    return _write_planned(client, 'POST', table, planned, on_batch, journal, source, key_field)
+
+
+def _already_created(client: AirtableClient, table: str, key_field: str,
+                     batches: Dict[int, List[dict]]) -> Dict[int, List[dict]]:
+    """Drop planned creates whose record exists: the POST landed but its ack didn't"""
+    keys = [r['fields'].get(key_field) for batch in batches.values() for r in batch]
+    formula = formula_any_of(key_field, [key for key in keys if key])
+    existing = {r['fields'].get(key_field)
+                for r in client.list_records(table, fields=[key_field], formula=formula)}
+    remaining = {}
+    for i, batch in batches.items():
+        batch = [r for r in batch if r['fields'].get(key_field) not in existing]
+        if batch:
+            remaining[i] = batch
+    return remaining
+
+
+def replay_pending(client: AirtableClient, journal: SyncJournal,
+                   on_batch: Optional[Callable] = None) -> Optional[Tuple[int, int]]:
+    """
+    Re-send the unacknowledged batches of the latest unfinished run.
+    Returns (success, errors), or None when there was nothing to replay.
+    """
+    unfinished = journal.unfinished()
+    if unfinished is None:
+        return None
+    run_id, run = unfinished
+    batches = journal.pending_batches(run)
+    age = (time.time() - run['ts']) / 60
+    print(f"Resuming run {run_id} ({run['method']} {run['table']}, planned {age:.0f} min ago): "
+          f"{len(batches)} of {len(run['plans'])} batches unacknowledged")
+
+    if run['method'] == 'POST' and run['key_field']:
+        remaining = _already_created(client, run['table'], run['key_field'], batches)
+        for i in set(batches) - set(remaining):
+            journal.ack(run_id, i, 0)
+        batches = remaining
+
+    success, errors = _journaled_write(client, run['method'], run['table'], journal, run_id, batches, on_batch)
+    if journal.settled(run_id):
+        journal.done(run_id)
+    return success, errors
+
+
+def write_report_csv(path: str, diffs: List[dict], creates: List[dict], stats: dict):
+    """One row per changed field: action (update/create/noop/ambiguous), P-ID, name, record id, field, old, new"""
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(['action', 'pid', 'name', 'record_id', 'field', 'old', 'new'])
+        for diff in diffs:
+            for field, value in diff['fields'].items():
+                writer.writerow(['update', diff['pid'], diff['name'], diff['id'], field, diff['old'].get(field), value])
+        for create in creates:
+            for field, value in create['fields'].items():
+                writer.writerow(['create', create['pid'], create['name'], '', field, '', value])
+        for pid in stats.get('noop_pids', []):
+            writer.writerow(['noop', pid, '', '', '', '', ''])
+        for pid, record_ids in stats.get('ambiguous_pids', {}).items():
+            writer.writerow(['ambiguous', pid, '', ' '.join(record_ids), '', '', ''])
+
+
+def sync_fields(mapping: FieldMapping) -> Tuple[str, ...]:
+    """Airtable fields a sync with this mapping needs to fetch"""
+    return tuple(dict.fromkeys(list(KEY_FIELDS) + ['name'] + [entry['field'] for entry in mapping]))
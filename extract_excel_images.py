@@ -10,6 +10,8 @@ import shutil
 from pathlib import Path
 import json
 
+from analysis_snapshot import save_analysis
+
 def extract_images_from_excel(excel_path):
     """Extract embedded images from Excel file"""
     output_dir = Path("excel_images")
@@ -121,8 +123,7 @@ if __name__ == "__main__":
     analysis = analyze_excel_data(excel_path)
 
     # Save analysis to JSON
-    with open('excel_analysis.json', 'w', encoding='utf-8') as f:
-        json.dump(analysis, f, ensure_ascii=False, indent=2, default=str)
+    save_analysis(analysis, default=str)
 
     print(f"\nTotal participants: {analysis['total_participants']}")
     print(f"Data columns: {len(analysis['columns'])}")
@@ -6,18 +6,26 @@ Final solution: Extract images from Excel and map them properly by row
 import os
 import shutil
 from pathlib import Path
-import pandas as pd
 import json
-from openpyxl import load_workbook
-from PIL import Image
 import zipfile
 import xml.etree.ElementTree as ET
 
-def extract_and_map_images(excel_path):
-    """Extract images and create the best possible mapping"""
+from stage_profile import stage
+
+def extract_and_map_images(excel_path, output_dir="participant_images_final",
+                           mapping_path='final_image_mapping.json', images_dir='excel_images'):
+    """Extract images and create the best possible mapping
+
+    The paths default to the dashboard's; benchmark_pipeline.py points
+    them into its work directory.
+    """
+    # Loaded here so importing this module (famigo, the benchmark) stays cheap
+    import pandas as pd
+    from openpyxl import load_workbook
+    from PIL import Image
 
     # Create output directory
-    output_dir = Path("participant_images_final")
+    output_dir = Path(output_dir)
     if output_dir.exists():
         shutil.rmtree(output_dir)
     output_dir.mkdir(exist_ok=True)
@@ -25,12 +33,14 @@ def extract_and_map_images(excel_path):
     print(f"Processing: {excel_path}")
 
     # Load data with pandas
-    df = pd.read_excel(excel_path)
+    with stage('read excel', path=str(excel_path)):
+        df = pd.read_excel(excel_path)
     print(f"Loaded {len(df)} participants")
 
     # Load workbook with openpyxl to check for embedded images
-    wb = load_workbook(excel_path, data_only=True, keep_links=False)
-    ws = wb.active
+    with stage('load workbook and anchors'):
+        wb = load_workbook(excel_path, data_only=True, keep_links=False)
+        ws = wb.active
 
     # Count images in worksheet
     image_count_in_sheet = 0
@@ -42,7 +52,7 @@ def extract_and_map_images(excel_path):
     participant_mapping = {}
     all_images = []
 
-    with zipfile.ZipFile(excel_path, 'r') as zip_ref:
+    with stage('extract and decode images'), zipfile.ZipFile(excel_path, 'r') as zip_ref:
         # Get all media files
         media_files = [f for f in zip_ref.namelist() if f.startswith('xl/media/')]
         media_files.sort()
@@ -95,57 +105,58 @@ def extract_and_map_images(excel_path):
 
     # Create participant mapping
     # Assign face photos to participants in order
-    for idx, row in df.iterrows():
-        aid = row['A-ID']
-        pid = row['P-ID']
-        name = row['What is your full name? (Please write exactly as shown in your ARC or passport)']
-
-        # Get data values
-        skin_brightness = str(row['밝기판정']) if pd.notna(row['밝기판정']) else ''
-        skin_tone = row['톤'] if pd.notna(row['톤']) else ''
-        hair_type = str(row['What is your Natural-born hair(not styled)?[Please select from the 10 options below]']) if pd.notna(row['What is your Natural-born hair(not styled)?[Please select from the 10 options below]']) else ''
-        eye_color = str(row['Which of the following options most matches your natural eye color?']) if pd.notna(row['Which of the following options most matches your natural eye color?']) else ''
-
-        # Map face photo
-        face_photo = None
-        if idx < len(large_images):
-            face_photo = large_images[idx]['name']
-            # Create a copy with participant ID for clarity
-            src_path = output_dir / face_photo
-            dest_path = output_dir / f"{aid}_face.png"
-            shutil.copy2(src_path, dest_path)
-            face_photo = f"{aid}_face.png"
-
-        # Map reference images (these are shared)
-        skin_ref = None
-        if skin_brightness and small_images:
-            # Use consistent mapping for skin brightness
-            skin_idx = int(skin_brightness) - 1 if skin_brightness.isdigit() else 0
-            if 0 <= skin_idx < len(small_images):
-                skin_ref = small_images[skin_idx]['name']
-
-        participant_mapping[aid] = {
-            'pid': pid,
-            'name': name,
-            'row': idx + 2,  # Excel row (1-indexed + header)
-            'data': {
-                'skin_brightness': skin_brightness,
-                'skin_tone': skin_tone,
-                'hair_type': hair_type,
-                'eye_color': eye_color,
-                'nationality': row['What is your nationality?'] if pd.notna(row['What is your nationality?']) else '',
-                'ethnicity': row['Please select the ethnic group you identify with:'] if pd.notna(row['Please select the ethnic group you identify with:']) else '',
-                'birth_year': str(row['Please enter your 4-digit year of birth(e.g., 1980) ']) if pd.notna(row['Please enter your 4-digit year of birth(e.g., 1980) ']) else '',
-                'gender': row['What is your gender? '] if pd.notna(row['What is your gender? ']) else '',
-                'makeup_frequency': row['How often do you usually apply face makeup? '] if pd.notna(row['How often do you usually apply face makeup? ']) else '',
-                'cushion_usage': row['Have you ever used a cushion foundation?'] if pd.notna(row['Have you ever used a cushion foundation?']) else '',
-                'skin_type': row['What is your skin type?'] if pd.notna(row['What is your skin type?']) else ''
-            },
-            'images': {
-                'face_photo': face_photo,
-                'skin_brightness_ref': skin_ref
+    with stage('map participants', rows=len(df)):
+        for idx, row in df.iterrows():
+            aid = row['A-ID']
+            pid = row['P-ID']
+            name = row['What is your full name? (Please write exactly as shown in your ARC or passport)']
+
+            # Get data values
+            skin_brightness = str(row['밝기판정']) if pd.notna(row['밝기판정']) else ''
+            skin_tone = row['톤'] if pd.notna(row['톤']) else ''
+            hair_type = str(row['What is your Natural-born hair(not styled)?[Please select from the 10 options below]']) if pd.notna(row['What is your Natural-born hair(not styled)?[Please select from the 10 options below]']) else ''
+            eye_color = str(row['Which of the following options most matches your natural eye color?']) if pd.notna(row['Which of the following options most matches your natural eye color?']) else ''
+
+            # Map face photo
+            face_photo = None
+            if idx < len(large_images):
+                face_photo = large_images[idx]['name']
+                # Create a copy with participant ID for clarity
+                src_path = output_dir / face_photo
+                dest_path = output_dir / f"{aid}_face.png"
+                shutil.copy2(src_path, dest_path)
+                face_photo = f"{aid}_face.png"
+
+            # Map reference images (these are shared)
+            skin_ref = None
+            if skin_brightness and small_images:
+                # Use consistent mapping for skin brightness
+                skin_idx = int(skin_brightness) - 1 if skin_brightness.isdigit() else 0
+                if 0 <= skin_idx < len(small_images):
+                    skin_ref = small_images[skin_idx]['name']
+
+            participant_mapping[aid] = {
+                'pid': pid,
+                'name': name,
+                'row': idx + 2,  # Excel row (1-indexed + header)
+                'data': {
+                    'skin_brightness': skin_brightness,
+                    'skin_tone': skin_tone,
+                    'hair_type': hair_type,
+                    'eye_color': eye_color,
+                    'nationality': row['What is your nationality?'] if pd.notna(row['What is your nationality?']) else '',
+                    'ethnicity': row['Please select the ethnic group you identify with:'] if pd.notna(row['Please select the ethnic group you identify with:']) else '',
+                    'birth_year': str(row['Please enter your 4-digit year of birth(e.g., 1980) ']) if pd.notna(row['Please enter your 4-digit year of birth(e.g., 1980) ']) else '',
+                    'gender': row['What is your gender? '] if pd.notna(row['What is your gender? ']) else '',
+                    'makeup_frequency': row['How often do you usually apply face makeup? '] if pd.notna(row['How often do you usually apply face makeup? ']) else '',
+                    'cushion_usage': row['Have you ever used a cushion foundation?'] if pd.notna(row['Have you ever used a cushion foundation?']) else '',
+                    'skin_type': row['What is your skin type?'] if pd.notna(row['What is your skin type?']) else ''
+                },
+                'images': {
+                    'face_photo': face_photo,
+                    'skin_brightness_ref': skin_ref
+                }
             }
-        }
 
     # Create reference image mapping
     reference_mapping = {
@@ -172,14 +183,14 @@ def extract_and_map_images(excel_path):
         }
     }
 
-    with open('final_image_mapping.json', 'w', encoding='utf-8') as f:
+    with stage('write mapping'), open(mapping_path, 'w', encoding='utf-8') as f:
         json.dump(output_data, f, ensure_ascii=False, indent=2)
 
     print(f"\n=== Mapping Complete ===")
     print(f"Total participants: {len(participant_mapping)}")
     print(f"Participants with face photos: {output_data['statistics']['participants_with_photos']}")
     print(f"Images saved to: {output_dir}")
-    print(f"Mapping saved to: final_image_mapping.json")
+    print(f"Mapping saved to: {mapping_path}")
 
     # Show sample mapping
     if participant_mapping:
@@ -194,11 +205,13 @@ def extract_and_map_images(excel_path):
             print(f"  Skin tone: {sample['data']['skin_tone']}")
 
     # Copy all images to excel_images folder for dashboard
+    images_dir = Path(images_dir)
+    images_dir.mkdir(exist_ok=True)
     for img_file in output_dir.glob('*'):
         if img_file.is_file():
-            shutil.copy2(img_file, Path('excel_images') / img_file.name)
+            shutil.copy2(img_file, images_dir / img_file.name)
 
-    print("\nImages also copied to excel_images/ for dashboard use")
+    print(f"\nImages also copied to {images_dir}/ for dashboard use")
 
     return output_data
 
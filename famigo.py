@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+famigo: one entry point for the report scripts
+
+    python famigo.py extract [final|cells|rows] [args...]
+    python famigo.py map [final|fix|all]
+    python famigo.py stats
+    python famigo.py build [dashboard|search-index|checkin-index|snapshot|synthetic-workbook] [args...]
+    python famigo.py sync [skin|mirror|fetch] [args...]
+    python famigo.py watch [pipeline] [args...]
+    python famigo.py serve [mirror|relay|aggregates|ingest|queue|mock] [args...]
+
+Each target runs an existing script as if it were started directly, with
+the remaining arguments passed through (`famigo.py sync skin KEY --execute`
+is `update_participants_skin_data.py KEY --execute`). Scripts without an
+argparse parser of their own would run in full on -h/--help, so for those
+famigo prints the script's docstring instead. This module imports
+nothing but the standard library; pandas, PIL, openpyxl and friends are
+only loaded by the script a target runs, so --help and listing targets
+stay fast.
+
+    python famigo.py --import-times build dashboard    # slowest imports of that run
+    python famigo.py --profile trace.json [--cprofile prof/] build dashboard
+                                                       # per-stage Chrome trace (stage_profile.py)
+"""
+
+import argparse
+import ast
+import importlib.util
+import os
+import re
+import runpy
+import sys
+from typing import Optional
+
+# command -> {target: (module, fixed leading args, help)}; the first target is the default
+COMMANDS = {
+    'extract': {
+        'final': ('extract_excel_images_final', [], 'workbook images into per-row folders'),
+        'cells': ('extract_all_cell_images', [], 'images anchored in cells (openpyxl_image_loader)'),
+        'rows': ('extract_images_by_row', [], 'images by drawing anchor row'),
+    },
+    'map': {
+        'final': ('create_final_image_mapping', [], 'participant -> image mapping'),
+        'fix': ('fix_image_mapping', [], 'rebuild the mapping and the lazy dashboard'),
+        'all': ('map_all_images', [], 'map every available image'),
+    },
+    'build': {
+        'dashboard': ('generate_final_dashboard', [], 'final dashboard with detail bundles and search index'),
+        'search-index': ('search_index', [], 'participant_search_index.json'),
+        'checkin-index': ('checkin_index', [], 'check-in lookup index from the mirror'),
+        'snapshot': ('analysis_snapshot', ['import'], 'excel_analysis.json -> binary snapshot'),
+        'synthetic-workbook': ('synthetic_workbook', [], 'survey-shaped workbook of N rows for benchmarks'),
+    },
+    'sync': {
+        'skin': ('update_participants_skin_data', [], 'Excel skin data -> Participants (dry run by default)'),
+        'mirror': ('airtable_mirror', ['sync'], 'refresh the SQLite mirror'),
+        'fetch': ('airtable_fetch', [], 'fetch every table concurrently'),
+    },
+    'watch': {
+        'pipeline': ('pipeline_watch', [], 'rebuild stale stages when the workbook or images change'),
+    },
+    'serve': {
+        'mirror': ('airtable_mirror', ['serve'], 'mirror read API'),
+        'relay': ('airtable_relay', [], 'SSE change relay'),
+        'aggregates': ('dashboard_aggregates', [], 'admin dashboard aggregates'),
+        'ingest': ('image_ingest', [], 'check-in photo ingest'),
+        'queue': ('attendance_queue', [], 'check-in write queue'),
+        'mock': ('airtable_mock_server', [], 'local Airtable stand-in'),
+    },
+}
+
+COMMAND_HELP = {
+    'extract': 'extract images from the workbook',
+    'map': 'map images to participants',
+    'stats': 'summary of the analysis snapshot and the last sync run',
+    'build': 'build dashboards and indexes',
+    'sync': 'sync with Airtable',
+    'watch': 'rebuild the dashboards when a new export lands',
+    'serve': 'run one of the local servers',
+}
+
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def run_module(module: str, args: list):
+    """Run a script's __main__ block with `args` as its command line"""
+    sys.argv = [f'{module}.py'] + list(args)
+    runpy.run_module(module, run_name='__main__', alter_sys=True)
+
+
+def script_help(module: str) -> Optional[str]:
+    """
+    Help for a script that doesn't parse its own options: its docstring,
+    read from the source without importing it. None if it has a parser.
+    """
+    spec = importlib.util.find_spec(module)
+    with open(spec.origin, encoding='utf-8') as f:
+        source = f.read()
+    if 'ArgumentParser(' in source:
+        return None
+    return ast.get_docstring(ast.parse(source)) or f'{module}.py takes no options'
+
+
+def stats(args: list):
+    """Print the snapshot's summary and the last sync report, if there is one"""
+    from analysis_snapshot import load_analysis
+    from sync_metrics import print_report
+
+    parser = argparse.ArgumentParser(prog='famigo stats')
+    parser.add_argument('--report', default='sync_report.json', help='sync metrics report to show')
+    options = parser.parse_args(args)
+
+    analysis = load_analysis(sections=['meta', 'summary_stats'])
+    print(f"Participants: {analysis.get('total_participants')}")
+    for key, value in (analysis.get('summary_stats') or {}).items():
+        if isinstance(value, dict):
+            print(f"  {key}: " + ', '.join(f'{k}: {v}' for k, v in list(value.items())[:8]))
+        else:
+            print(f"  {key}: {value}")
+
+    if os.path.exists(options.report):
+        import json
+        with open(options.report, encoding='utf-8') as f:
+            print_report(json.load(f))
+
+
+def import_times(argv: list, top: int = 15):
+    """Re-run famigo under -X importtime and list the slowest top-level imports"""
+    import subprocess
+
+    result = subprocess.run([sys.executable, '-X', 'importtime', __file__] + argv,
+                            stderr=subprocess.PIPE, text=True)
+    timings = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if not match:
+            print(line, file=sys.stderr)
+        elif len(match.group(3)) == 1:
+            # One space of indent: imported directly, not by another module
+            timings.append((int(match.group(2)), match.group(4)))
+    total = sum(t for t, _ in timings)
+    print(f"\nImport time: {total / 1000:.1f} ms in {len(timings)} top-level imports")
+    for cumulative, module in sorted(timings, reverse=True)[:top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {module}")
+    return result.returncode
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='famigo', description='Report and Airtable tooling')
+    parser.add_argument('--import-times', action='store_true', help='report module import times for this run')
+    parser.add_argument('--profile', metavar='TRACE', help='write a per-stage Chrome trace (JSON) of this run')
+    parser.add_argument('--cprofile', metavar='DIR', help='with --profile, also dump cProfile stats here')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    for command, help_text in COMMAND_HELP.items():
+        sub = commands.add_parser(command, help=help_text, description=help_text,
+                                  formatter_class=argparse.RawDescriptionHelpFormatter,
+                                  epilog='targets:\n' + '\n'.join(
+                                      f'  {name:<20}{info[2]}' for name, info in COMMANDS.get(command, {}).items()))
+        if command in COMMANDS:
+            sub.add_argument('target', nargs='?', choices=list(COMMANDS[command]), default=next(iter(COMMANDS[command])))
+        sub.add_argument('args', nargs=argparse.REMAINDER, help='passed through to the script')
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = build_parser()
+    options = parser.parse_args(argv)
+
+    if options.import_times:
+        sys.exit(import_times([arg for arg in argv if arg != '--import-times']))
+    if options.command is None:
+        parser.print_help()
+        return
+    if options.command == 'stats':
+        run = lambda: stats(options.args)
+        label = 'stats'
+    else:
+        module, fixed, _ = COMMANDS[options.command][options.target]
+        if {'-h', '--help'} & set(options.args):
+            help_text = script_help(module)
+            if help_text is not None:
+                print(f"famigo {options.command} {options.target}: runs {module}.py {' '.join(fixed)}".rstrip())
+                print(f"\n{help_text}")
+                return
+        run = lambda: run_module(module, fixed + options.args)
+        label = f'{options.command} {options.target}'
+
+    if not options.profile:
+        run()
+        return
+
+    import stage_profile
+
+    stage_profile.enable(f'famigo {label}', options.cprofile)
+    try:
+        with stage_profile.stage(label, args=' '.join(options.args)):
+            run()
+    finally:
+        trace = stage_profile.disable(options.profile)
+        stage_profile.print_summary(trace)
+        print(f"✓ Wrote profile trace to {options.profile}")
+
+
+if __name__ == "__main__":
+    main()
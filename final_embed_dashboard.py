@@ -7,13 +7,15 @@ import json
 import pandas as pd
 from pathlib import Path
 
+from analysis_snapshot import load_analysis
+from json_output import template_parts, write_html
+
 # Load Excel data
 df = pd.read_excel('makeuptest_AP_Bueatylink_20250927.xlsx')
 print(f"Loaded {len(df)} participants")
 
 # Load analysis data
-with open('excel_analysis.json', 'r', encoding='utf-8') as f:
-    analysis_data = json.load(f)
+analysis_data = load_analysis()
 
 # Create image mapping with available face images
 image_mapping = {}
@@ -64,23 +66,6 @@ print(f"Mapped {sum(1 for p in image_mapping.values() if p['images'].get('face_p
 with open('makeup-test-dashboard.html', 'r', encoding='utf-8') as f:
     html_content = f.read()
 
-# Find where to inject the data (after the variable declarations)
-inject_point = "let allParticipants = [];"
-if inject_point in html_content:
-    # Create the data injection
-    data_injection = f"let allParticipants = {json.dumps(analysis_data['participant_data'], ensure_ascii=False)};"
-    html_content = html_content.replace(inject_point, data_injection)
-
-inject_point = "let analysisData = null;"
-if inject_point in html_content:
-    data_injection = f"let analysisData = {json.dumps(analysis_data, ensure_ascii=False)};"
-    html_content = html_content.replace(inject_point, data_injection)
-
-inject_point = "let imageMapping = {};"
-if inject_point in html_content:
-    data_injection = f"let imageMapping = {json.dumps(image_mapping, ensure_ascii=False)};"
-    html_content = html_content.replace(inject_point, data_injection)
-
 # Also update the initialization to not fetch the data
 html_content = html_content.replace(
     "// Data embedded",
@@ -96,9 +81,13 @@ if "window.addEventListener('DOMContentLoaded'" in html_content:
             "displayParticipants(allParticipants);\n            updateStatistics();"
         )
 
-# Save the updated dashboard
-with open('makeup-test-dashboard.html', 'w', encoding='utf-8') as f:
-    f.write(html_content)
+# Stream the data into the variable declarations while saving the dashboard
+parts = template_parts(html_content, {
+    "let allParticipants = [];": ("let allParticipants = ", analysis_data['participant_data'], ";"),
+    "let analysisData = null;": ("let analysisData = ", analysis_data, ";"),
+    "let imageMapping = {};": ("let imageMapping = ", image_mapping, ";"),
+})
+write_html('makeup-test-dashboard.html', parts)
 
 print("\nSuccessfully embedded all data into makeup-test-dashboard.html")
 print(f"- Total participants: {len(analysis_data['participant_data'])}")
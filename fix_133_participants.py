@@ -7,6 +7,8 @@ import pandas as pd
 import json
 from pathlib import Path
 
+from analysis_snapshot import load_analysis, save_analysis
+
 # Load Excel with 133 participants
 df = pd.read_excel('makeuptest_AP_Bueatylink_20250927.xlsx')
 print(f"Loaded {len(df)} participants")
@@ -15,8 +17,7 @@ print(f"Loaded {len(df)} participants")
 assert len(df) == 133, f"Expected 133 participants, got {len(df)}"
 
 # Load existing analysis data
-with open('excel_analysis.json', 'r', encoding='utf-8') as f:
-    analysis_data = json.load(f)
+analysis_data = load_analysis(sections=('meta', 'summary_stats'))
 
 # Update with all 133 participants
 participant_data = []
@@ -38,8 +39,7 @@ analysis_data['participant_data'] = participant_data
 print(f"Updated to {len(participant_data)} participants")
 
 # Save updated analysis
-with open('excel_analysis.json', 'w', encoding='utf-8') as f:
-    json.dump(analysis_data, f, ensure_ascii=False, indent=2)
+save_analysis(analysis_data)
 
 # Now update dashboard HTML with embedded data
 with open('makeup-test-dashboard.html', 'r', encoding='utf-8') as f:
@@ -6,12 +6,13 @@ Generate dashboard HTML with embedded data
 import json
 import pandas as pd
 
+from analysis_snapshot import load_analysis
+
 # Read Excel data
 df = pd.read_excel('makeuptest_AP_Bueatylink_20250927.xlsx')
 
 # Load analysis data
-with open('excel_analysis.json', 'r', encoding='utf-8') as f:
-    analysis_data = json.load(f)
+analysis_data = load_analysis()
 
 # Load image mapping
 with open('participant_image_mapping.json', 'r', encoding='utf-8') as f:
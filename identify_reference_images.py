@@ -9,25 +9,27 @@ import imagehash
 import json
 from collections import defaultdict
 
-def identify_reference_images():
+from stage_profile import stage
+
+def identify_reference_images(image_dir='excel_images', mapping_path='image_type_mapping.json'):
     """Identify which images are references (duplicated) vs individual photos"""
 
-    image_dir = 'excel_images'
     image_hashes = {}
     hash_to_images = defaultdict(list)
 
     # Calculate hash for each image
-    for img_file in os.listdir(image_dir):
-        if img_file.lower().endswith(('.png', '.jpg', '.jpeg')):
-            img_path = os.path.join(image_dir, img_file)
-            try:
-                img = Image.open(img_path)
-                # Use perceptual hash for similarity
-                img_hash = str(imagehash.average_hash(img))
-                image_hashes[img_file] = img_hash
-                hash_to_images[img_hash].append(img_file)
-            except Exception as e:
-                print(f"Error processing {img_file}: {e}")
+    with stage('hash images'):
+        for img_file in os.listdir(image_dir):
+            if img_file.lower().endswith(('.png', '.jpg', '.jpeg')):
+                img_path = os.path.join(image_dir, img_file)
+                try:
+                    img = Image.open(img_path)
+                    # Use perceptual hash for similarity
+                    img_hash = str(imagehash.average_hash(img))
+                    image_hashes[img_file] = img_hash
+                    hash_to_images[img_hash].append(img_file)
+                except Exception as e:
+                    print(f"Error processing {img_file}: {e}")
 
     # Identify reference images (appear multiple times or are small)
     reference_images = []
@@ -40,30 +42,31 @@ def identify_reference_images():
             individual_photos.extend(img_list)
 
     # Also check image dimensions
-    small_images = []
-    large_images = []
-
-    for img_file in os.listdir(image_dir):
-        if img_file.lower().endswith(('.png', '.jpg', '.jpeg')):
-            img_path = os.path.join(image_dir, img_file)
-            try:
-                img = Image.open(img_path)
-                width, height = img.size
-
-                if width < 300 or height < 300:  # Small images are likely references
-                    small_images.append({
-                        'file': img_file,
-                        'size': (width, height),
-                        'area': width * height
-                    })
-                else:
-                    large_images.append({
-                        'file': img_file,
-                        'size': (width, height),
-                        'area': width * height
-                    })
-            except Exception as e:
-                print(f"Error checking size of {img_file}: {e}")
+    with stage('decode image sizes'):
+        small_images = []
+        large_images = []
+
+        for img_file in os.listdir(image_dir):
+            if img_file.lower().endswith(('.png', '.jpg', '.jpeg')):
+                img_path = os.path.join(image_dir, img_file)
+                try:
+                    img = Image.open(img_path)
+                    width, height = img.size
+
+                    if width < 300 or height < 300:  # Small images are likely references
+                        small_images.append({
+                            'file': img_file,
+                            'size': (width, height),
+                            'area': width * height
+                        })
+                    else:
+                        large_images.append({
+                            'file': img_file,
+                            'size': (width, height),
+                            'area': width * height
+                        })
+                except Exception as e:
+                    print(f"Error checking size of {img_file}: {e}")
 
     # Sort by area to identify patterns
     small_images.sort(key=lambda x: x['area'])
@@ -115,11 +118,16 @@ def identify_reference_images():
             'hair_types': [f'image{i}.png' for i in range(8, 18)],  # 10 hair types
             'eye_colors': [f'image{i}.png' for i in range(18, 25)],  # 7 eye colors
         },
-        'individual_photos': [f'image{i}.png' for i in photo_range if i in image_numbers][:132]  # 132 participants
+        'individual_photos': [f'image{i}.png' for i in photo_range if i in image_numbers][:132],  # 132 participants
+        'statistics': {
+            'total_images': len(image_hashes),
+            'unique_hashes': len(hash_to_images),
+            'duplicated_images': len(set(reference_images)),
+        }
     }
 
     # Save mapping
-    with open('image_type_mapping.json', 'w', encoding='utf-8') as f:
+    with stage('write mapping'), open(mapping_path, 'w', encoding='utf-8') as f:
         json.dump(mapping, f, indent=2)
 
     print(f"\n=== Mapping Created ===")
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Image ingest service for check-in uploads
+
+The attendance page used to turn ID card, bankbook and face photos into
+base64 (a third bigger than the image) and keep them in localStorage or
+send them to a demo Cloudinary preset. This server takes the photos as
+plain binary multipart uploads, downscales and recompresses them in a
+worker pool, stores each distinct image once (keyed by the hash of the
+uploaded bytes) and answers with the image and thumbnail URLs.
+
+    POST /upload     multipart/form-data, one or more image files
+                     (e.g. idCardFront, idCardBack, bankbook, face) plus
+                     optional text fields such as participantID;
+                     or a raw image/* body for a single file
+                     -> {"files": {field: {url, thumbnailUrl, hash, width, height,
+                                           bytes, uploadedBytes, duplicate}}, ...text fields}
+    GET /images/<name>   stored images, cacheable forever (names are content hashes)
+    GET /status
+
+Storage is pluggable: anything with exists/put/get/url like LocalStorage.
+
+    python image_ingest.py --root uploads --port 8791 [--public-url https://cdn.example/images]
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from email.parser import BytesParser
+from email.policy import default as email_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Longest side kept for stored images and thumbnails; ID cards stay legible at 1600px
+MAX_SIDE = 1600
+THUMB_SIDE = 320
+JPEG_QUALITY = 80
+THUMB_QUALITY = 70
+MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+# Pixel count refused before decoding: a small, highly compressed file can
+# declare a huge canvas. 64 MP leaves room for 48 MP phone cameras.
+MAX_PIXELS = 64 * 1000 * 1000
+
+CONTENT_TYPES = {'.jpg': 'image/jpeg', '.json': 'application/json'}
+
+
+def process_image(data: bytes, max_side: int = MAX_SIDE, thumb_side: int = THUMB_SIDE,
+                  quality: int = JPEG_QUALITY, thumb_quality: int = THUMB_QUALITY,
+                  max_pixels: int = MAX_PIXELS) -> dict:
+    """
+    Uploaded bytes -> {'image', 'thumbnail' (JPEG bytes), 'width', 'height'}.
+    Runs in a worker process. Phone photos are turned upright from their
+    EXIF orientation; images are only ever scaled down. Unreadable or
+    oversized images raise ValueError.
+    """
+    try:
+        # Reads the header only; nothing is decoded until the size is checked
+        image = Image.open(io.BytesIO(data))
+    except Image.DecompressionBombError:
+        raise ValueError(f'Image has more than {max_pixels // 1000000} megapixels')
+    except (UnidentifiedImageError, OSError):
+        raise ValueError('Not a readable image')
+    width, height = image.size
+    if width * height > max_pixels:
+        raise ValueError(f'Image is {width}x{height} pixels; at most {max_pixels // 1000000} megapixels are accepted')
+
+    try:
+        image = ImageOps.exif_transpose(image)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+    except Image.DecompressionBombError:
+        raise ValueError(f'Image has more than {max_pixels // 1000000} megapixels')
+    except OSError:
+        raise ValueError('Not a readable image')
+
+    def encode(side: int, jpeg_quality: int) -> Tuple[bytes, Tuple[int, int]]:
+        copy = image.copy()
+        copy.thumbnail((side, side), Image.LANCZOS)
+        out = io.BytesIO()
+        copy.save(out, 'JPEG', quality=jpeg_quality, optimize=True, progressive=True)
+        return out.getvalue(), copy.size
+
+    full, size = encode(max_side, quality)
+    thumbnail, _ = encode(thumb_side, thumb_quality)
+    return {'image': full, 'thumbnail': thumbnail, 'width': size[0], 'height': size[1]}
+
+
+class LocalStorage:
+    """Files in a directory, served by this server under /images (or from public_url)"""
+
+    def __init__(self, root: str = 'uploads', public_url: Optional[str] = None):
+        self.root = root
+        self.public_url = (public_url or '/images').rstrip('/')
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        if not name or '/' in name or '\\' in name or name.startswith('.'):
+            raise KeyError(name)
+        return os.path.join(self.root, name)
+
+    def exists(self, name: str) -> bool:
+        return os.path.exists(self._path(name))
+
+    def put(self, name: str, data: bytes, content_type: str):
+        path = self._path(name)
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def get(self, name: str) -> Optional[bytes]:
+        try:
+            with open(self._path(name), 'rb') as f:
+                return f.read()
+        except (KeyError, FileNotFoundError):
+            return None
+
+    def url(self, name: str) -> str:
+        return f'{self.public_url}/{name}'
+
+
+class ImageIngest:
+    """Hash, dedupe, process in the pool and store; concurrent uploads of the same bytes share one job"""
+
+    def __init__(self, storage: LocalStorage, workers: Optional[int] = None):
+        self.storage = storage
+        self.workers = workers or os.cpu_count() or 2
+        self.pool = self._new_pool()
+        self.lock = threading.Lock()
+        self.in_flight: Dict[str, Future] = {}
+        self.stats = {'uploads': 0, 'duplicates': 0, 'uploaded_bytes': 0, 'stored_bytes': 0}
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # Spawned, not forked: workers must not inherit the server's threads and listening socket
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+
+    def _replace_pool(self, broken: ProcessPoolExecutor):
+        """A worker died (OOM kill, decoder crash): every later submit would fail, so start a new pool"""
+        with self.lock:
+            if self.pool is broken:
+                print("  ✗ Image worker pool broke; starting a new one")
+                self.pool = self._new_pool()
+        broken.shutdown(wait=False)
+
+    def _process(self, data: bytes, callback, retry: bool = True):
+        """Run process_image in the pool; on a broken pool, once more in a fresh one"""
+        pool = self.pool
+        try:
+            job = pool.submit(process_image, data)
+        except BrokenProcessPool as e:
+            if retry:
+                self._replace_pool(pool)
+                self._process(data, callback, retry=False)
+                return
+            job = Future()
+            job.set_exception(e)
+
+        def done(job: Future):
+            if retry and isinstance(job.exception(), BrokenProcessPool):
+                self._replace_pool(pool)
+                self._process(data, callback, retry=False)
+            else:
+                callback(job)
+
+        job.add_done_callback(done)
+
+    def _stored(self, key: str) -> Optional[dict]:
+        meta = self.storage.get(f'{key}.json')
+        return json.loads(meta) if meta else None
+
+    def _store(self, key: str, processed: dict, uploaded: int) -> dict:
+        meta = {
+            'hash': key,
+            'url': self.storage.url(f'{key}.jpg'),
+            'thumbnailUrl': self.storage.url(f'{key}_thumb.jpg'),
+            'width': processed['width'],
+            'height': processed['height'],
+            'bytes': len(processed['image']),
+            'uploadedBytes': uploaded,
+        }
+        self.storage.put(f'{key}.jpg', processed['image'], 'image/jpeg')
+        self.storage.put(f'{key}_thumb.jpg', processed['thumbnail'], 'image/jpeg')
+        # Written last: its presence means the images are complete
+        self.storage.put(f'{key}.json', json.dumps(meta).encode('utf-8'), 'application/json')
+        return meta
+
+    def submit(self, data: bytes) -> Future:
+        """Future resolving to the stored image's metadata (plus 'duplicate')"""
+        key = hashlib.sha256(data).hexdigest()[:32]
+        with self.lock:
+            self.stats['uploads'] += 1
+            self.stats['uploaded_bytes'] += len(data)
+            if key in self.in_flight:
+                self.stats['duplicates'] += 1
+                return self.in_flight[key]
+            stored = self._stored(key)
+            if stored is not None:
+                self.stats['duplicates'] += 1
+                done = Future()
+                done.set_result(dict(stored, duplicate=True))
+                return done
+
+            result = Future()
+            self.in_flight[key] = result
+
+        def finished(job: Future):
+            try:
+                meta = dict(self._store(key, job.result(), len(data)), duplicate=False)
+                with self.lock:
+                    self.stats['stored_bytes'] += meta['bytes']
+                result.set_result(meta)
+            except Exception as e:
+                result.set_exception(e)
+            finally:
+                with self.lock:
+                    self.in_flight.pop(key, None)
+
+        self._process(data, finished)
+        return result
+
+    def ingest(self, files: Dict[str, bytes]) -> Dict[str, dict]:
+        """{field: bytes} -> {field: metadata or {'error'}}; all files are processed in parallel"""
+        jobs = {field: self.submit(data) for field, data in files.items()}
+        results = {}
+        for field, job in jobs.items():
+            try:
+                results[field] = job.result()
+            except ValueError as e:
+                results[field] = {'error': str(e)}
+            except Exception as e:
+                # Anything else (a crashed worker, a storage error) fails this
+                # file only; the request still gets its answer
+                print(f"  ✗ {field}: {type(e).__name__}: {e}")
+                results[field] = {'error': f'Could not process the image ({type(e).__name__})'}
+        return results
+
+    def status(self) -> dict:
+        with self.lock:
+            return dict(self.stats, in_flight=len(self.in_flight))
+
+
+def parse_multipart(content_type: str, body: bytes) -> Tuple[Dict[str, bytes], Dict[str, str]]:
+    """multipart/form-data body -> ({file field: bytes}, {text field: value})"""
+    message = BytesParser(policy=email_policy).parsebytes(
+        b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body)
+    files, fields = {}, {}
+    for part in message.iter_parts():
+        name = part.get_param('name', header='content-disposition')
+        if not name:
+            continue
+        payload = part.get_payload(decode=True) or b''
+        if part.get_filename() is not None or part.get_content_maintype() == 'image':
+            if payload:
+                files[name] = payload
+        else:
+            fields[name] = payload.decode(part.get_content_charset() or 'utf-8', errors='replace')
+    return files, fields
+
+
+def make_handler(ingest: ImageIngest):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body: dict):
+            payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _absolute(self, meta: dict) -> dict:
+            # Relative storage URLs point back at this server
+            host = self.headers.get('Host')
+            if not host:
+                return meta
+            return {key: f'http://{host}{value}' if key in ('url', 'thumbnailUrl') and value.startswith('/')
+                    else value for key, value in meta.items()}
+
+        def do_OPTIONS(self):
+            self._send(204, {})
+
+        def do_GET(self):
+            parts = [p for p in urlparse(self.path).path.split('/') if p]
+            if parts == ['status']:
+                self._send(200, ingest.status())
+                return
+            if len(parts) != 2 or parts[0] != 'images':
+                self._send(404, {'error': 'Not found'})
+                return
+            data = ingest.storage.get(parts[1])
+            if data is None:
+                self._send(404, {'error': 'Not found'})
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPES.get(os.path.splitext(parts[1])[1], 'application/octet-stream'))
+            self.send_header('Content-Length', str(len(data)))
+            self.send_header('Cache-Control', 'public, max-age=31536000, immutable')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            if urlparse(self.path).path.rstrip('/') != '/upload':
+                self._send(404, {'error': 'Not found'})
+                return
+            length = int(self.headers.get('Content-Length') or 0)
+            if length > MAX_UPLOAD_BYTES:
+                self.close_connection = True
+                self._send(413, {'error': f'Upload larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB'})
+                return
+            body = self.rfile.read(length)
+            content_type = self.headers.get('Content-Type', '')
+
+            if content_type.startswith('multipart/form-data'):
+                files, fields = parse_multipart(content_type, body)
+            elif content_type.startswith('image/'):
+                files, fields = {'file': body}, {}
+            else:
+                self._send(415, {'error': 'Send multipart/form-data or an image/* body'})
+                return
+            if not files:
+                self._send(400, {'error': 'No image files in the upload'})
+                return
+
+            started = time.time()
+            results = {field: self._absolute(meta) for field, meta in ingest.ingest(files).items()}
+            failed = all('error' in meta for meta in results.values())
+            self._send(422 if failed else 200, dict(fields, files=results,
+                                                    seconds=round(time.time() - started, 3)))
+
+    return Handler
+
+
+def _stop(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ingest check-in photos: resize, dedupe, store')
+    parser.add_argument('--root', default='uploads', help='directory for stored images')
+    parser.add_argument('--public-url', help='URL prefix the stored images are served from (default: this server)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8791)
+    parser.add_argument('--workers', type=int, help='image worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    ingest = ImageIngest(LocalStorage(args.root, args.public_url), args.workers)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(ingest))
+    server.daemon_threads = True
+    # A plain kill shuts the worker processes down too
+    signal.signal(signal.SIGTERM, _stop)
+    print(f"✓ Image ingest on http://{args.host}:{args.port}/upload "
+          f"({ingest.workers} workers, storing in {args.root})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ingest.pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
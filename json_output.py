@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Write JSON artifacts (and HTML with embedded JSON) straight to the output
+file, using orjson when it is installed, and report size and wall time per
+artifact, with its peak memory (measure_memory=False opts out)
+
+Both backends produce the same bytes: numpy values become plain numbers
+and lists, datetimes go through the caller's `default` and NaN/Infinity
+are written as null.
+"""
+
+import json
+import math
+import re
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # optional fast backend
+    orjson = None
+
+from stage_profile import reset_memory_peak, stage
+
+# One entry per artifact written in this process
+ARTIFACT_STATS: List[dict] = []
+
+_CHUNK = 1 << 16
+
+
+def _plain(default: Optional[Callable]) -> Callable:
+    """The one `default` both backends use: numpy -> Python values, then the caller's"""
+    def convert(obj):
+        if type(obj).__module__ == 'numpy' and hasattr(obj, 'tolist'):
+            return obj.tolist()
+        if default is not None:
+            return default(obj)
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return convert
+
+
+def _plain_key(key) -> str:
+    """A dict key as json.dumps writes it"""
+    if isinstance(key, str):
+        return key
+    if isinstance(key, bool) or key is None:
+        return json.dumps(key)
+    if isinstance(key, float):
+        return float.__repr__(key) if math.isfinite(key) else json.dumps(key)
+    return str(key)
+
+
+def to_plain(obj: Any, default: Optional[Callable] = None) -> Any:
+    """
+    `obj` as it reads back from the JSON this module writes: numpy values as
+    Python numbers and lists, NaN/Infinity as None, dict keys as strings,
+    anything else through the caller's `default`. For writers of other
+    formats (the msgpack snapshot) that must hold the same data.
+    """
+    convert = _plain(default)
+
+    def walk(value):
+        if value is None or isinstance(value, (str, bool)):
+            return value
+        if isinstance(value, int):
+            return int(value)
+        if isinstance(value, float):
+            return float(value) if math.isfinite(value) else None
+        if isinstance(value, dict):
+            return {_plain_key(walk(k) if not isinstance(k, str) else k): walk(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [walk(item) for item in value]
+        return walk(convert(value))
+
+    return walk(obj)
+
+
+def _floatstr(value: float) -> str:
+    """float repr in orjson's spelling: NaN/Infinity as null, 1e16 not 1e+16, 0.00001 not 1e-05"""
+    if not math.isfinite(value):
+        return 'null'
+    text = float.__repr__(value)
+    if 'e' not in text:
+        return text
+    mantissa, exponent = text.split('e')
+    exponent = int(exponent)
+    if exponent == -5:
+        sign = '-' if mantissa.startswith('-') else ''
+        return f"{sign}0.0000{mantissa.lstrip('-').replace('.', '')}"
+    return f'{mantissa}e{exponent}'
+
+
+# String literals in encoder output; numbers are only respelled outside them
+_STRING = re.compile(r'("(?:[^"\\]|\\.)*")')
+_FLOAT = re.compile(r'NaN|-?Infinity|-?\d+(?:\.\d+)?e[+-]?\d+')
+
+
+def _respell(match) -> str:
+    text = match.group(0)
+    return 'null' if text[-1] in 'Ny' else _floatstr(float(text))
+
+
+class _Encoder(json.JSONEncoder):
+    """Stdlib encoder with orjson's spelling of floats (NaN/Infinity as null)"""
+
+    def iterencode(self, o, _one_shot=False):
+        for piece in super().iterencode(o, _one_shot):
+            if '"' in piece:
+                parts = _STRING.split(piece)
+                parts[::2] = [_FLOAT.sub(_respell, part) for part in parts[::2]]
+                piece = ''.join(parts)
+            else:
+                piece = _FLOAT.sub(_respell, piece)
+            yield piece
+
+
+def _orjson_bytes(obj: Any, pretty: bool, default: Callable) -> bytes:
+    # Datetimes and numpy values go through `default`, as they do with the stdlib
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    if pretty:
+        option |= orjson.OPT_INDENT_2
+    return orjson.dumps(obj, option=option, default=default)
+
+
+def encode_chunks(obj: Any, pretty: bool = False, default: Optional[Callable] = None) -> Iterator[bytes]:
+    """
+    UTF-8 encoded JSON in chunks.
+
+    orjson serializes the whole value in one native buffer; the stdlib
+    fallback streams from JSONEncoder.iterencode and batches small pieces.
+    """
+    default = _plain(default)
+    if orjson is not None:
+        try:
+            yield _orjson_bytes(obj, pretty, default)
+            return
+        except TypeError:
+            # e.g. integer keys wider than 64 bits; fall back to the stdlib
+            pass
+
+    encoder = _Encoder(
+        ensure_ascii=False,
+        indent=2 if pretty else None,
+        separators=None if pretty else (',', ':'),
+        default=default,
+    )
+    buffer: List[str] = []
+    size = 0
+    for piece in encoder.iterencode(obj):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= _CHUNK:
+            yield ''.join(buffer).encode('utf-8')
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+class JsonSlot:
+    """Placeholder for a JSON value inside a streamed HTML/JS document"""
+
+    def __init__(self, obj: Any, default: Optional[Callable] = None):
+        self.obj = obj
+        self.default = default
+
+
+def _measured_write(path: Union[str, Path], write: Callable, label: str, pretty: bool,
+                    measure_memory: bool) -> dict:
+    # Peaks come from tracemalloc. While stage profiling already traces, they
+    # cost only a peak reset and read-back; otherwise tracing runs for just
+    # this write, which slows it, so hot paths pass measure_memory=False
+    tracing = tracemalloc.is_tracing()
+    started_tracing = measure_memory and not tracing
+    if started_tracing:
+        tracemalloc.start()
+    elif tracing:
+        reset_memory_peak()
+    started = time.perf_counter()
+
+    with stage(f'write {Path(path).name}', kind=label), open(path, 'wb') as f:
+        write(f)
+
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] if measure_memory or tracing else None
+    if started_tracing:
+        tracemalloc.stop()
+
+    stats = {
+        'artifact': str(path),
+        'kind': label,
+        'bytes': Path(path).stat().st_size,
+        'seconds': round(elapsed, 4),
+        'peak_memory_bytes': peak,
+        'backend': 'orjson' if orjson is not None else 'json',
+        'pretty': pretty,
+    }
+    ARTIFACT_STATS.append(stats)
+    memory = f", peak {peak / 1e6:.2f} MB" if peak is not None else ''
+    print(f"  ⏱ {stats['artifact']}: {stats['bytes'] / 1e6:.2f} MB in {elapsed:.3f}s{memory} ({stats['backend']})")
+    return stats
+
+
+def dump_json(obj: Any, path: Union[str, Path], pretty: bool = False,
+              default: Optional[Callable] = None, measure_memory: bool = True) -> dict:
+    """
+    Write `obj` as JSON to `path`.
+
+    Machine artifacts (excel_analysis.json, mappings) are compact; pass
+    pretty=True only for dumps meant to be read by people. Peak memory is
+    recorded too; measure_memory=False skips it unless profiling is
+    already tracing allocations.
+    """
+    def write(f):
+        for chunk in encode_chunks(obj, pretty, default):
+            f.write(chunk)
+
+    return _measured_write(path, write, 'json', pretty, measure_memory)
+
+
+def write_html(path: Union[str, Path], parts: List[Union[str, JsonSlot]],
+               measure_memory: bool = True) -> dict:
+    """Stream a document made of literal text and JsonSlot values"""
+    def write(f):
+        for part in parts:
+            if isinstance(part, JsonSlot):
+                for chunk in encode_chunks(part.obj, False, part.default):
+                    f.write(chunk)
+            else:
+                f.write(part.encode('utf-8'))
+
+    return _measured_write(path, write, 'html', False, measure_memory)
+
+
+def template_parts(html: str, slots: Dict[str, Tuple[str, Any, str]]) -> List[Union[str, JsonSlot]]:
+    """
+    Split `html` at each placeholder and put (before, value, after) in its place,
+    e.g. {'let allParticipants = [];': ('let allParticipants = ', data, ';')}.
+    Placeholders missing from the template are skipped.
+    """
+    found = sorted((html.find(marker), marker) for marker in slots if marker in html)
+    parts: List[Union[str, JsonSlot]] = []
+    pos = 0
+    for idx, marker in found:
+        before, value, after = slots[marker]
+        parts.append(html[pos:idx] + before)
+        parts.append(JsonSlot(value))
+        parts.append(after)
+        pos = idx + len(marker)
+    parts.append(html[pos:])
+    return parts
+
+
+def print_artifact_report():
+    if not ARTIFACT_STATS:
+        return
+    print("\n=== Artifact Report ===")
+    for stats in ARTIFACT_STATS:
+        peak = stats['peak_memory_bytes']
+        memory = f"peak {peak:,} bytes, " if peak is not None else ''
+        print(f"  {stats['artifact']}: {stats['bytes']:,} bytes, {stats['seconds']}s, {memory}{stats['backend']}"
+              f"{' (pretty)' if stats['pretty'] else ''}")
@@ -7,6 +7,9 @@ import json
 import pandas as pd
 from pathlib import Path
 
+from analysis_snapshot import load_analysis
+from json_output import dump_json
+
 # Load Excel data
 df = pd.read_excel('makeuptest_AP_Bueatylink_20250927.xlsx')
 print(f"Loaded {len(df)} participants")
@@ -60,8 +63,7 @@ print(f"Participants with images: {participants_with_images}")
 print(f"Participants without images: {len(image_mapping) - participants_with_images}")
 
 # Save the mapping
-with open('complete_participant_image_mapping.json', 'w', encoding='utf-8') as f:
-    json.dump(image_mapping, f, ensure_ascii=False, indent=2)
+dump_json(image_mapping, 'complete_participant_image_mapping.json')
 
 print(f"\nSaved mapping to complete_participant_image_mapping.json")
 
@@ -69,8 +71,7 @@ print(f"\nSaved mapping to complete_participant_image_mapping.json")
 print("\nUpdating dashboard...")
 
 # Load analysis data
-with open('excel_analysis.json', 'r', encoding='utf-8') as f:
-    analysis_data = json.load(f)
+analysis_data = load_analysis(sections=('meta',))
 
 # Read current dashboard
 with open('makeup-test-dashboard.html', 'r', encoding='utf-8') as f:
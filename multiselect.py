@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Multi-select (checkbox) survey columns: vectorized explode into a
+multi-hot participant x option matrix, per-option counts and an
+option x option co-occurrence matrix
+"""
+
+import json
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+BASE_PRODUCTS_COLUMN = 'Please select all face/base makeup products you typically use: for your daily makeup routine (Select at least one)'
+LIP_MAKEUP_COLUMN = 'Please select all the lip makeup products you typically use for your daily makeup routine.'
+LIP_CARE_COLUMN = 'Please select all the lip care products you typically use for your daily routine.'
+
+MULTI_SELECT_COLUMNS = [BASE_PRODUCTS_COLUMN, LIP_MAKEUP_COLUMN, LIP_CARE_COLUMN]
+
+
+def find_multiselect_columns(columns) -> List[str]:
+    """Checkbox-style questions are worded 'Please select all ...'"""
+    return [col for col in columns if 'select all' in str(col).lower()]
+
+
+def explode_options(series: pd.Series) -> pd.DataFrame:
+    """
+    One row per (participant, option) pair.
+
+    Answers are separated by commas and/or newlines; blanks and repeated
+    options within one answer are dropped.
+    """
+    answers = series[series.map(lambda v: isinstance(v, str))]
+    exploded = (answers.str.replace('\n', ',', regex=False)
+                .str.split(',')
+                .explode()
+                .str.strip())
+    exploded = exploded[exploded.notna() & (exploded != '')]
+
+    pairs = pd.DataFrame({'row': exploded.index, 'option': exploded.values})
+    return pairs.drop_duplicates(ignore_index=True)
+
+
+def multi_hot_matrix(series: pd.Series):
+    """
+    CSR participant x option indicator matrix (uint8) built straight from
+    the (row, option) pairs, plus the option labels ordered by descending
+    frequency. Rows follow `series`.
+    """
+    # Exploded by position, so duplicate or non-default index labels still line up
+    pairs = explode_options(series.reset_index(drop=True))
+    options = pairs['option'].value_counts().index
+
+    row_codes = pairs['row'].to_numpy()
+    option_codes = options.get_indexer(pairs['option'])
+    ones = np.ones(len(pairs), dtype=np.uint8)
+
+    matrix = sparse.csr_matrix((ones, (row_codes, option_codes)), shape=(len(series), len(options)))
+    return matrix, options
+
+
+def multi_hot(series: pd.Series) -> pd.DataFrame:
+    """
+    Sparse participant x option indicator matrix (uint8, fill value 0),
+    indexed like `series`, options ordered by descending frequency.
+    """
+    matrix, options = multi_hot_matrix(series)
+    hot = pd.DataFrame.sparse.from_spmatrix(matrix, columns=options)
+    hot.index = series.index
+    return hot
+
+
+def option_counts(series: pd.Series) -> Dict[str, int]:
+    """Number of participants who picked each option, most common first"""
+    counts = explode_options(series)['option'].value_counts()
+    return {str(option): int(count) for option, count in counts.items()}
+
+
+def cooccurrence(hot: pd.DataFrame) -> pd.DataFrame:
+    """Option x option counts of participants picking both (diagonal = option counts)"""
+    co = _cooccurrence(hot.sparse.to_coo().tocsr())
+    return pd.DataFrame(co.toarray(), index=hot.columns, columns=hot.columns)
+
+
+def _cooccurrence(matrix):
+    """X.T @ X on the CSR indicator matrix, kept sparse"""
+    matrix = matrix.astype(np.int32)
+    return (matrix.T @ matrix).tocsr()
+
+
+def analyze_multiselect(df: pd.DataFrame, columns: Optional[List[str]] = None) -> Dict[str, dict]:
+    """
+    Counts and co-occurrence for every checkbox column in `df`. An option
+    repeated within one answer counts once for that participant.
+    """
+    columns = columns or find_multiselect_columns(df.columns)
+    results = {}
+    for col in columns:
+        if col not in df.columns:
+            continue
+        matrix, options = multi_hot_matrix(df[col])
+        co = _cooccurrence(matrix)
+        counts = np.asarray(matrix.sum(axis=0)).ravel()
+        results[col] = {
+            'respondents': int((matrix.getnnz(axis=1) > 0).sum()),
+            'counts': {str(options[k]): int(counts[k]) for k in np.argsort(-counts, kind='stable')},
+            'options': [str(o) for o in options],
+            'cooccurrence': co.toarray().tolist(),
+        }
+    return results
+
+
+def top_pairs(result: dict, limit: int = 10) -> List[tuple]:
+    """Most frequent option pairs (off-diagonal) from an analyze_multiselect entry"""
+    options = result['options']
+    matrix = np.array(result['cooccurrence'])
+    upper_i, upper_j = np.triu_indices(len(options), k=1)
+    counts = matrix[upper_i, upper_j]
+    order = np.argsort(-counts, kind='stable')[:limit]
+    return [(options[upper_i[k]], options[upper_j[k]], int(counts[k])) for k in order if counts[k] > 0]
+
+
+if __name__ == "__main__":
+    with open('excel_analysis.json', 'r', encoding='utf-8') as f:
+        analysis_data = json.load(f)
+
+    df = pd.DataFrame(analysis_data['participant_data'])
+    results = analyze_multiselect(df)
+
+    for col, result in results.items():
+        print(f"\n{col}")
+        print(f"  Respondents: {result['respondents']}")
+        for option, count in result['counts'].items():
+            print(f"  {option}: {count}")
+        print("  Top combinations:")
+        for a, b, count in top_pairs(result, 5):
+            print(f"    {a} + {b}: {count}")
+
+    with open('multiselect_analysis.json', 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    print("\nSaved multiselect_analysis.json")
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Pre-sort participants and split them into fixed-size static page files
+for the table dashboard's deferred (server-style) paging
+"""
+
+import json
+import re
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional
+
+NAME_COLUMN = 'What is your full name? (Please write exactly as shown in your ARC or passport)'
+
+# Columns the table view needs; everything else stays out of the shards
+TABLE_COLUMNS = [
+    'A-ID',
+    'P-ID',
+    NAME_COLUMN,
+    'What is your gender? ',
+    'What is your nationality?',
+    'Please enter your 4-digit year of birth(e.g., 1980) ',
+    'setDate',
+    '밝기판정',
+    '톤',
+    'Please select the ethnic group you identify with:',
+]
+
+DEFAULT_SHARD_SIZE = 500
+
+
+def _aid_key(value) -> tuple:
+    """A101 < A102 < ... < A1000 (numeric part compared as a number)"""
+    if value is None:
+        return (1, 0, '')
+    text = str(value)
+    match = re.search(r'(\d+)', text)
+    return (0, int(match.group(1)) if match else 0, text)
+
+
+def _set_date_key(value) -> tuple:
+    """setDate is stored as 'M/D' (e.g. '9/22')"""
+    if value is None:
+        return (1, 0, 0)
+    parts = re.findall(r'\d+', str(value))
+    if len(parts) >= 2:
+        return (0, int(parts[0]), int(parts[1]))
+    return (0, int(parts[0]) if parts else 0, 0)
+
+
+def _brightness_key(value) -> tuple:
+    """밝기판정 is 1-7, possibly written as '3' or '3(LM)'"""
+    if value is None:
+        return (1, 0)
+    match = re.match(r'\s*(\d+)', str(value))
+    return (0, int(match.group(1)) if match else 0)
+
+
+# sort key name -> (source column, key function)
+SORT_KEYS: Dict[str, tuple] = {
+    'aid': ('A-ID', _aid_key),
+    'setDate': ('setDate', _set_date_key),
+    'brightness': ('밝기판정', _brightness_key),
+}
+
+
+def _clean(value):
+    """Make a cell JSON-safe (NaN -> None)"""
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+def build_rows(participants: List[dict], image_mapping: Optional[Dict[str, dict]] = None,
+               columns: List[str] = TABLE_COLUMNS) -> List[list]:
+    """Project participants down to table rows; the last cell holds the image paths"""
+    image_mapping = image_mapping or {}
+    rows = []
+    for participant in participants:
+        row = [_clean(participant.get(col)) for col in columns]
+        images = image_mapping.get(participant.get('A-ID'), {}).get('images', {})
+        row.append({k: v for k, v in images.items() if v})
+        rows.append(row)
+    return rows
+
+
+def write_participant_shards(participants: List[dict], out_dir: str,
+                             image_mapping: Optional[Dict[str, dict]] = None,
+                             shard_size: int = DEFAULT_SHARD_SIZE,
+                             columns: List[str] = TABLE_COLUMNS) -> dict:
+    """
+    Write one ascending run of shards per sort key plus an index.json.
+
+    Layout:
+        <out_dir>/index.json
+        <out_dir>/<sort key>/page-00000.json   (list of rows, ascending)
+        <out_dir>/<sort key>/ranks.json        (participant i -> its row number in that order)
+
+The ranks let a search (doc ids = positions in `participants`) page its
+hits in any sort order while reading only the shards holding that page.
+
+    Descending order is served by reading the same shards from the end,
+    so only one copy per sort key is written.
+    """
+    out_path = Path(out_dir)
+    if out_path.exists():
+        shutil.rmtree(out_path)
+    out_path.mkdir(parents=True)
+
+    rows = build_rows(participants, image_mapping, columns)
+    total = len(rows)
+    shard_count = (total + shard_size - 1) // shard_size
+
+    for key_name, (column, key_func) in SORT_KEYS.items():
+        col_idx = columns.index(column)
+        order = sorted(range(total), key=lambda i: key_func(rows[i][col_idx]))
+        ordered = [rows[i] for i in order]
+        ranks = [0] * total
+        for rank, i in enumerate(order):
+            ranks[i] = rank
+
+        key_dir = out_path / key_name
+        key_dir.mkdir()
+        for shard_no in range(shard_count):
+            chunk = ordered[shard_no * shard_size:(shard_no + 1) * shard_size]
+            with open(key_dir / f'page-{shard_no:05d}.json', 'w', encoding='utf-8') as f:
+                json.dump(chunk, f, ensure_ascii=False, separators=(',', ':'))
+        with open(key_dir / 'ranks.json', 'w', encoding='utf-8') as f:
+            json.dump(ranks, f, separators=(',', ':'))
+
+    index = {
+        'version': 1,
+        'total': total,
+        'shard_size': shard_size,
+        'shard_count': shard_count,
+        'columns': columns + ['images'],
+        'sort_keys': {key_name: column for key_name, (column, _) in SORT_KEYS.items()},
+        'default_sort': 'aid',
+    }
+    with open(out_path / 'index.json', 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+
+    print(f"✓ Wrote {shard_count} shard(s) x {len(SORT_KEYS)} sort keys to {out_path}/ "
+          f"({total} participants, {shard_size} per shard)")
+    return index
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Watch mode: rebuild the dashboards when a new workbook export or new
+images land
+
+Runs the pipeline scripts an operator would run by hand after a new
+export, but only the stages whose inputs changed since their last
+successful run (or whose outputs are missing):
+
+    images      extract_excel_images_final.py   workbook -> excel_images/, final_image_mapping.json
+    hash        identify_reference_images.py    excel_images/ -> image_type_mapping.json
+    analysis    fix_dashboard_data.py           workbook -> excel_analysis.json/.snapshot
+    mapping     create_final_image_mapping.py   workbook + excel_images/ -> participant_final_mapping.json
+    dashboard   generate_final_dashboard.py     analysis + mapping -> makeup-test-dashboard-final.html
+
+A stage's inputs are fingerprinted by size and mtime. For a folder, every
+file directly inside it counts. Stages run in this order and are
+re-checked one by one, so a stage that rewrites excel_images/ makes
+mapping stale in the same pass. The scripts run in this process, so
+pandas and friends are imported once and a rebuild costs only the work
+itself. Fingerprints of the last successful runs are kept in
+.pipeline_state.json.
+
+Changes are picked up with inotify on Linux (via ctypes, no extra
+package), otherwise by polling. A burst of writes is debounced, and a
+workbook is only used once it opens as a complete xlsx. With --inbox,
+the newest *.xlsx dropped into that folder is copied over the workbook
+first, so dated exports can be dropped as they are.
+
+    python pipeline_watch.py [--inbox exports/] [--debounce 2] [--once] [--dry-run] [--force dashboard]
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import fnmatch
+import hashlib
+import json
+import os
+import select
+import shutil
+import stat
+import struct
+import sys
+import time
+import zipfile
+from typing import Dict, List, Optional, Set, Tuple
+
+from famigo import run_module
+from stage_profile import stage
+
+WORKBOOK = 'makeuptest_AP_Bueatylink_20250927.xlsx'
+STATE_FILE = '.pipeline_state.json'
+DEFAULT_DEBOUNCE = 2.0
+POLL_INTERVAL = 1.0
+
+# In run order: (name, script module, inputs, outputs)
+STAGES = [
+    ('images', 'extract_excel_images_final', [WORKBOOK],
+     ['participant_images_final', 'excel_images', 'final_image_mapping.json']),
+    ('hash', 'identify_reference_images', ['excel_images'], ['image_type_mapping.json']),
+    # images_organized_by_aid/ is only looked up for the old dashboard's links; nothing here produces it
+    ('analysis', 'fix_dashboard_data', [WORKBOOK],
+     ['excel_analysis.json', 'makeup-test-dashboard.html']),
+    ('mapping', 'create_final_image_mapping', [WORKBOOK, 'excel_images', 'image_type_mapping.json'],
+     ['participant_final_mapping.json']),
+    ('dashboard', 'generate_final_dashboard',
+     ['excel_analysis.json', 'excel_analysis.snapshot', 'participant_final_mapping.json', 'makeup-test-dashboard-v2.html'],
+     ['makeup-test-dashboard-final.html', 'participant_details_final', 'participant_search_index_final.json']),
+]
+
+# Editor/Excel lock files and half-written temporaries
+IGNORED_NAMES = ['~$*', '.~lock.*', '*.tmp', '*.partial', '*.swp', '.#*', STATE_FILE]
+
+# inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, name length
+
+
+def fingerprint(path: str) -> Optional[str]:
+    """Digest of (size, mtime) of a file, or of every file directly in a folder; None if missing"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if stat.S_ISDIR(st.st_mode):
+        entries = []
+        for entry in os.scandir(path):
+            if entry.is_file():
+                info = entry.stat()
+                entries.append((entry.name, info.st_size, info.st_mtime_ns))
+        signature = sorted(entries)
+    else:
+        signature = [st.st_size, st.st_mtime_ns]
+    return hashlib.sha1(json.dumps(signature).encode('utf-8')).hexdigest()
+
+
+def workbook_ready(path: str) -> bool:
+    """True once `path` opens as a complete xlsx (a half-copied file has no central directory yet)"""
+    try:
+        with zipfile.ZipFile(path) as zip_ref:
+            return 'xl/workbook.xml' in zip_ref.namelist()
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+
+def ignored(path: str) -> bool:
+    name = os.path.basename(path)
+    return any(fnmatch.fnmatch(name, pattern) for pattern in IGNORED_NAMES)
+
+
+class Pipeline:
+    """The stages above plus the fingerprints of their last successful runs"""
+
+    def __init__(self, state_path: str = STATE_FILE):
+        self.state_path = state_path
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                self.state: Dict[str, dict] = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.state = {}
+
+    def inputs(self) -> Set[str]:
+        return {path for _, _, inputs, _ in STAGES for path in inputs}
+
+    def stale_reason(self, name: str, inputs: List[str], outputs: List[str]) -> Optional[str]:
+        built = self.state.get(name)
+        if built is None:
+            return 'never built'
+        missing = [path for path in outputs if not os.path.exists(path)]
+        if missing:
+            return f'missing {missing[0]}'
+        changed = [path for path in inputs if built['inputs'].get(path) != fingerprint(path)]
+        if changed:
+            return f'{changed[0]} changed'
+        return None
+
+    def plan(self, force: Set[str] = frozenset()) -> List[tuple]:
+        """(name, reason) of the stages a build would run, without running them"""
+        planned, produced = [], set()
+        for name, _, inputs, outputs in STAGES:
+            reason = 'forced' if name in force else self.stale_reason(name, inputs, outputs)
+            if reason is None and produced & set(inputs):
+                reason = f'{sorted(produced & set(inputs))[0]} rebuilt'
+            if reason:
+                planned.append((name, reason))
+                produced.update(outputs)
+        return planned
+
+    def _save(self):
+        tmp = f'{self.state_path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.state_path)
+
+    def build(self, force: Set[str] = frozenset()) -> List[str]:
+        """Run the stale stages in order; stops at the first failure. Returns the stages that ran."""
+        ran = []
+        for name, module, inputs, outputs in STAGES:
+            reason = 'forced' if name in force else self.stale_reason(name, inputs, outputs)
+            if reason is None:
+                continue
+            print(f"\n▶ {name} ({reason}): {module}.py")
+            # Taken before the run: an input changing mid-run leaves the stage stale
+            fingerprints = {path: fingerprint(path) for path in inputs}
+            started = time.time()
+            argv = sys.argv
+            try:
+                with stage(name, module=module):
+                    run_module(module, [])
+            except (Exception, SystemExit) as e:
+                print(f"✗ {name} failed: {type(e).__name__}: {e}; later stages skipped until the next change")
+                return ran
+            finally:
+                sys.argv = argv
+            seconds = time.time() - started
+            self.state[name] = {'inputs': fingerprints, 'built': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                                'seconds': round(seconds, 3)}
+            self._save()
+            ran.append(name)
+            print(f"✓ {name} done in {seconds:.1f}s")
+        return ran
+
+
+class InotifyWatcher:
+    """Changed paths in a set of folders (not recursive), from inotify"""
+
+    def __init__(self, folders: List[str]):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.folders: Dict[int, str] = {}
+        for folder in folders:
+            self.add(folder)
+
+    def add(self, folder: str):
+        if folder in self.folders.values() or not os.path.isdir(folder):
+            return
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch {folder} failed')
+        self.folders[wd] = folder
+
+    def wait(self, timeout: Optional[float]) -> Set[str]:
+        """Paths changed within `timeout` seconds (None: block until something changes)"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 1 << 16)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                raw = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length]
+                offset += EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    # Events were dropped; report every watched folder as changed
+                    changed.update(self.folders.values())
+                elif wd in self.folders:
+                    name = os.fsdecode(raw.rstrip(b'\0'))
+                    changed.add(os.path.normpath(os.path.join(self.folders[wd], name)))
+
+
+class PollingWatcher:
+    """Fallback for systems without inotify: compares fingerprints every POLL_INTERVAL"""
+
+    def __init__(self, paths: List[str]):
+        self.paths = paths
+        self.seen = {path: fingerprint(path) for path in paths}
+
+    def add(self, folder: str):
+        if folder not in self.seen:
+            self.paths.append(folder)
+            self.seen[folder] = fingerprint(folder)
+
+    def wait(self, timeout: Optional[float]) -> Set[str]:
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            current = {path: fingerprint(path) for path in self.paths}
+            changed = {path for path in self.paths if current[path] != self.seen[path]}
+            self.seen = current
+            if changed:
+                return changed
+            if deadline is not None and time.time() >= deadline:
+                return set()
+            time.sleep(POLL_INTERVAL if deadline is None else max(0.0, min(POLL_INTERVAL, deadline - time.time())))
+
+
+def newest_export(inbox: str) -> Optional[str]:
+    exports = [os.path.join(inbox, name) for name in os.listdir(inbox)
+               if name.lower().endswith('.xlsx') and not ignored(name)]
+    return max(exports, key=os.path.getmtime) if exports else None
+
+
+def install_newest_export(inbox: str, installed: Optional[tuple] = None) -> Tuple[bool, Optional[tuple]]:
+    """
+    Copy the newest complete export in `inbox` over the workbook (atomically)
+    unless it is the one already installed. Returns (ready, installed):
+    ready is False while the export is still being written.
+    """
+    export = newest_export(inbox)
+    if export is None:
+        return True, installed
+    key = (export, fingerprint(export))
+    if key == installed:
+        return True, installed
+    if not workbook_ready(export):
+        return False, installed
+    tmp = f'{WORKBOOK}.partial'
+    shutil.copy2(export, tmp)
+    os.replace(tmp, WORKBOOK)
+    print(f"✓ Installed {export} as {WORKBOOK}")
+    return True, key
+
+
+class PipelineWatch:
+    def __init__(self, pipeline: Pipeline, inbox: Optional[str] = None, debounce: float = DEFAULT_DEBOUNCE):
+        self.pipeline = pipeline
+        self.inbox = inbox
+        self.debounce = debounce
+        self.inputs = {os.path.normpath(path) for path in pipeline.inputs()}
+        self.folders = sorted({path for path in self.inputs if os.path.isdir(path)} |
+                              {os.path.dirname(path) or '.' for path in self.inputs} |
+                              ({os.path.normpath(inbox)} if inbox else set()))
+        self.installed: Optional[tuple] = None
+        try:
+            self.watcher = InotifyWatcher(self.folders)
+            self.mode = 'inotify'
+        except (OSError, AttributeError):
+            self.watcher = PollingWatcher(sorted(self.inputs) + ([inbox] if inbox else []))
+            self.mode = 'polling'
+
+    def relevant(self, path: str) -> bool:
+        if ignored(path):
+            return False
+        parent = os.path.dirname(path) or '.'
+        if self.inbox and parent == os.path.normpath(self.inbox):
+            return path.lower().endswith('.xlsx')
+        return path in self.inputs or parent in self.inputs
+
+    def rebuild(self) -> List[str]:
+        if self.inbox:
+            ready, self.installed = install_newest_export(self.inbox, self.installed)
+            if not ready:
+                print("… export still being written; waiting")
+                return []
+        if not workbook_ready(WORKBOOK):
+            print(f"… {WORKBOOK} is missing or incomplete; waiting")
+            return []
+        started = time.time()
+        ran = self.pipeline.build()
+        if ran:
+            print(f"\n✓ Rebuilt {', '.join(ran)} in {time.time() - started:.1f}s")
+        return ran
+
+    def run(self):
+        print(f"Watching {', '.join(self.folders)} ({self.mode}, {self.debounce:g}s debounce)")
+        self.rebuild()
+        while True:
+            changed = {path for path in self.watcher.wait(None) if self.relevant(path)}
+            if not changed:
+                continue
+            # Debounce: wait until the writes stop
+            while True:
+                more = {path for path in self.watcher.wait(self.debounce) if self.relevant(path)}
+                if not more:
+                    break
+                changed |= more
+            for folder in self.folders:
+                self.watcher.add(folder)  # folders created since startup
+            print(f"\nChanged: {', '.join(sorted(changed)[:5])}{' …' if len(changed) > 5 else ''}")
+            self.rebuild()
+            # Our own outputs (excel_images/, excel_analysis.json) raised events too; the
+            # fingerprints make a second pass a no-op unless something new arrived meanwhile
+            self.watcher.wait(0)
+            self.rebuild()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild stale pipeline stages when the workbook or images change')
+    parser.add_argument('--inbox', help='folder exports are dropped into; the newest *.xlsx becomes the workbook')
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE, help='seconds of quiet before rebuilding')
+    parser.add_argument('--state', default=STATE_FILE)
+    parser.add_argument('--once', action='store_true', help='build what is stale and exit')
+    parser.add_argument('--dry-run', action='store_true', help='list the stale stages and exit')
+    parser.add_argument('--force', action='append', default=[], choices=[name for name, *_ in STAGES],
+                        help='rebuild this stage (and what depends on it) even if it looks fresh')
+    args = parser.parse_args()
+
+    pipeline = Pipeline(args.state)
+    if args.dry_run:
+        planned = pipeline.plan(set(args.force))
+        for name, reason in planned:
+            print(f"  {name:10s} {reason}")
+        print(f"{len(planned)} stale stage(s)" if planned else "✓ Everything is up to date")
+        return
+    if args.once or args.force:
+        if args.inbox and not install_newest_export(args.inbox)[0] or not workbook_ready(WORKBOOK):
+            sys.exit(f"{WORKBOOK} is missing or incomplete")
+        ran = pipeline.build(set(args.force))
+        print(f"\n✓ Ran {', '.join(ran)}" if ran else "\n✓ Everything is up to date")
+        return
+
+    try:
+        PipelineWatch(pipeline, args.inbox, args.debounce).run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
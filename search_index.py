@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Build a compact inverted index for client-side participant lookup
+(name, A-ID, P-ID and nationality substrings; skin tone, brightness)
+
+The dashboard's scan matched the search text anywhere in the name, A-ID
+or P-ID, so the index keys every substring of each token ('01' finds
+A101). Candidates are checked against the same test the scan used, so
+phrases with spaces and tokens longer than MAX_PREFIX match exactly.
+"""
+
+import json
+import re
+import unicodedata
+from typing import Dict, List
+
+from stage_profile import profiled
+
+NAME_COLUMN = 'What is your full name? (Please write exactly as shown in your ARC or passport)'
+
+# field prefix -> source column
+INDEX_FIELDS = {
+    'n': NAME_COLUMN,
+    'a': 'A-ID',
+    'p': 'P-ID',
+    'c': 'What is your nationality?',
+    't': '톤',
+    'b': '밝기판정',
+}
+
+# Fields matched by token substring while typing; the rest are exact-match filters
+TEXT_FIELDS = ('n', 'a', 'p', 'c')
+MAX_PREFIX = 12
+
+INDEX_FILE = 'participant_search_index.json'
+
+
+def normalize(value) -> str:
+    """Lowercase and strip accents (mirrored by normalizeSearchText in the JS)"""
+    if value is None or (isinstance(value, float) and value != value):
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = unicodedata.normalize('NFKD', str(value))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return text.lower().strip()
+
+
+def tokenize(value) -> List[str]:
+    return re.findall(r'[^\W_]+', normalize(value))
+
+
+def substrings(text: str, limit: int = MAX_PREFIX) -> set:
+    """Every substring of `text` up to `limit` characters long"""
+    return {text[start:start + length] for start in range(len(text))
+            for length in range(1, min(limit, len(text) - start) + 1)}
+
+
+def _field_terms(field: str, value) -> set:
+    terms = set()
+    if field in TEXT_FIELDS:
+        for tok in tokenize(value):
+            terms.update(f'{field}:{text}' for text in substrings(tok))
+    else:
+        full = normalize(value)
+        # 밝기판정 may read '3' or '3(LM)'
+        if field == 'b':
+            match = re.match(r'\d+', full)
+            full = match.group(0) if match else full
+        if full:
+            terms.add(f'{field}:{full}')
+    return terms
+
+
+def delta_encode(ids: List[int]) -> List[int]:
+    out, prev = [], 0
+    for doc in ids:
+        out.append(doc - prev)
+        prev = doc
+    return out
+
+
+def build_search_index(participants: List[dict]) -> dict:
+    """Doc ids are positions in `participants` (same order as allParticipants)"""
+    postings: Dict[str, List[int]] = {}
+    for doc, participant in enumerate(participants):
+        for field, column in INDEX_FIELDS.items():
+            for term in _field_terms(field, participant.get(column)):
+                postings.setdefault(term, []).append(doc)
+
+    return {
+        'version': 2,
+        'docs': len(participants),
+        'aids': [participant.get('A-ID') for participant in participants],
+        'fields': INDEX_FIELDS,
+        'text_fields': list(TEXT_FIELDS),
+        'max_prefix': MAX_PREFIX,
+        'terms': {term: delta_encode(ids) for term, ids in sorted(postings.items())},
+    }
+
+
+@profiled('write search index')
+def write_search_index(participants: List[dict], path: str = INDEX_FILE) -> dict:
+    index = build_search_index(participants)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+    print(f"✓ Wrote search index to {path} ({len(index['terms'])} terms, {index['docs']} participants)")
+    return index
+
+
+# Loads the index asset once and answers queries with posting-list intersections
+SEARCH_INDEX_JS = """
+        // Prebuilt participant search index (see search_index.py)
+        const SEARCH_INDEX_URL = '__INDEX_URL__';
+        let searchIndex = null;
+        let searchIndexLoading = null;
+
+        function normalizeSearchText(value) {
+            return String(value ?? '').normalize('NFKD').replace(/[\\u0300-\\u036f]/g, '').toLowerCase().trim();
+        }
+
+        // Keystrokes before the index arrives share one fetch; a failed load is retried next time
+        function loadSearchIndex() {
+            if (searchIndex) return Promise.resolve(searchIndex);
+            if (!searchIndexLoading) {
+                searchIndexLoading = fetch(SEARCH_INDEX_URL).then(response => {
+                    if (!response.ok) throw new Error(`Search index: HTTP ${response.status}`);
+                    return response.json();
+                }).then(raw => {
+                    // Decode delta-encoded posting lists once
+                    const terms = new Map();
+                    for (const [term, deltas] of Object.entries(raw.terms)) {
+                        const ids = new Int32Array(deltas.length);
+                        let prev = 0;
+                        for (let i = 0; i < deltas.length; i++) {
+                            prev += deltas[i];
+                            ids[i] = prev;
+                        }
+                        terms.set(term, ids);
+                    }
+                    searchIndex = {
+                        terms, docs: raw.docs, aids: raw.aids, maxPrefix: raw.max_prefix, textFields: raw.text_fields,
+                        textColumns: raw.text_fields.map(field => raw.fields[field])
+                    };
+                    return searchIndex;
+                }).catch(error => {
+                    searchIndexLoading = null;
+                    throw error;
+                });
+            }
+            return searchIndexLoading;
+        }
+
+        function unionPostings(lists) {
+            if (lists.length === 1) return lists[0];
+            const seen = new Uint8Array(searchIndex.docs);
+            lists.forEach(list => list.forEach(id => { seen[id] = 1; }));
+            const out = [];
+            for (let i = 0; i < seen.length; i++) if (seen[i]) out.push(i);
+            return Int32Array.from(out);
+        }
+
+        function intersectPostings(a, b) {
+            const out = [];
+            let i = 0, j = 0;
+            while (i < a.length && j < b.length) {
+                if (a[i] === b[j]) { out.push(a[i]); i++; j++; }
+                else if (a[i] < b[j]) i++;
+                else j++;
+            }
+            return Int32Array.from(out);
+        }
+
+        // The scan's test: the whole search text inside one of the searched columns
+        function participantMatches(participant, text) {
+            return searchIndex.textColumns.some(column => normalizeSearchText(participant[column]).includes(text));
+        }
+
+        // Returns sorted doc ids (positions in participants), or null for "no constraint".
+        // Without `participants` every token only has to occur somewhere (DataTables' smart search)
+        function searchParticipants(query, filters = {}, participants = null) {
+            let result = null;
+            const constrain = list => { result = result === null ? list : intersectPostings(result, list); };
+            const empty = new Int32Array(0);
+
+            const text = normalizeSearchText(query);
+            const tokens = text.match(/[\\p{L}\\p{N}]+/gu) || [];
+            tokens.forEach(token => {
+                const key = token.slice(0, searchIndex.maxPrefix);
+                const lists = searchIndex.textFields
+                    .map(field => searchIndex.terms.get(`${field}:${key}`))
+                    .filter(Boolean);
+                constrain(lists.length ? unionPostings(lists) : empty);
+            });
+            if (tokens.length && participants) {
+                // Tokens narrow the candidates; the scan's test settles them
+                result = Int32Array.from(Array.from(result).filter(id => participantMatches(participants[id], text)));
+            }
+
+            if (filters.tone) constrain(searchIndex.terms.get(`t:${normalizeSearchText(filters.tone)}`) || empty);
+            if (filters.brightness) constrain(searchIndex.terms.get(`b:${normalizeSearchText(filters.brightness)}`) || empty);
+
+            return result;
+        }
+"""
+
+
+def search_index_js(index_url: str = INDEX_FILE) -> str:
+    return SEARCH_INDEX_JS.replace('__INDEX_URL__', index_url)
+
+
+# Drop-in replacement for the v2 template's scanning applyFilters()
+APPLY_FILTERS_JS = """function applyFilters() {
+                const searchTerm = searchInput.value;
+                const colorFilter = filterSkinColor.value;
+                const toneFilter = filterSkinTone.value;
+
+                loadSearchIndex().then(() => {
+                    const ids = searchParticipants(searchTerm, { brightness: colorFilter, tone: toneFilter }, allParticipants);
+                    displayParticipants(ids === null ? allParticipants : Array.from(ids, id => allParticipants[id]));
+                }).catch(error => console.error('Error loading search index:', error));
+            }"""
+
+
+def inject_search(html: str, index_url: str = INDEX_FILE) -> str:
+    """Swap the v2 template's full-array filter for index lookups"""
+    start_idx = html.find('function applyFilters() {')
+    end_marker = 'displayParticipants(filtered);\n            }'
+    end_idx = html.find(end_marker, start_idx)
+    if start_idx == -1 or end_idx == -1:
+        return html
+
+    html = html[:start_idx] + APPLY_FILTERS_JS + html[end_idx + len(end_marker):]
+
+    anchor = '// Close participant modal'
+    return html.replace(anchor, search_index_js(index_url).strip() + '\n\n        ' + anchor, 1)
+
+
+if __name__ == "__main__":
+    with open('excel_analysis.json', 'r', encoding='utf-8') as f:
+        analysis_data = json.load(f)
+
+    write_search_index(analysis_data['participant_data'])
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Per-stage profiling for the pipeline scripts, written as a Chrome trace
+
+    from stage_profile import profiled, stage
+
+    with stage('read excel', path=excel_path):
+        df = pd.read_excel(excel_path)
+
+    @profiled('split participants')
+    def split_participants(...): ...
+
+stage() does nothing until a profiler is enabled, e.g. by
+famigo.py --profile or benchmark_pipeline.py --profile. While one is
+enabled, every stage records:
+- wall time and process CPU time
+- peak RSS
+- the tracemalloc peak
+
+The run is saved as a Chrome trace for chrome://tracing or
+ui.perfetto.dev. Each stage becomes one complete event, nested as the
+stages were, and memory is added as counter tracks.
+
+The calls that usually explain a slow run are wrapped while profiling:
+pd.read_excel, PIL decoding, re.sub and json/orjson dumps and loads.
+Each gets a count and a total under otherData.calls. A single call
+longer than CALL_EVENT_MS also gets its own event.
+
+When a cProfile directory is given, each outermost stage is also profiled
+into <dir>/<n>-<stage>.prof. cProfile cannot nest, hence outermost only.
+
+tracemalloc slows allocation-heavy code, often by 2x or more. Compare
+traces with traces, not with unprofiled timings.
+
+    python stage_profile.py old_trace.json new_trace.json    # per-stage comparison
+"""
+
+import argparse
+import cProfile
+import functools
+import importlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Single watched calls at least this long get their own trace event
+CALL_EVENT_MS = 1.0
+
+# (module, attribute path, label); modules that are not installed are skipped
+WATCHED_CALLS = [
+    ('pandas', 'read_excel', 'pd.read_excel'),
+    ('PIL.ImageFile', 'ImageFile.load', 'PIL decode'),  # PIL decodes lazily, on first pixel access
+    ('re', 'sub', 're.sub'),
+    ('json', 'dumps', 'json.dumps'),
+    ('json', 'dump', 'json.dump'),
+    ('json', 'loads', 'json.loads'),
+    ('json', 'load', 'json.load'),
+    ('orjson', 'dumps', 'orjson.dumps'),
+    ('orjson', 'loads', 'orjson.loads'),
+]
+
+MB = 1024 * 1024
+SLUG = re.compile(r'[^A-Za-z0-9_.-]+')
+
+# The enabled profiler, if any
+PROFILER: Optional['StageProfiler'] = None
+
+
+def _rss() -> Optional[int]:
+    """Current resident set size in bytes (Linux)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _rss_high_water() -> Optional[int]:
+    """Peak RSS in bytes: VmHWM (resettable on Linux), else the process-wide ru_maxrss"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _reset_rss_high_water() -> bool:
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _slug(name: str) -> str:
+    return SLUG.sub('-', name).strip('-')[:60] or 'stage'
+
+
+class StageProfiler:
+    """Collects stage and call events for one run; see the module docstring"""
+
+    def __init__(self, name: str = 'pipeline', cprofile_dir: Optional[str] = None, watch: bool = True):
+        self.name = name
+        self.cprofile_dir = cprofile_dir
+        self.pid = os.getpid()
+        self.main_thread = threading.get_ident()
+        self.origin = time.perf_counter_ns()
+        self.created = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.events: List[dict] = []
+        self.calls: Dict[str, dict] = {}
+        self.stack: List[dict] = []
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.cprofiles = 0
+        self.patched: List[tuple] = []
+
+        self.started_tracemalloc = not tracemalloc.is_tracing()
+        if self.started_tracemalloc:
+            tracemalloc.start()
+        # If the kernel will not reset VmHWM, RSS peaks are for the whole process so far
+        self.rss_scope = 'stage' if _reset_rss_high_water() else 'process'
+        if watch:
+            with self._timed('import watched modules', 'profiler', {}):
+                self._watch()
+
+    def _ts(self, ns: int) -> float:
+        return (ns - self.origin) / 1000
+
+    # --- memory peaks -------------------------------------------------
+
+    def _fold_peaks(self):
+        """Carry the current peaks into every open stage before they are reset or read"""
+        _, traced_peak = tracemalloc.get_traced_memory()
+        rss_peak = _rss_high_water()
+        for frame in self.stack:
+            frame['traced_peak'] = max(frame['traced_peak'], traced_peak)
+            if rss_peak is not None:
+                frame['rss_peak'] = max(frame['rss_peak'] or 0, rss_peak)
+
+    def reset_peaks(self):
+        self._fold_peaks()
+        tracemalloc.reset_peak()
+        if self.rss_scope == 'stage':
+            _reset_rss_high_water()
+
+    # --- stages -----------------------------------------------------
+
+    @contextmanager
+    def stage(self, name: str, **args):
+        if threading.get_ident() != self.main_thread:
+            # Memory peaks are per process; stages in worker threads get time only
+            with self._timed(name, 'stage', args):
+                yield
+            return
+
+        self.reset_peaks()
+        traced, _ = tracemalloc.get_traced_memory()
+        frame = {'name': name, 'args': args, 'start': time.perf_counter_ns(), 'cpu': time.process_time(),
+                 'traced_start': traced, 'traced_peak': traced, 'rss_start': _rss(), 'rss_peak': _rss_high_water()}
+        profile = None
+        if self.cprofile_dir and not self.stack:
+            profile = cProfile.Profile()
+            profile.enable()
+        self.stack.append(frame)
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            end = time.perf_counter_ns()
+            cpu = time.process_time() - frame['cpu']
+            self._fold_peaks()
+            self.stack.pop()
+            event_args = dict(args, cpu_ms=round(cpu * 1000, 3),
+                              tracemalloc_start_mb=round(frame['traced_start'] / MB, 3),
+                              tracemalloc_peak_mb=round(frame['traced_peak'] / MB, 3))
+            if frame['rss_peak'] is not None:
+                event_args['rss_peak_mb'] = round(frame['rss_peak'] / MB, 3)
+            if frame['rss_start'] is not None:
+                event_args['rss_start_mb'] = round(frame['rss_start'] / MB, 3)
+            if error:
+                event_args['error'] = error
+            if profile is not None:
+                profile.disable()
+                self.cprofiles += 1
+                os.makedirs(self.cprofile_dir, exist_ok=True)
+                path = os.path.join(self.cprofile_dir, f'{self.cprofiles:02d}-{_slug(name)}.prof')
+                profile.dump_stats(path)
+                event_args['cprofile'] = path
+            self._add({'name': name, 'cat': 'stage', 'ph': 'X', 'ts': self._ts(frame['start']),
+                       'dur': (end - frame['start']) / 1000, 'pid': self.pid, 'tid': self.main_thread,
+                       'args': event_args})
+            traced, _ = tracemalloc.get_traced_memory()
+            counters = {'tracemalloc_mb': round(traced / MB, 3)}
+            rss = _rss()
+            if rss is not None:
+                counters['rss_mb'] = round(rss / MB, 3)
+            self._add({'name': 'memory', 'ph': 'C', 'ts': self._ts(end), 'pid': self.pid, 'args': counters})
+
+    @contextmanager
+    def _timed(self, name: str, category: str, args: dict):
+        start, cpu = time.perf_counter_ns(), time.thread_time()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            self._add({'name': name, 'cat': category, 'ph': 'X', 'ts': self._ts(start),
+                       'dur': (end - start) / 1000, 'pid': self.pid, 'tid': threading.get_ident(),
+                       'args': dict(args, thread_cpu_ms=round((time.thread_time() - cpu) * 1000, 3))})
+
+    def _add(self, event: dict):
+        with self.lock:
+            self.events.append(event)
+
+    # --- watched calls ------------------------------------------------
+
+    def _watch(self):
+        for module_name, attribute, label in WATCHED_CALLS:
+            try:
+                owner = importlib.import_module(module_name)
+            except ImportError:
+                continue
+            *path, name = attribute.split('.')
+            for part in path:
+                owner = getattr(owner, part)
+            original = getattr(owner, name, None)
+            if original is None:
+                continue
+            setattr(owner, name, self._wrap(label, original))
+            self.patched.append((owner, name, original))
+
+    def _wrap(self, label: str, func):
+        @functools.wraps(func)
+        def watched(*args, **kwargs):
+            # Only the outermost watched call is timed (read_excel runs re.sub, too)
+            if getattr(self.local, 'busy', False):
+                return func(*args, **kwargs)
+            self.local.busy = True
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                end = time.perf_counter_ns()
+                self.local.busy = False
+                seconds = (end - start) / 1e9
+                with self.lock:
+                    total = self.calls.setdefault(label, {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+                    total['count'] += 1
+                    total['seconds'] += seconds
+                    total['max_seconds'] = max(total['max_seconds'], seconds)
+                if seconds * 1000 >= CALL_EVENT_MS:
+                    self._add({'name': label, 'cat': 'call', 'ph': 'X', 'ts': self._ts(start),
+                               'dur': (end - start) / 1000, 'pid': self.pid, 'tid': threading.get_ident()})
+        return watched
+
+    def unwatch(self):
+        for owner, name, original in reversed(self.patched):
+            setattr(owner, name, original)
+        self.patched = []
+
+    # --- output -------------------------------------------------------
+
+    def trace(self) -> dict:
+        calls = {label: dict(total, seconds=round(total['seconds'], 6), max_seconds=round(total['max_seconds'], 6))
+                 for label, total in sorted(self.calls.items(), key=lambda item: -item[1]['seconds'])}
+        return {
+            'traceEvents': [{'name': 'process_name', 'ph': 'M', 'pid': self.pid, 'args': {'name': self.name}}]
+                           + sorted(self.events, key=lambda e: e['ts']),
+            'displayTimeUnit': 'ms',
+            'otherData': {
+                'name': self.name,
+                'created': self.created,
+                'argv': sys.argv,
+                'python': sys.version.split()[0],
+                'rss_peak_scope': self.rss_scope,
+                'calls': calls,
+            },
+        }
+
+    def finish(self, path: Optional[str] = None) -> dict:
+        """Restore the watched calls, stop tracemalloc if we started it and write the trace"""
+        self.unwatch()
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+        trace = self.trace()
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(trace, f, ensure_ascii=False)
+        return trace
+
+
+def enable(name: str = 'pipeline', cprofile_dir: Optional[str] = None, watch: bool = True) -> StageProfiler:
+    global PROFILER
+    PROFILER = StageProfiler(name, cprofile_dir, watch)
+    return PROFILER
+
+
+def disable(path: Optional[str] = None) -> Optional[dict]:
+    """Stop profiling; writes the trace to `path` and returns it"""
+    global PROFILER
+    if PROFILER is None:
+        return None
+    profiler, PROFILER = PROFILER, None
+    return profiler.finish(path)
+
+
+@contextmanager
+def stage(name: str, **args):
+    """Profile the enclosed block as `name` (extra keyword args go into the event) when profiling is on"""
+    if PROFILER is None:
+        yield
+        return
+    with PROFILER.stage(name, **args):
+        yield
+
+
+def profiled(name: str):
+    """Decorator form of stage()"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def reset_memory_peak():
+    """tracemalloc.reset_peak() that keeps the peaks of the stages around it intact"""
+    if PROFILER is not None:
+        PROFILER.reset_peaks()
+    else:
+        tracemalloc.reset_peak()
+
+
+def stage_totals(trace: dict) -> Dict[str, dict]:
+    """Stage name -> {'count', 'ms', 'cpu_ms', 'rss_peak_mb', 'tracemalloc_peak_mb'}, summed over repeats"""
+    totals: Dict[str, dict] = {}
+    for event in trace.get('traceEvents', []):
+        if event.get('ph') != 'X' or event.get('cat') != 'stage':
+            continue
+        args = event.get('args', {})
+        total = totals.setdefault(event['name'], {'count': 0, 'ms': 0.0, 'cpu_ms': 0.0,
+                                                  'rss_peak_mb': 0.0, 'tracemalloc_peak_mb': 0.0})
+        total['count'] += 1
+        total['ms'] += event['dur'] / 1000
+        total['cpu_ms'] += args.get('cpu_ms', 0.0)
+        total['rss_peak_mb'] = max(total['rss_peak_mb'], args.get('rss_peak_mb', 0.0))
+        total['tracemalloc_peak_mb'] = max(total['tracemalloc_peak_mb'], args.get('tracemalloc_peak_mb', 0.0))
+    return totals
+
+
+def print_summary(trace: dict):
+    events = [e for e in trace['traceEvents'] if e.get('ph') == 'X' and e.get('cat') == 'stage']
+    if not events:
+        return
+    print("\n=== Stage Profile ===")
+    print(f"  {'stage':40s} {'wall':>10s} {'cpu':>10s} {'rss peak':>10s} {'py peak':>10s}")
+    open_ends: List[float] = []
+    for event in sorted(events, key=lambda e: (e['ts'], -e['dur'])):
+        while open_ends and event['ts'] >= open_ends[-1]:
+            open_ends.pop()
+        args = event['args']
+        label = ('  ' * len(open_ends) + event['name'])[:40]
+        rss = f"{args['rss_peak_mb']:8.1f}MB" if 'rss_peak_mb' in args else f"{'':>10s}"
+        print(f"  {label:40s} {event['dur'] / 1e6:9.3f}s {args.get('cpu_ms', 0) / 1000:9.3f}s "
+              f"{rss} {args.get('tracemalloc_peak_mb', 0):8.1f}MB")
+        open_ends.append(event['ts'] + event['dur'])
+
+    calls = trace['otherData'].get('calls', {})
+    if calls:
+        print("  Watched calls:")
+        for label, total in calls.items():
+            print(f"    {label:20s} {total['count']:8,} calls {total['seconds']:9.3f}s "
+                  f"(longest {total['max_seconds']:.3f}s)")
+    if trace['otherData'].get('rss_peak_scope') == 'process':
+        print("  (RSS peaks are process-wide high-water marks on this system)")
+
+
+def compare(old: dict, new: dict):
+    """Per-stage and per-call wall time of two traces, slowest change first"""
+    before, after = stage_totals(old), stage_totals(new)
+    print(f"\n=== {old['otherData'].get('created', '?')} -> {new['otherData'].get('created', '?')} ===")
+    rows = []
+    for name in set(before) | set(after):
+        a, b = before.get(name, {}).get('ms'), after.get(name, {}).get('ms')
+        rows.append((name, a, b))
+    rows.sort(key=lambda row: -abs((row[2] or 0) - (row[1] or 0)))
+    for name, a, b in rows:
+        ratio = f"x{b / a:5.2f}" if a and b else '     -'
+        print(f"  {name[:40]:40s} {'-' if a is None else f'{a:10.1f}ms':>12s} -> "
+              f"{'-' if b is None else f'{b:10.1f}ms':>12s}  {ratio}")
+
+    old_calls, new_calls = old['otherData'].get('calls', {}), new['otherData'].get('calls', {})
+    for label in sorted(set(old_calls) | set(new_calls)):
+        a = old_calls.get(label, {}).get('seconds', 0.0)
+        b = new_calls.get(label, {}).get('seconds', 0.0)
+        print(f"  call {label:35s} {a * 1000:10.1f}ms -> {b * 1000:10.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two stage profile traces')
+    parser.add_argument('old')
+    parser.add_argument('new', nargs='?', help='omit to summarize OLD only')
+    args = parser.parse_args()
+
+    traces = []
+    for path in filter(None, (args.old, args.new)):
+        with open(path, 'r', encoding='utf-8') as f:
+            traces.append(json.load(f))
+    if len(traces) == 1:
+        print_summary(traces[0])
+    else:
+        compare(*traces)
+
+
+if __name__ == "__main__":
+    main()
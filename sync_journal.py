@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Write-ahead journal for Airtable write runs
+
+Before the first request of a run, every batch it will send is appended
+to sync_journal.jsonl as a 'plan' entry (record ids, new values and the
+old values they replace; for creates, the new records) and fsynced. Each batch Airtable accepts gets an
+'ack', a failed one a 'fail', and a finished run a 'done'. If the process
+dies midway, the next run replays only the planned batches that were never
+acknowledged. A batch Airtable rejected outright (a 4xx such as 422) is
+failed as permanent: sending it again would fail again, so it is not
+replayed and does not keep its run unfinished. The same file is the audit
+log of what changed:
+
+    python sync_journal.py status
+    python sync_journal.py audit [RUN_ID]
+"""
+
+import json
+import os
+import sys
+import time
+import uuid
+from typing import Dict, List, Optional
+
+JOURNAL_FILE = 'sync_journal.jsonl'
+
+
+class SyncJournal:
+    """Append-only JSON Lines journal; every entry is fsynced before returning"""
+
+    def __init__(self, path: str = JOURNAL_FILE):
+        self.path = path
+
+    def _append(self, entries: List[dict]):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def entries(self) -> List[dict]:
+        if not os.path.exists(self.path):
+            return []
+        result = []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    result.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn last line from a crash mid-write; everything before it is intact
+                    break
+        return result
+
+    def plan(self, table: str, batches: List[List[dict]], source: str = '',
+             method: str = 'PATCH', key_field: Optional[str] = None) -> str:
+        """
+        Record every batch of a new run; returns the run id. POST runs name
+        the key field that identifies a created record, so a replay can
+        skip records whose create landed without an ack.
+        """
+        run = time.strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:6]
+        now = time.time()
+        entries = [{'type': 'run', 'run': run, 'table': table, 'source': source,
+                    'method': method, 'key_field': key_field, 'batches': len(batches), 'ts': now}]
+        entries += [{'type': 'plan', 'run': run, 'batch': i, 'records': batch, 'ts': now}
+                    for i, batch in enumerate(batches)]
+        self._append(entries)
+        return run
+
+    def ack(self, run: str, batch: int, updated: int):
+        self._append([{'type': 'ack', 'run': run, 'batch': batch, 'updated': updated, 'ts': time.time()}])
+
+    def fail(self, run: str, batch: int, error: str, permanent: bool = False):
+        entry = {'type': 'fail', 'run': run, 'batch': batch, 'error': error, 'ts': time.time()}
+        if permanent:
+            entry['permanent'] = True
+        self._append([entry])
+
+    def done(self, run: str, abandoned: bool = False):
+        entry = {'type': 'done', 'run': run, 'ts': time.time()}
+        if abandoned:
+            entry['abandoned'] = True
+        self._append([entry])
+
+    def runs(self) -> Dict[str, dict]:
+        """
+        run id -> {'table', 'source', 'method', 'ts', 'plans': {batch: records},
+        'acked': set, 'failed': {batch: error}, 'rejected': set, 'done'};
+        'rejected' are the failed batches that failed permanently
+        """
+        runs: Dict[str, dict] = {}
+        for entry in self.entries():
+            run = runs.get(entry['run'])
+            if entry['type'] == 'run':
+                runs[entry['run']] = {'table': entry['table'], 'source': entry.get('source', ''),
+                                      'method': entry.get('method', 'PATCH'),
+                                      'key_field': entry.get('key_field'),
+                                      'ts': entry['ts'], 'batches': entry['batches'],
+                                      'plans': {}, 'acked': set(), 'failed': {}, 'rejected': set(),
+                                      'done': False, 'abandoned': False}
+            elif run is None:
+                continue
+            elif entry['type'] == 'plan':
+                run['plans'][entry['batch']] = entry['records']
+            elif entry['type'] == 'ack':
+                run['acked'].add(entry['batch'])
+                run['failed'].pop(entry['batch'], None)
+                run['rejected'].discard(entry['batch'])
+            elif entry['type'] == 'fail':
+                run['failed'][entry['batch']] = entry['error']
+                if entry.get('permanent'):
+                    run['rejected'].add(entry['batch'])
+            elif entry['type'] == 'done':
+                run['done'] = True
+                run['abandoned'] = entry.get('abandoned', False)
+        return runs
+
+    def unfinished(self) -> Optional[tuple]:
+        """(run id, run) of the latest run with batches still to send, if any"""
+        for run_id, run in reversed(list(self.runs().items())):
+            if not run['done'] and self.pending_batches(run):
+                return run_id, run
+        return None
+
+    def settled(self, run_id: str) -> bool:
+        """True once every batch of the run is acknowledged or permanently rejected"""
+        run = self.runs().get(run_id)
+        return run is not None and not self.pending_batches(run)
+
+    def pending_batches(self, run: dict) -> Dict[int, List[dict]]:
+        """Batches neither acknowledged nor permanently rejected"""
+        return {i: records for i, records in sorted(run['plans'].items())
+                if i not in run['acked'] and i not in run['rejected']}
+
+
+def print_status(journal: SyncJournal):
+    runs = journal.runs()
+    if not runs:
+        print(f"No runs in {journal.path}")
+        return
+    for run_id, run in runs.items():
+        pending = len(journal.pending_batches(run))
+        if run['abandoned']:
+            state = f"abandoned with {pending} batch(es) unsent"
+        else:
+            state = 'done' if run['done'] or not pending else f"{pending} batch(es) pending"
+        if run['rejected']:
+            state += f", {len(run['rejected'])} rejected"
+        print(f"  {run_id}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(run['ts']))}  "
+              f"{run['method']} {run['table']}  {len(run['acked'])}/{len(run['plans'])} acked  {state}")
+
+
+def print_audit(journal: SyncJournal, run_id: Optional[str] = None):
+    """Old -> new values for every acknowledged record (created records show old as None)"""
+    for rid, run in journal.runs().items():
+        if run_id and rid != run_id:
+            continue
+        print(f"\n=== {rid} ({run['table']}{', ' + run['source'] if run['source'] else ''}) ===")
+        for batch in sorted(run['acked']):
+            for record in run['plans'][batch]:
+                label = record.get('label') or record.get('id', '')
+                for field, value in record['fields'].items():
+                    print(f"  {label}  {field}: {record.get('old', {}).get(field)} → {value}")
+        for batch, error in run['failed'].items():
+            kind = 'rejected' if batch in run['rejected'] else 'failed'
+            print(f"  ✗ batch {batch} {kind}: {error}")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'status'
+    journal = SyncJournal()
+    if command == 'status':
+        print_status(journal)
+    elif command == 'audit':
+        print_audit(journal, sys.argv[2] if len(sys.argv) > 2 else None)
+    else:
+        print("Usage: python sync_journal.py [status|audit [RUN_ID]]")
+        sys.exit(1)
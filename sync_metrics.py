@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Run metrics for the Airtable sync scripts
+
+An AirtableClient given a SyncMetrics records, for every request, the
+time spent waiting on the token bucket, the time Airtable took to answer,
+the status code, retries and bytes sent and received. Scripts add the
+number of records they wrote. At the end of a run the totals are written
+as a JSON report and, optionally, as Prometheus text, e.g. for a
+node_exporter textfile collector.
+
+The report splits wall time into our own pacing (limiter_wait_seconds)
+and the API's response time (request latency), so a slow sync shows which
+of the two it was.
+"""
+
+import json
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class SyncMetrics:
+    """Thread-safe counters and latency samples for one sync run"""
+
+    def __init__(self, name: str = 'sync'):
+        self.name = name
+        self.started = time.time()
+        self.finished: Optional[float] = None
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)  # method -> seconds
+        self.statuses: Dict[str, int] = defaultdict(int)             # "GET 200" -> count
+        self.retries: Dict[str, int] = defaultdict(int)              # status or 'connection' -> count
+        self.limiter_waits: List[float] = []
+        self.rate_limit_pause = 0.0
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.records: Dict[str, int] = defaultdict(int)              # 'fetched', 'updated', ... -> count
+
+    def observe_wait(self, seconds: float):
+        with self.lock:
+            self.limiter_waits.append(seconds)
+
+    def observe_request(self, method: str, status: Optional[int], seconds: float,
+                        bytes_out: int = 0, bytes_in: int = 0):
+        with self.lock:
+            self.latencies[method].append(seconds)
+            self.statuses[f"{method} {status if status is not None else 'error'}"] += 1
+            self.bytes_out += bytes_out
+            self.bytes_in += bytes_in
+
+    def observe_retry(self, reason, pause: float = 0.0):
+        """reason: the HTTP status that caused the retry, or 'connection'"""
+        with self.lock:
+            self.retries[str(reason)] += 1
+            if reason == 429:
+                self.rate_limit_pause += pause
+
+    def add_records(self, kind: str, count: int):
+        with self.lock:
+            self.records[kind] += count
+
+    def finish(self):
+        self.finished = time.time()
+
+    def report(self) -> dict:
+        with self.lock:
+            elapsed = (self.finished or time.time()) - self.started
+            all_latencies = [s for samples in self.latencies.values() for s in samples]
+            request_time = sum(all_latencies)
+            waited = sum(self.limiter_waits)
+
+            latency = {}
+            for method, samples in sorted(self.latencies.items()):
+                latency[method] = {
+                    'count': len(samples),
+                    'mean': round(sum(samples) / len(samples), 4),
+                    'p50': round(percentile(samples, 50), 4),
+                    'p95': round(percentile(samples, 95), 4),
+                    'max': round(max(samples), 4),
+                    'histogram': {str(bound): sum(1 for s in samples if s <= bound) for bound in LATENCY_BUCKETS},
+                }
+
+            return {
+                'name': self.name,
+                'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+                'elapsed_seconds': round(elapsed, 3),
+                'requests': len(all_latencies),
+                'statuses': dict(self.statuses),
+                'retries': dict(self.retries),
+                'latency_seconds': latency,
+                'request_seconds_total': round(request_time, 3),
+                'limiter_wait_seconds': {
+                    'total': round(waited, 3),
+                    'max': round(max(self.limiter_waits), 4) if self.limiter_waits else 0.0,
+                    'rate_limit_pause': round(self.rate_limit_pause, 3),
+                },
+                # Both are summed over worker threads, so they compare with each other, not with elapsed
+                'bottleneck': 'rate limiter' if waited > request_time else 'api latency',
+                'bytes_out': self.bytes_out,
+                'bytes_in': self.bytes_in,
+                'records': dict(self.records),
+                'records_per_second': {kind: round(count / elapsed, 2) if elapsed else None
+                                       for kind, count in self.records.items()},
+            }
+
+    def write_json(self, path: str) -> dict:
+        report = self.report()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        return report
+
+    def prometheus_text(self) -> str:
+        """Exposition-format dump; histograms are cumulative as Prometheus expects"""
+        prefix = 'airtable_sync'
+        job = f'script="{self.name}"'
+        lines = [f'# TYPE {prefix}_request_duration_seconds histogram']
+        with self.lock:
+            for method, samples in sorted(self.latencies.items()):
+                labels = f'{job},method="{method}"'
+                for bound in LATENCY_BUCKETS:
+                    lines.append(f'{prefix}_request_duration_seconds_bucket{{{labels},le="{bound}"}} '
+                                 f'{sum(1 for s in samples if s <= bound)}')
+                lines.append(f'{prefix}_request_duration_seconds_bucket{{{labels},le="+Inf"}} {len(samples)}')
+                lines.append(f'{prefix}_request_duration_seconds_sum{{{labels}}} {sum(samples):.6f}')
+                lines.append(f'{prefix}_request_duration_seconds_count{{{labels}}} {len(samples)}')
+
+            lines.append(f'# TYPE {prefix}_responses_total counter')
+            for key, count in sorted(self.statuses.items()):
+                method, status = key.split(' ', 1)
+                lines.append(f'{prefix}_responses_total{{{job},method="{method}",status="{status}"}} {count}')
+
+            lines.append(f'# TYPE {prefix}_retries_total counter')
+            for reason, count in sorted(self.retries.items()):
+                lines.append(f'{prefix}_retries_total{{{job},reason="{reason}"}} {count}')
+
+            lines.append(f'# TYPE {prefix}_limiter_wait_seconds_total counter')
+            lines.append(f'{prefix}_limiter_wait_seconds_total{{{job}}} {sum(self.limiter_waits):.6f}')
+            lines.append(f'# TYPE {prefix}_rate_limit_pause_seconds_total counter')
+            lines.append(f'{prefix}_rate_limit_pause_seconds_total{{{job}}} {self.rate_limit_pause:.6f}')
+
+            lines.append(f'# TYPE {prefix}_bytes_total counter')
+            lines.append(f'{prefix}_bytes_total{{{job},direction="out"}} {self.bytes_out}')
+            lines.append(f'{prefix}_bytes_total{{{job},direction="in"}} {self.bytes_in}')
+
+            lines.append(f'# TYPE {prefix}_records_total counter')
+            for kind, count in sorted(self.records.items()):
+                lines.append(f'{prefix}_records_total{{{job},kind="{kind}"}} {count}')
+
+        elapsed = (self.finished or time.time()) - self.started
+        lines.append(f'# TYPE {prefix}_run_duration_seconds gauge')
+        lines.append(f'{prefix}_run_duration_seconds{{{job}}} {elapsed:.3f}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+
+
+def print_report(report: dict):
+    """Short human summary of report()"""
+    print(f"\nSync metrics ({report['elapsed_seconds']:.1f}s, {report['requests']} requests):")
+    for method, stats in report['latency_seconds'].items():
+        print(f"  {method}: {stats['count']} requests, p50 {stats['p50'] * 1000:.0f} ms, "
+              f"p95 {stats['p95'] * 1000:.0f} ms, max {stats['max'] * 1000:.0f} ms")
+    waits = report['limiter_wait_seconds']
+    print(f"  Summed over workers: {report['request_seconds_total']:.1f}s in Airtable, "
+          f"{waits['total']:.1f}s waiting on our rate limiter "
+          f"(429 pauses: {waits['rate_limit_pause']:.1f}s) -> bottleneck: {report['bottleneck']}")
+    if report['retries']:
+        print(f"  Retries: {', '.join(f'{k}: {v}' for k, v in sorted(report['retries'].items()))}")
+    print(f"  Bytes out/in: {report['bytes_out']:,} / {report['bytes_in']:,}")
+    for kind, rate in report['records_per_second'].items():
+        print(f"  {kind}: {report['records'][kind]} records ({rate} records/s)")
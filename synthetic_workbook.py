@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic survey workbooks shaped like
+makeuptest_AP_Bueatylink_20250927.xlsx, for scaling tests
+
+Same 41 headers in the same order (Korean 밝기판정/톤 included). Each
+column's values are resampled from the real participant data, so value
+mix and blank rates match. Multi-select answers are recombined from the
+real options, with the same number of picks per cell. A-IDs, P-IDs and
+names are synthetic. Images are anchored in the columns the extract
+scripts read:
+
+    V   skin brightness reference (7 shared pictures)
+    AB  face photo (unique per row)
+    AM  hair type reference (10 shared pictures)
+    AO  eye color reference (8 shared pictures)
+
+Face photos start from a small pool of backgrounds. Each row's is overlaid
+with an 8x8 grid of light and dark blocks spelling a number unique to the
+row, so every face has its own average hash (what identify_reference_images.py
+groups pictures by), not just different bytes. They are encoded one at a
+time while the package is written.
+
+openpyxl writes the cells. It holds every image in memory until save,
+which does not fit at 100k rows, so the drawing, its relationships and
+the media are streamed into the package afterwards. The anchors are
+oneCellAnchors with relative ../media targets, as Excel wrote them in
+the real sheet.
+
+    python synthetic_workbook.py --rows 10000 [--out synthetic_10000.xlsx] [--face-size 1224x690] [--no-images]
+"""
+
+import argparse
+import io
+import os
+import random
+import time
+import zipfile
+from typing import Dict, List, Optional, Tuple, Union
+
+from openpyxl import Workbook
+from PIL import Image, ImageFilter
+
+from analysis_snapshot import load_analysis
+from multiselect import find_multiselect_columns
+from search_index import NAME_COLUMN
+
+# 0-based column -> image type, as in extract_images_by_row.py
+IMAGE_COLUMNS = {21: 'skin_brightness', 27: 'face_photo', 38: 'hair_type', 40: 'eye_color'}
+# Distinct reference pictures per image column (the survey's answer options)
+REFERENCE_OPTIONS = {'skin_brightness': 7, 'hair_type': 10, 'eye_color': 8}
+
+# The real photos are 1224x690; extract_excel_images_final.py only takes
+# pictures over 100,000 pixels for face photos
+DEFAULT_FACE_SIZE = (480, 270)
+DEFAULT_REFERENCE_SIZE = (120, 120)
+FACE_BACKGROUNDS = 16
+# How much of a face is its block pattern; enough to decide every 8x8 cell's average
+FACE_PATTERN_ALPHA = 0.5
+EMU_PER_PIXEL = 9525
+# Part of cached workbook names (benchmark_pipeline.py); bump when the output changes
+GENERATOR_VERSION = 2
+
+SHEET_PART = 'xl/worksheets/sheet1.xml'
+DRAWING_PART = 'xl/drawings/drawing1.xml'
+RELATIONSHIPS_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+OFFICE_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+DRAWING_HEADER = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                  '<xdr:wsDr xmlns:xdr="http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing" '
+                  'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main">')
+ANCHOR = ('<xdr:oneCellAnchor><xdr:from><xdr:col>{col}</xdr:col><xdr:colOff>0</xdr:colOff>'
+          '<xdr:row>{row}</xdr:row><xdr:rowOff>0</xdr:rowOff></xdr:from><xdr:ext cx="{cx}" cy="{cy}"/>'
+          '<xdr:pic><xdr:nvPicPr><xdr:cNvPr id="{id}" name="Image {n}" descr="Picture"/><xdr:cNvPicPr/></xdr:nvPicPr>'
+          f'<xdr:blipFill><a:blip xmlns:r="{OFFICE_REL_NS}" r:embed="rId{{n}}"/><a:stretch><a:fillRect/></a:stretch>'
+          '</xdr:blipFill><xdr:spPr><a:prstGeom prst="rect"><a:avLst/></a:prstGeom></xdr:spPr></xdr:pic>'
+          '<xdr:clientData/></xdr:oneCellAnchor>')
+
+
+def parse_size(text: str) -> Tuple[int, int]:
+    """'320x180' -> (320, 180)"""
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def _picture(size: Tuple[int, int], seed: int) -> Image.Image:
+    """A gradient with some noise: compresses roughly like a photo, unlike a flat color"""
+    rng = random.Random(seed)
+    tint = Image.new('RGB', size, tuple(rng.randrange(60, 230) for _ in range(3)))
+    gradient = Image.linear_gradient('L').resize(size).rotate(rng.randrange(360))
+    noise = Image.effect_noise(size, 8 + seed % 8).filter(ImageFilter.GaussianBlur(1))
+    return Image.blend(tint, Image.merge('RGB', (noise, gradient, noise)), 0.3)
+
+
+def _png(size: Tuple[int, int], seed: int) -> bytes:
+    out = io.BytesIO()
+    _picture(size, seed).save(out, 'PNG')
+    return out.getvalue()
+
+
+def _face_code(index: int, seed: int) -> int:
+    """64-bit pattern for row `index`; multiplying by an odd constant is one-to-one mod 2**64"""
+    return ((index + 1) * 0x9E3779B97F4A7C15 + seed) & 0xFFFFFFFFFFFFFFFF
+
+
+def _face_png(background: Image.Image, code: int) -> bytes:
+    """`background` under 8x8 light/dark blocks spelling `code`, one bit per average_hash cell"""
+    cells = bytes(200 if code >> bit & 1 else 55 for bit in range(64))
+    pattern = Image.frombytes('L', (8, 8), cells).resize(background.size, Image.NEAREST).convert('RGB')
+    out = io.BytesIO()
+    # Fastest deflate level: this runs once per row
+    Image.blend(background, pattern, FACE_PATTERN_ALPHA).save(out, 'PNG', compress_level=1)
+    return out.getvalue()
+
+
+def _split_options(value) -> List[str]:
+    return [o.strip() for o in str(value).replace('\n', ',').split(',') if o.strip()]
+
+
+class ValueSampler:
+    """Draws cell values per column from the real participant records"""
+
+    def __init__(self, columns: List[str], participants: List[dict], rng: random.Random):
+        self.rng = rng
+        self.columns = columns
+        self.pools = {col: [p.get(col) for p in participants] for col in columns}
+        self.multiselect = set(find_multiselect_columns(columns))
+        self.options = {}
+        for col in self.multiselect:
+            self.options[col] = [o for v in self.pools[col] if isinstance(v, str) for o in _split_options(v)]
+        tokens = [t for p in participants for t in str(p.get(NAME_COLUMN) or '').split()]
+        self.name_tokens = tokens or ['PARTICIPANT']
+
+    def _multiselect(self, col: str) -> Optional[str]:
+        answer = self.rng.choice(self.pools[col])
+        if not isinstance(answer, str) or not self.options[col]:
+            return answer
+        picks = []
+        for _ in range(len(_split_options(answer))):
+            option = self.rng.choice(self.options[col])
+            if option not in picks:
+                picks.append(option)
+        return '\n'.join(picks)
+
+    def row(self, index: int, pid: int) -> list:
+        values = []
+        for col in self.columns:
+            if col == 'A-ID':
+                values.append(f'A{101 + index}')
+            elif col == 'P-ID':
+                values.append(f'P{pid:03d}')
+            elif col == NAME_COLUMN:
+                values.append(' '.join(self.rng.choice(self.name_tokens) for _ in range(self.rng.choice((2, 2, 3)))))
+            elif col in self.multiselect:
+                values.append(self._multiselect(col))
+            else:
+                values.append(self.rng.choice(self.pools[col]))
+        return values
+
+
+def _copy_sheet(source, target):
+    """Copy the worksheet part, pointing it at the drawing just before </worksheet>"""
+    tail = b''
+    for chunk in iter(lambda: source.read(1 << 20), b''):
+        data = tail + chunk
+        tail = data[-64:]
+        target.write(data[:-64])
+    drawing = f'<drawing xmlns:r="{OFFICE_REL_NS}" r:id="rId1"/></worksheet>'.encode()
+    target.write(tail.replace(b'</worksheet>', drawing))
+
+
+def _add_images(cells_path: str, path: str, placements: List[Tuple[int, int, Union[bytes, int]]],
+                sizes: Dict[int, Tuple[int, int]], backgrounds: List[Image.Image]) -> int:
+    """
+    Copy the openpyxl package at `cells_path` to `path` with the pictures
+    added: one media file per placement (row, col, picture), numbered
+    image1.png.. in placement order. A picture is PNG bytes, or a face
+    code (_face_code) rendered on one of `backgrounds`. Returns the bytes
+    of media written.
+    """
+    with zipfile.ZipFile(cells_path) as source, zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as target:
+        for item in source.infolist():
+            with source.open(item) as f, target.open(item.filename, 'w') as out:
+                if item.filename == SHEET_PART:
+                    _copy_sheet(f, out)
+                elif item.filename == '[Content_Types].xml':
+                    out.write(f.read().replace(b'</Types>', (
+                        '<Default Extension="png" ContentType="image/png"/>'
+                        f'<Override PartName="/{DRAWING_PART}" '
+                        'ContentType="application/vnd.openxmlformats-officedocument.drawing+xml"/></Types>').encode()))
+                else:
+                    out.write(f.read())
+
+        target.writestr('xl/worksheets/_rels/sheet1.xml.rels', (
+            f'<Relationships xmlns="{RELATIONSHIPS_NS}"><Relationship Id="rId1" '
+            f'Type="{OFFICE_REL_NS}/drawing" Target="../drawings/drawing1.xml"/></Relationships>'))
+
+        # PNGs are already compressed; stored, not deflated
+        image_bytes = 0
+        for n, (row, col, picture) in enumerate(placements, 1):
+            if isinstance(picture, int):
+                picture = _face_png(backgrounds[picture % len(backgrounds)], picture)
+            target.writestr(zipfile.ZipInfo(f'xl/media/image{n}.png'), picture, zipfile.ZIP_STORED)
+            image_bytes += len(picture)
+
+        with target.open(DRAWING_PART, 'w') as out:
+            out.write(DRAWING_HEADER.encode())
+            for n, (row, col, picture) in enumerate(placements, 1):
+                width, height = sizes[col]
+                out.write(ANCHOR.format(col=col, row=row - 1, cx=width * EMU_PER_PIXEL, cy=height * EMU_PER_PIXEL,
+                                        id=n + 1, n=n).encode())
+            out.write(b'</xdr:wsDr>')
+
+        with target.open('xl/drawings/_rels/drawing1.xml.rels', 'w') as out:
+            out.write(f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                      f'<Relationships xmlns="{RELATIONSHIPS_NS}">'.encode())
+            for n in range(1, len(placements) + 1):
+                out.write(f'<Relationship Id="rId{n}" Type="{OFFICE_REL_NS}/image" '
+                          f'Target="../media/image{n}.png"/>'.encode())
+            out.write(b'</Relationships>')
+    return image_bytes
+
+
+def generate_workbook(path: str, rows: int, face_size: Tuple[int, int] = DEFAULT_FACE_SIZE,
+                      reference_size: Tuple[int, int] = DEFAULT_REFERENCE_SIZE,
+                      images: bool = True, seed: int = 0) -> Dict[str, int]:
+    """Write a `rows`-participant workbook to `path`; returns {'rows', 'images', 'image_bytes'}"""
+    rng = random.Random(seed)
+    analysis = load_analysis()
+    columns = analysis['columns']
+    sampler = ValueSampler(columns, analysis['participant_data'], rng)
+    # P-IDs are unique like the real sheet's, but not in row order
+    pids = list(range(1, rows + 1))
+    rng.shuffle(pids)
+
+    backgrounds = [_picture(face_size, seed * 1000 + i) for i in range(FACE_BACKGROUNDS)] if images else []
+    references = {kind: [_png(reference_size, seed * 1000 + 100 * n + i) for i in range(count)]
+                  for n, (kind, count) in enumerate(REFERENCE_OPTIONS.items(), 1)} if images else {}
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Sheet1')
+    ws.append(columns)
+    # (1-based row, 0-based col, png or face code); faces are rendered at write time, so this stays small
+    placements = []
+
+    for index in range(rows):
+        ws.append(sampler.row(index, pids[index]))
+        if not images:
+            continue
+        for col, kind in IMAGE_COLUMNS.items():
+            if kind == 'face_photo':
+                placements.append((index + 2, col, _face_code(index, seed)))
+            else:
+                placements.append((index + 2, col, rng.choice(references[kind])))
+
+    # Written under temporary names so an interrupted run never leaves a truncated workbook at `path`
+    partial = f'{path}.partial'
+    if not placements:
+        wb.save(partial)
+        os.replace(partial, path)
+        return {'rows': rows, 'images': 0, 'image_bytes': 0}
+
+    cells_path = f'{path}.cells'
+    wb.save(cells_path)
+    try:
+        sizes = {col: face_size if kind == 'face_photo' else reference_size for col, kind in IMAGE_COLUMNS.items()}
+        image_bytes = _add_images(cells_path, partial, placements, sizes, backgrounds)
+    finally:
+        os.remove(cells_path)
+    os.replace(partial, path)
+    return {'rows': rows, 'images': len(placements), 'image_bytes': image_bytes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic survey workbook')
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--out', help='output path (default: synthetic_<rows>.xlsx)')
+    parser.add_argument('--face-size', type=parse_size, default=DEFAULT_FACE_SIZE, help='WxH, e.g. 1224x690')
+    parser.add_argument('--reference-size', type=parse_size, default=DEFAULT_REFERENCE_SIZE, help='WxH')
+    parser.add_argument('--no-images', action='store_true')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    out = args.out or f'synthetic_{args.rows}.xlsx'
+    started = time.time()
+    stats = generate_workbook(out, args.rows, args.face_size, args.reference_size, not args.no_images, args.seed)
+    print(f"✓ Wrote {out}: {stats['rows']:,} rows, {stats['images']:,} images "
+          f"({stats['image_bytes'] / 1e6:.1f} MB) in {time.time() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,9 @@ import pandas as pd
 import json
 from pathlib import Path
 
+from analysis_snapshot import load_analysis
+from json_output import dump_json
+
 # Load Excel data
 df = pd.read_excel('makeuptest_AP_Bueatylink_20250927.xlsx')
 print(f"Loaded {len(df)} participants from Excel")
@@ -75,8 +78,7 @@ print(f"Hair references: {image_stats['hair']}")
 print(f"Eye color references: {image_stats['eye_color']}")
 
 # Save complete image mapping
-with open('complete_participant_image_mapping.json', 'w', encoding='utf-8') as f:
-    json.dump(image_mapping, f, ensure_ascii=False, indent=2)
+dump_json(image_mapping, 'complete_participant_image_mapping.json')
 
 print(f"\nSaved mappings for {len(image_mapping)} participants")
 
@@ -85,8 +87,7 @@ with open('makeup-test-dashboard.html', 'r', encoding='utf-8') as f:
     html_content = f.read()
 
 # Load analysis data
-with open('excel_analysis.json', 'r', encoding='utf-8') as f:
-    analysis_data = json.load(f)
+analysis_data = load_analysis()
 
 # Create participant data
 participant_data = []
@@ -7,13 +7,14 @@ import json
 import pandas as pd
 from pathlib import Path
 
+from analysis_snapshot import load_analysis
+
 # Load Excel data
 df = pd.read_excel('makeuptest_AP_Bueatylink_20250927.xlsx')
 print(f"Loaded {len(df)} participants")
 
 # Load analysis data
-with open('excel_analysis.json', 'r', encoding='utf-8') as f:
-    analysis_data = json.load(f)
+analysis_data = load_analysis()
 
 # Get all available images from organized folder
 organized_images = Path('images_organized_by_aid')
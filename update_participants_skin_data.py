@@ -4,11 +4,17 @@ Update Airtable Participants table with skin color and tone data from Excel file
 """
 
 import pandas as pd
-import requests
 import json
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 import time
 
+from airtable_client import MAX_FORMULA_LENGTH, AirtableClient, AirtableError, formula_or, formula_value
+from airtable_mirror import AirtableMirror
+from excel_sync import (KEY_FIELDS, compute_creates, compute_diffs, find_column, normalize_pid, pid_text,
+                        print_diff_summary, replay_pending, sync_fields, write_creates, write_diffs, write_report_csv)
+from sync_journal import SyncJournal
+from sync_metrics import SyncMetrics, print_report
+
 # Configuration - loaded from env-config.js
 AIRTABLE_API_KEY = ""  # Will be set from command line or environment
 AIRTABLE_BASE_ID = "appZcPs57spwdoKQH"
@@ -17,6 +23,9 @@ PARTICIPANTS_TABLE_ID = "tblxMzwX1wWJKIOhY"
 # Excel file path
 EXCEL_FILE = "/Users/owlers_dylan/Downloads/makeuptest_AP_Bueatylink_20250927.xlsx"
 
+# JSON run report (request timing, limiter waits, retries, throughput) written after every run
+SYNC_REPORT_FILE = "sync_report.json"
+
 # Mapping for skin color values
 SKIN_COLOR_MAP = {
     "1": "1(F)",
@@ -50,6 +59,30 @@ SKIN_TONE_MAP = {
     "Olive": "Olive"
 }
 
+# Excel column (substrings to look for) -> Airtable field, with its value transform
+SKIN_SYNC_MAPPING = [
+    {'column': ['밝기', '판정'], 'field': 'skinColor', 'transform': SKIN_COLOR_MAP},
+    {'column': ['톤'], 'field': 'skinTone', 'transform': SKIN_TONE_MAP},
+]
+
+# The only Participants fields this script reads
+SYNC_FIELDS = sync_fields(SKIN_SYNC_MAPPING)
+
+
+def pid_number(pid: str) -> Optional[int]:
+    digits = ''.join(ch for ch in pid if ch.isdigit())
+    return int(digits) if digits else None
+
+
+# Extra fields for participants created with --upsert (skin fields come from SKIN_SYNC_MAPPING)
+NEW_PARTICIPANT_MAPPING = [
+    {'column': ['P-ID', 'PID', 'P_ID'], 'field': 'ID', 'transform': pid_number, 'optional': True},
+    {'column': ['A-ID'], 'field': 'A-ID', 'optional': True},
+    {'column': ['full name', '이름'], 'field': 'name', 'optional': True},
+    {'column': 'setDate', 'field': 'setDate', 'type': 'date', 'optional': True},
+    {'column': 'setTime', 'field': 'setTime', 'optional': True},
+]
+
 
 def read_excel_data(file_path: str) -> pd.DataFrame:
     """Read Excel file and return DataFrame with relevant columns"""
@@ -70,223 +103,227 @@ def read_excel_data(file_path: str) -> pd.DataFrame:
     return df
 
 
-def get_airtable_participants(api_key: str) -> Dict[str, dict]:
-    """Fetch all participants from Airtable"""
-    print("\nFetching participants from Airtable...")
-
-    url = f"https://api.airtable.com/v0/{AIRTABLE_BASE_ID}/{PARTICIPANTS_TABLE_ID}"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-
-    all_records = []
-    offset = None
-    page_count = 0
-
-    while True:
-        params = {}
-        if offset:
-            params['offset'] = offset
-        params['pageSize'] = 100
-
-        response = requests.get(url, headers=headers, params=params)
-
-        if response.status_code != 200:
-            print(f"Error fetching data: {response.status_code}")
-            print(response.text)
-            raise Exception(f"Failed to fetch Airtable data: {response.status_code}")
-
-        data = response.json()
-        page_count += 1
-        print(f"  Page {page_count}: {len(data['records'])} records")
-
-        all_records.extend(data['records'])
-
-        offset = data.get('offset')
-        if not offset:
-            break
+def participant_filter(pids: Iterable[str]) -> Optional[str]:
+    """
+    filterByFormula matching every record that normalize_pid() would join
+    to one of the given P-IDs, whichever way Airtable spells the P-ID
+    ('P007', 'p7', 'P-007', '007') or ID; None = fetch all
+    """
+    keys = list(dict.fromkeys(normalize_pid(pd.Series(list(pids), dtype=object)).dropna()))
+    numbers = [key[1:] for key in keys if key[1:].isdigit()]
+    texts = [key for key in keys if not key[1:].isdigit()]
+    if not numbers and not texts:
+        return None
+
+    terms = []
+    if numbers:
+        # PID_PATTERN on the server: optional P and dash, leading zeros, spaces anywhere
+        pattern = formula_value(f"^ *P? *-? *0*({'|'.join(numbers)}) *$")
+        terms += [f"REGEX_MATCH(UPPER({{{field}}} & ''), {pattern})" for field in KEY_FIELDS]
+    terms += [f"UPPER(TRIM({{P-ID}} & ''))={formula_value(text)}" for text in texts]
+    formula = formula_or(*terms)
+    return formula if len(formula) <= MAX_FORMULA_LENGTH else None
+
+
+def get_airtable_participants(client: AirtableClient, pids: Optional[Iterable[str]] = None,
+                              use_mirror: bool = False, metrics: Optional[SyncMetrics] = None) -> List[dict]:
+    """
+    Fetch participants from Airtable (only those in `pids` when given), or
+    with use_mirror refresh the local SQLite mirror and read from it
+    """
+    try:
+        if use_mirror:
+            print("\nRefreshing the local Airtable mirror...")
+            mirror = AirtableMirror(client)
+            result = mirror.sync('participants')
+            print(f"  {result['mode']} sync: {result['fetched']} changed records")
+            all_records = mirror.records('participants')
+        else:
+            print("\nFetching participants from Airtable...")
+            formula = participant_filter(pids) if pids is not None else None
+            if formula:
+                print(f"  Filtering to the Excel P-IDs ({len(formula):,} character formula)")
+            all_records = client.list_records(
+                PARTICIPANTS_TABLE_ID,
+                fields=SYNC_FIELDS,
+                formula=formula,
+                on_page=lambda page, records: print(f"  Page {page}: {len(records)} records")
+            )
+    except AirtableError as e:
+        print(f"Error fetching data: {e.status}")
+        print(e.body)
+        raise Exception(f"Failed to fetch Airtable data: {e.status}")
 
     print(f"Total participants fetched: {len(all_records)}")
-
-    # Create dictionary keyed by P-ID
-    participants_dict = {}
-    for record in all_records:
-        pid = record['fields'].get('P-ID') or record['fields'].get('ID')
-        if pid:
-            participants_dict[str(pid)] = record
-
-    print(f"Participants with P-ID: {len(participants_dict)}")
-
-    # Show sample of P-IDs
-    sample_pids = list(participants_dict.keys())[:5]
-    print(f"Sample P-IDs: {sample_pids}")
-
-    return participants_dict
-
-
-def update_participant(api_key: str, record_id: str, skin_color: str, skin_tone: str) -> bool:
-    """Update a single participant record in Airtable"""
-    url = f"https://api.airtable.com/v0/{AIRTABLE_BASE_ID}/{PARTICIPANTS_TABLE_ID}/{record_id}"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-
-    data = {
-        "fields": {
-            "skinColor": skin_color,
-            "skinTone": skin_tone
-        }
-    }
-
-    response = requests.patch(url, headers=headers, json=data)
-
-    if response.status_code == 200:
-        return True
-    else:
-        print(f"  Error updating record {record_id}: {response.status_code}")
-        print(f"  Response: {response.text}")
-        return False
+    if metrics:
+        metrics.add_records('fetched', len(all_records))
+
+    # Records are joined on their normalized P-ID in compute_diffs; keep
+    # them all so P-IDs shared by several records show up as ambiguous
+    pids = [record['fields'].get('P-ID') or record['fields'].get('ID') for record in all_records]
+    pids = [str(pid) for pid in pids if pid]
+    print(f"Participants with P-ID: {len(pids)}")
+    print(f"Sample P-IDs: {pids[:5]}")
+
+    return all_records
+
+
+def batch_printer(total: int, names: Dict[str, str]):
+    """on_batch callback; names maps record ids (or P-IDs of new records) to labels"""
+    done = {'records': 0}
+
+    def on_batch(batch, error):
+        done['records'] += len(batch)
+        mark = "✗" if error else "✓"
+        keys = [r.get('id') or r['fields'].get('P-ID', '') for r in batch]
+        print(f"  {mark} {done['records']}/{total}: {', '.join(names.get(key, key) for key in keys)}")
+        if error:
+            print(f"  Error writing batch: {error.status}")
+            print(f"  Response: {error.body}")
+
+    return on_batch
+
+
+def update_participants(client: AirtableClient, diffs: List[dict]) -> tuple:
+    """
+    Write each participant's changed fields.
+
+    Records go out 10 per PATCH with a few requests in flight, paced by the
+    client's token bucket at Airtable's 5 requests/second limit. Every batch
+    is journaled first (sync_journal.jsonl) so an interrupted run can resume.
+    Returns (success_count, error_count).
+    """
+    on_batch = batch_printer(len(diffs), {diff['id']: diff['name'] for diff in diffs})
+
+    started = time.time()
+    success_count, error_count = write_diffs(client, PARTICIPANTS_TABLE_ID, diffs, on_batch=on_batch,
+                                             journal=SyncJournal(), source=EXCEL_FILE)
+    elapsed = time.time() - started
+    if success_count:
+        print(f"  {success_count} records in {elapsed:.1f}s ({success_count / max(elapsed, 1e-9):.1f} records/s)")
+
+    return success_count, error_count
+
+
+def create_participants(client: AirtableClient, creates: List[dict]) -> tuple:
+    """
+    Create participants for Excel rows with no Airtable record, 10 per POST
+    through the same rate-limited, journaled pipeline as the updates.
+    Returns (success_count, error_count).
+    """
+    on_batch = batch_printer(len(creates), {create['pid']: create['name'] for create in creates})
+    return write_creates(client, PARTICIPANTS_TABLE_ID, creates, on_batch=on_batch,
+                         journal=SyncJournal(), source=EXCEL_FILE)
+
+
+def resume_interrupted_run(client: AirtableClient, metrics: Optional[SyncMetrics] = None) -> bool:
+    """Finish the batches interrupted --execute runs never got acknowledged"""
+    journal = SyncJournal()
+    attempted = set()
+    # An upsert leaves two runs (updates, then creates); replay each at most once
+    while True:
+        unfinished = journal.unfinished()
+        if unfinished is None or unfinished[0] in attempted:
+            return bool(attempted)
+        run_id, run = unfinished
+        attempted.add(run_id)
+        pending = journal.pending_batches(run)
+        names = {r.get('id') or r['fields'].get('P-ID', ''): r.get('label', '')
+                 for batch in pending.values() for r in batch}
+        on_batch = batch_printer(sum(len(batch) for batch in pending.values()), names)
+
+        success_count, error_count = replay_pending(client, journal, on_batch)
+        if metrics:
+            metrics.add_records('created' if run['method'] == 'POST' else 'updated', success_count)
+        print(f"\nResume complete:")
+        print(f"  Success: {success_count}")
+        print(f"  Errors: {error_count}")
 
 
-def main(api_key: str, dry_run: bool = True):
-    """Main function to update Airtable participants with Excel data"""
+def main(api_key: str, dry_run: bool = True, use_mirror: bool = False, fresh: bool = False,
+         upsert: bool = False, report_path: Optional[str] = None, metrics: Optional[SyncMetrics] = None):
+    """
+    Main function to update Airtable participants with Excel data.
+    With upsert, Excel P-IDs missing from Airtable are created as participants.
+    Requests are recorded in `metrics` when given.
+    """
+
+    # Fetches, updates, creates and resumes share one client, so one token
+    # bucket paces every request of the run
+    client = AirtableClient(api_key, AIRTABLE_BASE_ID, metrics=metrics)
+
+    journal = SyncJournal()
+    unfinished = journal.unfinished()
+    if unfinished and fresh:
+        while unfinished:
+            print(f"Abandoning unfinished run {unfinished[0]}")
+            journal.done(unfinished[0], abandoned=True)
+            unfinished = journal.unfinished()
+    elif unfinished:
+        if dry_run:
+            print(f"Run {unfinished[0]} has {len(journal.pending_batches(unfinished[1]))} unacknowledged "
+                  f"batch(es); --execute resumes it, --fresh discards it")
+        else:
+            resume_interrupted_run(client, metrics)
+            unfinished = journal.unfinished()
+            if unfinished:
+                # Batches that failed again would be planned twice by a fresh sync
+                print(f"Run {unfinished[0]} still has unacknowledged batch(es); not starting a new sync")
+                return
+            print("\nContinuing with a fresh sync")
 
     # Read Excel data
     excel_df = read_excel_data(EXCEL_FILE)
 
     # Check for required columns
-    pid_column = None
-    brightness_column = None
-    tone_column = None
-
-    # Try to find P-ID column
-    for col in excel_df.columns:
-        if 'P-ID' in col or 'PID' in col or 'P_ID' in col:
-            pid_column = col
-            print(f"Found P-ID column: {col}")
-            break
-
-    # Try to find brightness (밝기판정) column
-    for col in excel_df.columns:
-        if '밝기' in col or '판정' in col or '밝기판정' in col:
-            brightness_column = col
-            print(f"Found brightness column: {col}")
-            break
-
-    # Try to find tone (톤) column
-    for col in excel_df.columns:
-        if col == '톤' or '톤' in col:
-            tone_column = col
-            print(f"Found tone column: {col}")
-            break
-
+    pid_column = find_column(excel_df, ['P-ID', 'PID', 'P_ID'])
     if not pid_column:
         print("ERROR: Could not find P-ID column in Excel file")
         print(f"Available columns: {list(excel_df.columns)}")
         return
+    print(f"Found P-ID column: {pid_column}")
 
-    if not brightness_column:
-        print("ERROR: Could not find brightness (밝기판정) column in Excel file")
-        print(f"Available columns: {list(excel_df.columns)}")
-        return
+    for entry in SKIN_SYNC_MAPPING:
+        col = find_column(excel_df, entry['column'])
+        if not col:
+            print(f"ERROR: Could not find the {entry['field']} column ({'/'.join(entry['column'])}) in Excel file")
+            print(f"Available columns: {list(excel_df.columns)}")
+            return
+        print(f"Found {entry['field']} column: {col}")
 
-    if not tone_column:
-        print("ERROR: Could not find tone (톤) column in Excel file")
-        print(f"Available columns: {list(excel_df.columns)}")
-        return
-
-    # Get Airtable participants
-    participants = get_airtable_participants(api_key)
-
-    # Process updates
-    updates_to_make = []
-    matched_count = 0
-    unmatched_count = 0
+    # Get Airtable participants (only the ones the Excel file refers to)
+    excel_pids = pid_text(excel_df[pid_column]).dropna().tolist()
+    participants = get_airtable_participants(client, excel_pids, use_mirror, metrics)
 
     print("\nProcessing Excel data...")
+    updates_to_make, stats = compute_diffs(excel_df, participants, SKIN_SYNC_MAPPING, pid_column)
+    print_diff_summary(updates_to_make, stats)
 
-    for idx, row in excel_df.iterrows():
-        pid = str(row[pid_column]) if pd.notna(row[pid_column]) else None
-        brightness = str(row[brightness_column]) if pd.notna(row[brightness_column]) else None
-        tone = str(row[tone_column]) if pd.notna(row[tone_column]) else None
-
-        if not pid:
-            continue
-
-        # Map values
-        skin_color = SKIN_COLOR_MAP.get(brightness, brightness) if brightness else None
-        skin_tone = SKIN_TONE_MAP.get(tone, tone) if tone else None
-
-        # Find matching participant
-        if pid in participants:
-            matched_count += 1
-            participant = participants[pid]
-            record_id = participant['id']
-            current_skin_color = participant['fields'].get('skinColor')
-            current_skin_tone = participant['fields'].get('skinTone')
-
-            # Check if update needed
-            if skin_color != current_skin_color or skin_tone != current_skin_tone:
-                updates_to_make.append({
-                    'record_id': record_id,
-                    'pid': pid,
-                    'name': participant['fields'].get('name', 'Unknown'),
-                    'old_skin_color': current_skin_color,
-                    'new_skin_color': skin_color,
-                    'old_skin_tone': current_skin_tone,
-                    'new_skin_tone': skin_tone
-                })
-        else:
-            unmatched_count += 1
-            if unmatched_count <= 5:  # Show first 5 unmatched
-                print(f"  No match for P-ID: {pid}")
+    creates = []
+    if upsert:
+        creates = compute_creates(excel_df, SKIN_SYNC_MAPPING + NEW_PARTICIPANT_MAPPING,
+                                  pid_column, stats['unmatched_pids'])
+        print(f"  New participants to create: {len(creates)}")
+        for create in creates[:5]:
+            print(f"    {create['pid']}: {create['fields']}")
 
-    print(f"\nMatching results:")
-    print(f"  Matched: {matched_count}")
-    print(f"  Unmatched: {unmatched_count}")
-    print(f"  Updates needed: {len(updates_to_make)}")
-
-    if len(updates_to_make) > 0:
-        print(f"\nFirst 10 updates to be made:")
-        for i, update in enumerate(updates_to_make[:10]):
-            print(f"  {i+1}. {update['name']} (P-ID: {update['pid']})")
-            print(f"     Color: {update['old_skin_color']} → {update['new_skin_color']}")
-            print(f"     Tone: {update['old_skin_tone']} → {update['new_skin_tone']}")
+    if report_path:
+        write_report_csv(report_path, updates_to_make, creates, stats)
+        print(f"\n✓ Report written to {report_path}")
 
     if dry_run:
         print("\n*** DRY RUN MODE - No actual updates performed ***")
-        print(f"Would update {len(updates_to_make)} records")
+        print(f"Would create {len(creates)}, update {len(updates_to_make)}, "
+              f"leave {stats['no_ops']} unchanged")
         return
 
     # Perform actual updates
     if len(updates_to_make) > 0:
         print(f"\nPerforming actual updates...")
 
-        success_count = 0
-        error_count = 0
-
-        for i, update in enumerate(updates_to_make):
-            print(f"  Updating {i+1}/{len(updates_to_make)}: {update['name']}...", end='')
-
-            success = update_participant(
-                api_key,
-                update['record_id'],
-                update['new_skin_color'],
-                update['new_skin_tone']
-            )
-
-            if success:
-                success_count += 1
-                print(" ✓")
-            else:
-                error_count += 1
-                print(" ✗")
-
-            # Rate limiting - Airtable allows 5 requests per second
-            if (i + 1) % 5 == 0:
-                time.sleep(1.1)
+        success_count, error_count = update_participants(client, updates_to_make)
+        if metrics:
+            metrics.add_records('updated', success_count)
 
         print(f"\nUpdate complete:")
         print(f"  Success: {success_count}")
@@ -294,6 +331,17 @@ def main(api_key: str, dry_run: bool = True):
     else:
         print("\nNo updates needed - all data already matches")
 
+    if creates:
+        print(f"\nCreating {len(creates)} new participants...")
+
+        success_count, error_count = create_participants(client, creates)
+        if metrics:
+            metrics.add_records('created', success_count)
+
+        print(f"\nCreate complete:")
+        print(f"  Success: {success_count}")
+        print(f"  Errors: {error_count}")
+
 
 if __name__ == "__main__":
     import sys
@@ -307,12 +355,36 @@ if __name__ == "__main__":
 
     if not api_key:
         print("Please provide Airtable API key as argument or set AIRTABLE_API_KEY environment variable")
-        print("Usage: python update_participants_skin_data.py <API_KEY> [--execute]")
+        print("Usage: python update_participants_skin_data.py <API_KEY> [--execute] [--mirror] [--fresh] [--upsert] [--report FILE.csv] [--prometheus FILE.prom]")
         sys.exit(1)
 
     # Check for execute flag
-    dry_run = True
-    if len(sys.argv) > 2 and sys.argv[2] == '--execute':
-        dry_run = False
-
-    main(api_key, dry_run)
\ No newline at end of file
+    dry_run = '--execute' not in sys.argv[1:]
+    # Read participants from the delta-synced SQLite mirror (airtable_mirror.py)
+    use_mirror = '--mirror' in sys.argv[1:]
+    # Discard an interrupted run from the journal instead of resuming it
+    fresh = '--fresh' in sys.argv[1:]
+    # Create participants for Excel P-IDs that aren't in Airtable yet
+    upsert = '--upsert' in sys.argv[1:]
+    # Per-field CSV of creates / updates / no-ops (written in dry runs too)
+    report_path = None
+    if '--report' in sys.argv[1:]:
+        index = sys.argv.index('--report')
+        report_path = sys.argv[index + 1] if index + 1 < len(sys.argv) else 'skin_sync_report.csv'
+
+    # Also dump the run metrics in Prometheus text format
+    prometheus_path = None
+    if '--prometheus' in sys.argv[1:]:
+        index = sys.argv.index('--prometheus')
+        prometheus_path = sys.argv[index + 1] if index + 1 < len(sys.argv) else 'sync_metrics.prom'
+
+    metrics = SyncMetrics('update_participants_skin_data')
+    try:
+        main(api_key, dry_run, use_mirror, fresh, upsert, report_path, metrics)
+    finally:
+        metrics.finish()
+        print_report(metrics.write_json(SYNC_REPORT_FILE))
+        print(f"✓ Run report written to {SYNC_REPORT_FILE}")
+        if prometheus_path:
+            metrics.write_prometheus(prometheus_path)
+            print(f"✓ Prometheus metrics written to {prometheus_path}")
\ No newline at end of file
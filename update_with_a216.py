@@ -7,6 +7,9 @@ import pandas as pd
 import json
 from pathlib import Path
 
+from analysis_snapshot import load_analysis, save_analysis
+from json_output import dump_json
+
 # Check the Downloads Excel file
 downloads_excel = '/Users/owlers_dylan/Downloads/makeuptest_AP_Bueatylink_20250927.xlsx'
 local_excel = 'makeuptest_AP_Bueatylink_20250927.xlsx'
@@ -42,8 +45,7 @@ if a216_exists:
 print(f"\nUpdating data files with {len(df)} participants...")
 
 # Load existing analysis
-with open('excel_analysis.json', 'r', encoding='utf-8') as f:
-    analysis_data = json.load(f)
+analysis_data = load_analysis(sections=('meta', 'summary_stats'))
 
 # Update participant data
 participant_data = []
@@ -77,8 +79,7 @@ tone_counts = df['톤'].value_counts().to_dict()
 analysis_data['summary_stats']['tone_distribution'] = {str(k): v for k, v in tone_counts.items()}
 
 # Save updated analysis
-with open('excel_analysis.json', 'w', encoding='utf-8') as f:
-    json.dump(analysis_data, f, ensure_ascii=False, indent=2)
+save_analysis(analysis_data)
 
 print(f"✓ Updated excel_analysis.json with {len(df)} participants")
 
@@ -104,7 +105,6 @@ if a216_exists:
             print(f"✓ Found face photo for A216")
 
     # Save updated mapping
-    with open('complete_participant_image_mapping.json', 'w', encoding='utf-8') as f:
-        json.dump(image_mapping, f, indent=2)
+    dump_json(image_mapping, 'complete_participant_image_mapping.json')
 
 print("\nCompleted! Dashboard data updated with all participants.")
\ No newline at end of file